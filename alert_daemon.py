@@ -0,0 +1,250 @@
+"""
+Intraday Alert Daemon
+Polls quotes during trading hours and sends only new position alerts to Telegram
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+from datetime import datetime
+
+from market_open_brief import MarketOpenBrief
+from quote_fetcher import QuoteFetcher
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo('America/New_York')
+except Exception:
+    MARKET_TZ = None
+
+class AlertDaemon:
+    """Long-running poll loop that reuses MarketOpenBrief's alert rules incrementally
+
+    Each tick fetches quotes and re-checks alerts only for symbols whose
+    price or daily change moved since the previous tick. An alert is sent
+    once when its condition starts to hold. It can fire again only after the
+    condition has cleared. Alert state is saved to disk, so a restart does
+    not resend alerts.
+    """
+
+    def __init__(self, brief=None, poll_interval=60, latency_budget=2.0,
+                 trading_hours_only=True, state_file=None, fetcher=None):
+        self.brief = brief or MarketOpenBrief()
+        self.poll_interval = poll_interval
+        self.latency_budget = latency_budget
+        self.trading_hours_only = trading_hours_only
+        self.state_file = state_file or os.path.join(self.brief.cache_dir, 'alert_state.json')
+        self.fetcher = fetcher
+
+        self.last_quotes = {}
+        # Symbols whose new alerts failed to send; re-evaluated next tick even if unchanged
+        self.unsent_symbols = set()
+        self.active_alerts = self.load_state()
+        self.stop_event = None
+        self.stats = {'ticks': 0, 'changed_symbols': 0, 'alerts_sent': 0,
+                      'over_budget': 0, 'last_latency': 0.0, 'max_latency': 0.0}
+
+    # ---- state ---------------------------------------------------------
+
+    def load_state(self):
+        """Active alert keys ('SYMBOL:TYPE') from the previous run"""
+        try:
+            with open(self.state_file, 'r') as f:
+                return set(json.load(f).get('active_alerts', []))
+        except Exception:
+            return set()
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'active_alerts': sorted(self.active_alerts),
+                       'saved_at': datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self.state_file)
+
+    # ---- polling -------------------------------------------------------
+
+    def get_fetcher(self):
+        if self.fetcher is None:
+            api_keys = self.brief.load_api_keys()
+            if 'FMP' not in api_keys:
+                return None
+            # No cache: the daemon needs fresh quotes every tick
+            self.fetcher = QuoteFetcher(
+                api_keys['FMP'],
+                base_url=self.brief.quote_config['base_url'],
+                batch_size=self.brief.quote_config['batch_size'],
+                max_workers=self.brief.quote_config['max_workers'],
+                timeout=self.brief.quote_config['timeout'],
+                ssl_context=self.brief.ssl_context
+            )
+        return self.fetcher
+
+    def is_trading_hours(self, now=None):
+        if not self.trading_hours_only or MARKET_TZ is None:
+            return True
+        now = now or datetime.now(MARKET_TZ)
+        if now.weekday() >= 5:
+            return False
+        minutes = now.hour * 60 + now.minute
+        return 9 * 60 + 30 <= minutes < 16 * 60
+
+    def changed_quotes(self, market_data):
+        """Quotes whose price or daily change differs from the last tick"""
+        changed = {}
+        for symbol, quote in market_data.items():
+            previous = self.last_quotes.get(symbol)
+            if previous is None or previous['price'] != quote['price'] or previous['change_pct'] != quote['change_pct']:
+                changed[symbol] = quote
+        self.last_quotes.update(market_data)
+        return changed
+
+    def diff_alerts(self, changed, alerts):
+        """Alerts that just became active; clears state for conditions that stopped holding"""
+        current = {f"{a['symbol']}:{a['type']}": a for a in alerts}
+
+        # Only re-evaluated symbols can clear, unchanged symbols keep their state
+        for key in list(self.active_alerts):
+            symbol = key.split(':', 1)[0]
+            if symbol in changed and key not in current:
+                self.active_alerts.discard(key)
+
+        new_alerts = [a for key, a in current.items() if key not in self.active_alerts]
+        self.active_alerts.update(current.keys())
+        return new_alerts
+
+    def format_alerts(self, alerts):
+        lines = [f"⚡ <b>INTRADAY ALERTS</b> • {datetime.now().strftime('%H:%M')}"]
+        lines.extend(f"• {alert['message']}" for alert in alerts)
+        return "\n".join(lines)
+
+    async def tick(self):
+        """One poll: fetch, evaluate changed symbols, send new alerts; returns new alerts"""
+        fetcher = self.get_fetcher()
+        if fetcher is None:
+            print("[ERROR] Missing FMP API key - alert daemon cannot poll")
+            return []
+
+        start = time.perf_counter()
+        symbols = list(self.brief.current_portfolio.keys())
+        market_data = await asyncio.to_thread(fetcher.fetch_quotes, symbols)
+
+        changed = self.changed_quotes(market_data)
+        retry = {s for s in self.unsent_symbols if s in market_data}
+        changed.update({s: market_data[s] for s in retry})
+        self.unsent_symbols -= retry
+        alerts = self.brief.check_position_alerts(changed) if changed else []
+        new_alerts = self.diff_alerts(changed, alerts)
+
+        latency = time.perf_counter() - start
+        self.stats['ticks'] += 1
+        self.stats['changed_symbols'] += len(changed)
+        self.stats['last_latency'] = latency
+        self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+        if latency > self.latency_budget:
+            self.stats['over_budget'] += 1
+            print(f"[WARNING] Poll took {latency:.2f}s (budget {self.latency_budget:.2f}s)")
+
+        if new_alerts:
+            sent = await asyncio.to_thread(self.brief.send_telegram_message, self.format_alerts(new_alerts))
+            if sent:
+                self.stats['alerts_sent'] += len(new_alerts)
+                print(f"[OK] Sent {len(new_alerts)} new alerts")
+            else:
+                # Forget them and re-check their symbols next tick, so delivery is retried
+                # even when the quote has not moved since
+                for alert in new_alerts:
+                    self.active_alerts.discard(f"{alert['symbol']}:{alert['type']}")
+                    self.unsent_symbols.add(alert['symbol'])
+            self.save_state()
+
+        return new_alerts
+
+    async def run(self, max_ticks=None):
+        """Poll until stopped (SIGINT/SIGTERM) or max_ticks is reached"""
+        self.stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows / non-main thread: rely on KeyboardInterrupt
+
+        print(f"[INFO] Alert daemon started: {len(self.brief.current_portfolio)} symbols, "
+              f"every {self.poll_interval}s")
+
+        try:
+            while not self.stop_event.is_set():
+                if self.is_trading_hours():
+                    try:
+                        await self.tick()
+                    except Exception as e:
+                        print(f"[ERROR] Poll failed: {e}")
+
+                if max_ticks is not None and self.stats['ticks'] >= max_ticks:
+                    break
+
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.save_state()
+            print(f"[INFO] Alert daemon stopped after {self.stats['ticks']} polls, "
+                  f"{self.stats['alerts_sent']} alerts sent")
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+def benchmark(symbol_count=500, ticks=5, latency=0.05, budget=1.0):
+    """Run the poll loop against the local stub server and report per-tick latency"""
+    import tempfile
+    from stub_server import StubProviderServer
+
+    server = StubProviderServer(latency=latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            brief = MarketOpenBrief(cache_dir=os.path.join(tmp, 'cache'), output_dir=os.path.join(tmp, 'output'))
+            brief.current_portfolio = {
+                f"S{i:04d}": {'shares': 10, 'entry_price': 10 + (i % 40)} for i in range(symbol_count)
+            }
+            brief.send_telegram_message = lambda message: True
+
+            daemon = AlertDaemon(
+                brief, poll_interval=0, latency_budget=budget, trading_hours_only=False,
+                fetcher=QuoteFetcher('stub', base_url=server.base_url, http=brief.http)
+            )
+
+            latencies = []
+            for _ in range(ticks):
+                new_alerts = asyncio.run(daemon.tick())
+                latencies.append(daemon.stats['last_latency'])
+                print(f"tick {daemon.stats['ticks']}: {daemon.stats['last_latency'] * 1000:7.1f}ms, "
+                      f"{len(new_alerts)} new alerts")
+    finally:
+        server.stop()
+
+    print(f"ALERT DAEMON BENCHMARK ({symbol_count} symbols, {latency * 1000:.0f}ms stub latency)")
+    print("=" * 50)
+    print(f"Max poll latency: {max(latencies) * 1000:.1f}ms (budget {budget * 1000:.0f}ms)")
+    print(f"Within budget:    {max(latencies) <= budget}")
+
+def main():
+    """Run the daemon, or 'benchmark [symbols]' against the stub server"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        benchmark(symbol_count=int(sys.argv[2]) if len(sys.argv) > 2 else 500)
+        return
+
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    daemon = AlertDaemon(poll_interval=interval)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
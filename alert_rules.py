@@ -0,0 +1,114 @@
+"""
+Alert Rules
+Declarative position alert rules evaluated with vectorized comparisons over all symbols
+"""
+
+import os
+import json
+import numpy as np
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(__file__), 'alert_rules.json')
+
+OPERATORS = {
+    '<=': np.less_equal,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '>': np.greater
+}
+
+METRICS = ['entry_change_pct', 'daily_change_pct', 'abs_daily_change_pct']
+
+class AlertEngine:
+    """Evaluate a rule table against arrays of positions
+
+    Each rule compares one metric to a threshold. Every matching rule raises
+    its own alert, so a symbol can trigger several at once. A rule may list
+    other rule types it `suppresses` (EMERGENCY hides the weaker STOP_LOSS).
+    Per-symbol overrides replace a rule's threshold, or disable the rule
+    when set to null.
+    """
+
+    def __init__(self, rules, overrides=None):
+        for rule in rules:
+            if rule['op'] not in OPERATORS:
+                raise ValueError(f"Unknown operator {rule['op']!r} in rule {rule['type']}")
+            if rule['metric'] not in METRICS:
+                raise ValueError(f"Unknown metric {rule['metric']!r} in rule {rule['type']}")
+        self.rules = rules
+        self.overrides = {s.upper(): o for s, o in (overrides or {}).items()}
+
+    @classmethod
+    def load(cls, path=DEFAULT_RULES_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config['rules'], config.get('overrides'))
+
+    @staticmethod
+    def compute_metrics(entry_price, price, daily_change_pct):
+        """Derive every rule metric from aligned price arrays"""
+        entry_price = np.asarray(entry_price, dtype=float)
+        price = np.asarray(price, dtype=float)
+        daily_change_pct = np.asarray(daily_change_pct, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entry_change_pct = np.where(entry_price > 0, (price - entry_price) / entry_price * 100, np.nan)
+
+        return {
+            'entry_change_pct': entry_change_pct,
+            'daily_change_pct': daily_change_pct,
+            'abs_daily_change_pct': np.abs(daily_change_pct)
+        }
+
+    def thresholds(self, rule, symbol_index, count):
+        """Threshold vector for a rule with per-symbol overrides applied (NaN disables)"""
+        values = np.full(count, float(rule['threshold']))
+        for symbol, override in self.overrides.items():
+            i = symbol_index.get(symbol)
+            if i is not None and rule['type'] in override:
+                value = override[rule['type']]
+                values[i] = np.nan if value is None else float(value)
+        return values
+
+    def evaluate_masks(self, symbols, metrics):
+        """Boolean hit mask per rule type, after suppression"""
+        symbol_index = {s: i for i, s in enumerate(symbols)} if self.overrides else {}
+        masks = {}
+        for rule in self.rules:
+            metric = metrics[rule['metric']]
+            limit = self.thresholds(rule, symbol_index, len(symbols))
+            with np.errstate(invalid='ignore'):
+                masks[rule['type']] = OPERATORS[rule['op']](metric, limit) & np.isfinite(limit) & np.isfinite(metric)
+
+        for rule in self.rules:
+            for suppressed in rule.get('suppresses', []):
+                if suppressed in masks:
+                    masks[suppressed] &= ~masks[rule['type']]
+        return masks
+
+    def evaluate(self, symbols, entry_price, price, daily_change_pct):
+        """Return alert dicts ({'type', 'symbol', 'message'}) in symbol then rule order"""
+        symbols = list(symbols)
+        if not symbols or not self.rules:
+            return []
+
+        metrics = self.compute_metrics(entry_price, price, daily_change_pct)
+        masks = self.evaluate_masks(symbols, metrics)
+
+        # Only symbols with at least one hit are formatted
+        hits = np.column_stack([masks[rule['type']] for rule in self.rules])
+        alerts = []
+        for i in np.flatnonzero(hits.any(axis=1)):
+            fields = {
+                'symbol': symbols[i],
+                'entry_change_pct': float(metrics['entry_change_pct'][i]),
+                'daily_change_pct': float(metrics['daily_change_pct'][i]),
+                'direction': "📈" if metrics['daily_change_pct'][i] > 0 else "📉"
+            }
+            for j in np.flatnonzero(hits[i]):
+                rule = self.rules[j]
+                alerts.append({
+                    'type': rule['type'],
+                    'symbol': symbols[i],
+                    'message': rule['message'].format(**fields)
+                })
+        return alerts
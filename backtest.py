@@ -0,0 +1,272 @@
+"""
+Alert Backtester
+Replays daily bars through the market-open alert rules, vectorized across symbols and dates
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from alert_rules import AlertEngine, DEFAULT_RULES_FILE
+from price_history import HistoryStore, DEFAULT_HISTORY_DIR, TRADING_DAYS
+
+DEFAULT_HORIZONS = (1, 5, 20)
+
+class AlertBacktester:
+    """Alert statistics for one aligned close matrix (dates x symbols)
+
+    Each symbol is entered at its first close in the window and held, so
+    entry_change_pct is the move since that close. daily_change_pct is the
+    close-to-close move, as in the quote's changesPercentage. Every rule
+    metric and forward return is computed once for the whole matrix. A
+    threshold set then costs one broadcast comparison per rule through
+    AlertEngine.evaluate_masks, the same code the live brief runs.
+
+    An alert "fires" on the day its condition starts to hold, as in the
+    intraday daemon. It can fire again only after the condition clears.
+    """
+
+    def __init__(self, symbols, dates, close, horizons=DEFAULT_HORIZONS):
+        self.symbols = list(symbols)
+        self.dates = np.asarray(dates)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.horizons = tuple(horizons)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # First finite close per symbol is its entry price
+            first = np.argmax(np.isfinite(self.close), axis=0)
+            entry = self.close[first, np.arange(self.close.shape[1])]
+            daily = np.full_like(self.close, np.nan)
+            daily[1:] = (self.close[1:] / self.close[:-1] - 1) * 100
+
+            self.metrics = AlertEngine.compute_metrics(entry, self.close, daily)
+
+            self.forward = {}
+            for h in self.horizons:
+                returns = np.full_like(self.close, np.nan)
+                if h < len(self.close):
+                    returns[:-h] = (self.close[h:] / self.close[:-h] - 1) * 100
+                self.forward[h] = returns
+
+    @classmethod
+    def from_history(cls, store, symbols=None, start=None, end=None, horizons=DEFAULT_HORIZONS):
+        """Align closes from a HistoryStore on the union of their dates (NaN where missing)"""
+        symbols = [s.upper() for s in (symbols or store.symbols())]
+        columns = [store.bars(s, start, end, fields=['date', 'close']) for s in symbols]
+        missing = [s for s, c in zip(symbols, columns) if not len(c['date'])]
+        if missing:
+            print(f"[WARNING] No history in the window for: {', '.join(missing[:10])}"
+                  f"{', ...' if len(missing) > 10 else ''}")
+        symbols = [s for s, c in zip(symbols, columns) if len(c['date'])]
+        columns = [c for c in columns if len(c['date'])]
+        if not columns:
+            raise ValueError("no price history in the requested window")
+
+        dates = np.unique(np.concatenate([c['date'] for c in columns]))
+        close = np.full((len(dates), len(symbols)), np.nan)
+        for j, c in enumerate(columns):
+            close[np.searchsorted(dates, c['date']), j] = c['close']
+        return cls(symbols, dates, close, horizons)
+
+    @classmethod
+    def synthetic(cls, symbol_count=1000, years=5, seed=7, horizons=DEFAULT_HORIZONS):
+        """Random-walk universe with fat-tailed daily moves, for timing the sweep"""
+        days = years * TRADING_DAYS
+        rng = np.random.default_rng(seed)
+        returns = rng.standard_t(3, size=(days, symbol_count)) * 0.025
+        close = 10 * np.exp(np.cumsum(returns, axis=0))
+        dates = np.datetime64('2020-01-02') + np.arange(days)
+        return cls([f"S{i:04d}" for i in range(symbol_count)], dates, close, horizons)
+
+    def run(self, engine):
+        """{rule type: stats} for one AlertEngine (threshold set)"""
+        masks = engine.evaluate_masks(self.symbols, self.metrics)
+        symbol_years = np.isfinite(self.close).sum() / TRADING_DAYS
+
+        results = {}
+        for rule in engine.rules:
+            active = masks[rule['type']]
+            fires = active.copy()
+            fires[1:] &= ~active[:-1]
+
+            forward = {}
+            for h in self.horizons:
+                values = self.forward[h][fires]
+                values = values[np.isfinite(values)]
+                forward[h] = {
+                    'n': int(values.size),
+                    'mean': float(values.mean()) if values.size else None,
+                    'median': float(np.median(values)) if values.size else None,
+                    'win_rate': float((values > 0).mean() * 100) if values.size else None
+                }
+
+            fire_count = int(fires.sum())
+            results[rule['type']] = {
+                'threshold': rule['threshold'],
+                'days_active': int(active.sum()),
+                'fires': fire_count,
+                'fires_per_symbol_year': fire_count / symbol_years if symbol_years else 0.0,
+                'symbols_fired': int(fires.any(axis=0).sum()),
+                'forward': forward
+            }
+        return results
+
+# ---- threshold sweep -----------------------------------------------------
+
+def engine_with(base, thresholds):
+    """Copy of an AlertEngine with {rule type: threshold} replaced"""
+    rules = [dict(rule, threshold=thresholds.get(rule['type'], rule['threshold'])) for rule in base.rules]
+    return AlertEngine(rules, base.overrides)
+
+def grid_combinations(grid):
+    """[{rule type: threshold}] for the cartesian product of a {rule type: [values]} grid"""
+    types = list(grid)
+    return [dict(zip(types, values)) for values in itertools.product(*(grid[t] for t in types))]
+
+_worker = {}
+
+def _init_worker(close_path, symbols, dates, horizons, rules, overrides):
+    # The close matrix is memory-mapped, so every worker shares one copy in the page cache
+    close = np.load(close_path, mmap_mode='r')
+    _worker['backtester'] = AlertBacktester(symbols, dates, close, horizons)
+    _worker['engine'] = AlertEngine(rules, overrides)
+
+def _run_combination(thresholds):
+    return thresholds, _worker['backtester'].run(engine_with(_worker['engine'], thresholds))
+
+def sweep(backtester, base_engine, grid, workers=None):
+    """Run every threshold combination of `grid`, in parallel over `workers` processes
+
+    Returns [(thresholds, results)] in grid order. workers=1 runs in-process.
+    """
+    import tempfile
+
+    combinations = grid_combinations(grid)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(combinations) == 1:
+        return [(t, backtester.run(engine_with(base_engine, t))) for t in combinations]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        close_path = os.path.join(tmp, 'close.npy')
+        np.save(close_path, backtester.close)
+        initargs = (close_path, backtester.symbols, backtester.dates, backtester.horizons,
+                    base_engine.rules, base_engine.overrides)
+        with ProcessPoolExecutor(max_workers=min(workers, len(combinations)),
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            chunksize = max(1, len(combinations) // (workers * 4))
+            return list(pool.map(_run_combination, combinations, chunksize=chunksize))
+
+# ---- reporting -----------------------------------------------------------
+
+def format_pct(value):
+    return f"{value:+6.2f}%" if value is not None else "    n/a"
+
+def print_report(backtester, results):
+    print(f"ALERT BACKTEST ({len(backtester.symbols)} symbols, {len(backtester.dates)} days, "
+          f"{backtester.dates[0]} to {backtester.dates[-1]})")
+    print("=" * 78)
+    header = f"{'rule':<15} {'threshold':>9} {'fires':>7} {'/sym-yr':>8}"
+    for h in backtester.horizons:
+        header += f" {f'fwd {h}d':>8} {'win':>5}"
+    print(header)
+    for rule_type, r in results.items():
+        line = f"{rule_type:<15} {r['threshold']:>9} {r['fires']:>7} {r['fires_per_symbol_year']:>8.2f}"
+        for h in backtester.horizons:
+            f = r['forward'][h]
+            win = f"{f['win_rate']:4.0f}%" if f['win_rate'] is not None else "  n/a"
+            line += f" {format_pct(f['mean']):>8} {win:>5}"
+        print(line)
+
+def print_sweep(sweep_results, horizon):
+    rule_types = list(sweep_results[0][1])
+    print(f"THRESHOLD SWEEP ({len(sweep_results)} combinations, mean {horizon}d forward return after firing)")
+    print("=" * 78)
+    for thresholds, results in sweep_results:
+        setting = " ".join(f"{t}={v}" for t, v in thresholds.items())
+        cells = " | ".join(
+            f"{t} {results[t]['fires']} {format_pct(results[t]['forward'][horizon]['mean']).strip()}"
+            for t in rule_types
+        )
+        print(f"{setting}\n    {cells}")
+
+def parse_grid(specs):
+    """['EMERGENCY=-30,-25,-20', ...] -> {'EMERGENCY': [-30.0, -25.0, -20.0]}"""
+    grid = {}
+    for spec in specs:
+        rule_type, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"grid entries look like RULE=v1,v2,... (got {spec!r})")
+        grid[rule_type.upper()] = [float(v) for v in values.split(',')]
+    return grid
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='backtest.py', description="Backtest the market-open alert thresholds")
+    parser.add_argument('--symbols', help="comma-separated universe (default: every symbol with history)")
+    parser.add_argument('--start', help="first date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="last date (YYYY-MM-DD)")
+    parser.add_argument('--horizons', default=','.join(map(str, DEFAULT_HORIZONS)),
+                        help="forward-return horizons in trading days")
+    parser.add_argument('--grid', action='append', default=[], metavar='RULE=V1,V2',
+                        help="threshold values to sweep for a rule (repeatable)")
+    parser.add_argument('--workers', type=int, help="sweep processes (default: CPU count)")
+    parser.add_argument('--rules', default=DEFAULT_RULES_FILE)
+    parser.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR)
+    parser.add_argument('--synthetic', metavar='SYMBOLSxYEARS',
+                        help="use a random-walk universe instead of stored history, e.g. 1000x5")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        engine = AlertEngine.load(args.rules)
+        horizons = [int(h) for h in args.horizons.split(',')]
+        grid = parse_grid(args.grid)
+        unknown = [t for t in grid if t not in {rule['type'] for rule in engine.rules}]
+        if unknown:
+            raise ValueError(f"unknown rule(s) in grid: {', '.join(unknown)}")
+
+        start = time.perf_counter()
+        if args.synthetic:
+            symbol_count, _, years = args.synthetic.lower().partition('x')
+            backtester = AlertBacktester.synthetic(int(symbol_count), int(years or 5), horizons=horizons)
+        else:
+            symbols = args.symbols.split(',') if args.symbols else None
+            backtester = AlertBacktester.from_history(HistoryStore(args.history_dir), symbols,
+                                                      args.start, args.end, horizons)
+        load_seconds = time.perf_counter() - start
+    except Exception as e:
+        print(f"[ERROR] Backtest setup failed: {e}")
+        return 1
+
+    start = time.perf_counter()
+    if grid:
+        output = sweep(backtester, engine, grid, args.workers)
+        print_sweep(output, horizons[min(1, len(horizons) - 1)])
+        payload = [{'thresholds': t, 'results': r} for t, r in output]
+    else:
+        output = backtester.run(engine)
+        print_report(backtester, output)
+        payload = output
+    run_seconds = time.perf_counter() - start
+
+    print(f"\n[INFO] Loaded {backtester.close.shape[1]} x {backtester.close.shape[0]} bars in "
+          f"{load_seconds:.2f}s, backtest took {run_seconds:.2f}s")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'symbols': len(backtester.symbols), 'start': str(backtester.dates[0]),
+                       'end': str(backtester.dates[-1]), 'horizons': horizons, 'results': payload}, f, indent=2)
+        print(f"[OK] Results saved: {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Pipeline Benchmark
+End-to-end latency of the market open brief and EOD analysis against the provider simulator
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+import tempfile
+
+from stub_server import StubProviderServer, PROVIDERS
+
+BRIEF_STAGES = ['get_pre_market_data', 'get_overnight_news', 'check_position_alerts',
+                'format_market_open_brief', 'send_telegram_message']
+EOD_STAGES = ['load_portfolio', 'get_market_prices', 'analyze_positions', 'send_telegram_message']
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def instrument(target, stages, server, records):
+    """Wrap instance methods so each call records duration, requests and bytes"""
+    for name in stages:
+        original = getattr(target, name)
+
+        def timed(*args, _original=original, _name=name, **kwargs):
+            before = server.snapshot()
+            start = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                after = server.snapshot()
+                records.setdefault(_name, []).append({
+                    'seconds': elapsed,
+                    'requests': sum(after[p]['requests'] - before[p]['requests'] for p in PROVIDERS),
+                    'bytes': sum(after[p]['bytes_in'] + after[p]['bytes_out']
+                                 - before[p]['bytes_in'] - before[p]['bytes_out'] for p in PROVIDERS)
+                })
+
+        setattr(target, name, timed)
+
+def run_brief(server, records, symbols, output_dir):
+    from market_open_brief import MarketOpenBrief
+    from data_cache import DataCache
+    from news_index import NewsIndex
+
+    brief = MarketOpenBrief(cache_dir=os.path.join(output_dir, 'cache'), output_dir=output_dir)
+    brief.load_api_keys = lambda: {'FMP': 'sim', 'NewsAPI': 'sim'}
+    brief.cache = DataCache(':memory:')  # cold cache: every run hits the simulator
+    brief.news_index = NewsIndex(':memory:')
+    if symbols:
+        brief.watchlist = [f"W{i:04d}" for i in range(symbols)]
+
+    instrument(brief, BRIEF_STAGES, server, records)
+    instrument(brief, ['generate_market_open_brief'], server, records)
+    brief.generate_market_open_brief()
+
+def run_eod(server, records, output_dir):
+    from cloud_algorithm_runner import CloudAlgorithmRunner
+    from data_cache import DataCache
+
+    runner = CloudAlgorithmRunner()
+    runner.cache = DataCache(':memory:')
+    runner.metrics_dir = os.path.join(output_dir, 'metrics')
+
+    instrument(runner, EOD_STAGES, server, records)
+    instrument(runner, ['run_algorithm_analysis'], server, records)
+    runner.run_algorithm_analysis()
+
+def summarize(records):
+    summary = {}
+    for stage, samples in records.items():
+        seconds = [s['seconds'] for s in samples]
+        summary[stage] = {
+            'runs': len(samples),
+            'p50_ms': percentile(seconds, 50) * 1000,
+            'p95_ms': percentile(seconds, 95) * 1000,
+            'requests': sum(s['requests'] for s in samples) / len(samples),
+            'bytes': sum(s['bytes'] for s in samples) / len(samples)
+        }
+    return summary
+
+def print_summary(title, summary, order):
+    print(f"\n{title}")
+    print("-" * 78)
+    print(f"{'stage':<30} {'p50 ms':>9} {'p95 ms':>9} {'requests':>9} {'bytes':>12}")
+    for stage in order:
+        if stage in summary:
+            s = summary[stage]
+            print(f"{stage:<30} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} {s['requests']:9.1f} {s['bytes']:12.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the brief and EOD pipelines offline")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--symbols', type=int, default=0, help="synthetic watchlist size (0 = default watchlist)")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated provider latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help="requests/sec per provider before 429 (0 = off)")
+    parser.add_argument('--json', help="write the summary to this file")
+    args = parser.parse_args()
+
+    rate_limits = {p: args.rate_limit for p in PROVIDERS} if args.rate_limit else None
+    server = StubProviderServer(latency=args.latency, error_rate=args.error_rate,
+                                rate_limits=rate_limits).start()
+
+    os.environ.update(server.environment())
+    os.environ.update({'TELEGRAM_BOT_TOKEN': 'sim', 'TELEGRAM_CHAT_ID': 'sim', 'FMP_API_KEY': 'sim'})
+
+    brief_records = {}
+    eod_records = {}
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            for _ in range(args.runs):
+                run_brief(server, brief_records, args.symbols, output_dir)
+                run_eod(server, eod_records, output_dir)
+    finally:
+        server.stop()
+
+    brief_summary = summarize(brief_records)
+    eod_summary = summarize(eod_records)
+
+    print(f"\nPIPELINE BENCHMARK ({args.runs} runs, {args.latency * 1000:.0f}ms latency, "
+          f"{args.error_rate:.0%} errors)")
+    print("=" * 78)
+    print_summary("MARKET OPEN BRIEF", brief_summary, BRIEF_STAGES + ['generate_market_open_brief'])
+    print_summary("EOD ANALYSIS", eod_summary, EOD_STAGES + ['run_algorithm_analysis'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'config': vars(args),
+                'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'brief': brief_summary,
+                'eod': eod_summary
+            }, f, indent=2)
+        print(f"\nResults saved: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Portfolio Scale Benchmark
+Trade throughput, startup, render and history latency of SimplePortfolio at 1k-1M trades
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime, timedelta
+
+from simple_portfolio import SimplePortfolio, BACKENDS
+from transaction_log import TransactionLog
+from portfolio_db import PortfolioDB
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def generate_history(data_dir, trades, symbols, seed=7):
+    """Write a synthetic transactions.csv and the matching current_portfolio.json"""
+    rng = random.Random(seed)
+    universe = [f"S{i:05d}" for i in range(symbols)]
+    positions = {}
+    start = datetime(2020, 1, 1)
+    log = TransactionLog(os.path.join(data_dir, 'transactions.csv'))
+
+    chunk = []
+    for n in range(trades):
+        symbol = rng.choice(universe)
+        price = round(rng.uniform(1, 50), 2)
+        position = positions.get(symbol)
+
+        if position and rng.random() < 0.3:
+            shares = position['shares'] * 0.5
+            position['shares'] -= shares
+            position['total_invested'] = position['shares'] * position['avg_cost']
+            action = 'SELL'
+        else:
+            shares = round(rng.uniform(1, 100), 4)
+            if position:
+                position['shares'] += shares
+                position['total_invested'] += shares * price
+                position['avg_cost'] = position['total_invested'] / position['shares']
+            else:
+                positions[symbol] = {'shares': shares, 'avg_cost': price, 'total_invested': shares * price}
+            action = 'BUY'
+
+        chunk.append({
+            'date': (start + timedelta(minutes=n)).strftime('%Y-%m-%d %H:%M'),
+            'symbol': symbol,
+            'action': action,
+            'shares': shares,
+            'price': price,
+            'amount': shares * price,
+            'notes': 'Synthetic'
+        })
+        if len(chunk) >= 50_000:
+            log.append_many(chunk)
+            chunk = []
+    log.append_many(chunk)
+
+    portfolio = dict(positions)
+    portfolio['CASH'] = {'balance': 1e12}
+    portfolio['last_updated'] = datetime.now().isoformat()
+    with open(os.path.join(data_dir, 'current_portfolio.json'), 'w') as f:
+        json.dump(portfolio, f, indent=2)
+
+    return universe
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def run_size(trades, symbols, trade_ops, backend='file'):
+    """Benchmark one history size on one backend in the current process"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_seconds, universe = timed(generate_history, data_dir, trades, symbols)
+        csv_mb = os.path.getsize(os.path.join(data_dir, 'transactions.csv')) / (1024 * 1024)
+
+        import_seconds = None
+        if backend == 'sqlite':
+            db = PortfolioDB(os.path.join(data_dir, 'portfolio.db'))
+            import_seconds, _ = timed(db.import_files, os.path.join(data_dir, 'current_portfolio.json'),
+                                      os.path.join(data_dir, 'transactions.csv'))
+            db.close()
+
+        load_seconds, manager = timed(SimplePortfolio, data_dir, backend=backend)
+        positions = len([s for s in manager.portfolio if s not in ['CASH', 'last_updated']])
+
+        rng = random.Random(11)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(trade_ops):
+                manager.buy_stock(rng.choice(universe), 100, rng.uniform(1, 50), is_dollar_amount=True)
+        buy_seconds = time.perf_counter() - start
+
+        held = [s for s in manager.portfolio if s not in ['CASH', 'last_updated']]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(trade_ops):
+                manager.sell_stock(rng.choice(held), 10, rng.uniform(1, 50), is_percentage=True)
+        sell_seconds = time.perf_counter() - start
+
+        show_seconds, _ = timed(manager.show_portfolio)
+        recent_seconds, _ = timed(manager.show_recent_transactions)
+        symbol_seconds, _ = timed(manager.transaction_log.for_symbol, universe[0])
+
+    return {
+        'backend': backend,
+        'trades': trades,
+        'symbols': symbols,
+        'positions': positions,
+        'transactions_csv_mb': round(csv_mb, 2),
+        'generate_s': generate_seconds,
+        'import_s': import_seconds,
+        'load_portfolio_ms': load_seconds * 1000,
+        'buy_per_sec': trade_ops / buy_seconds,
+        'sell_per_sec': trade_ops / sell_seconds,
+        'show_portfolio_ms': show_seconds * 1000,
+        'recent_transactions_ms': recent_seconds * 1000,
+        'symbol_history_ms': symbol_seconds * 1000,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SimplePortfolio at scale")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="trade history sizes")
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--trade-ops', type=int, default=100, help="buys and sells timed per size")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--output', help="results JSON path (default output/benchmarks/...)")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        # Child process: one size and backend, JSON on stdout, so peak RSS is per run
+        print(json.dumps(run_size(args.sizes[0], args.symbols, args.trade_ops, args.backends[0])))
+        return
+
+    results = []
+    for size in args.sizes:
+        for backend in args.backends:
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--single', '--sizes', str(size),
+                 '--symbols', str(args.symbols), '--trade-ops', str(args.trade_ops), '--backends', backend],
+                capture_output=True, text=True, check=True
+            )
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            results.append(result)
+
+            rss = f"{result['peak_rss_mb']:.0f}MB" if result['peak_rss_mb'] is not None else 'n/a'
+            print(f"{size:>9} trades | {backend:<6} | {result['positions']:>5} positions | "
+                  f"load {result['load_portfolio_ms']:8.1f}ms | "
+                  f"buy {result['buy_per_sec']:7.1f}/s | sell {result['sell_per_sec']:7.1f}/s | "
+                  f"show {result['show_portfolio_ms']:7.1f}ms | recent {result['recent_transactions_ms']:6.2f}ms | "
+                  f"symbol {result['symbol_history_ms']:7.2f}ms | RSS {rss}")
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'output', 'benchmarks',
+        f"portfolio_scale_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'python': sys.version.split()[0],
+                   'platform': sys.platform, 'results': results}, f, indent=2)
+    print(f"Results saved: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Brief Archive
+Append-only, zlib-compressed record-per-run archive of market open briefs with a date and symbol index
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import zlib
+import struct
+import sqlite3
+from datetime import datetime, timedelta
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), 'output', 'brief_archive')
+
+# Record header: magic, compressed length, CRC32 of the compressed payload
+RECORD_MAGIC = b'BRF1'
+HEADER = struct.Struct('<4sII')
+
+def day_bounds(start=None, end=None):
+    """Inclusive start / exclusive end for generated_at; a bare end date covers that whole day"""
+    if end is not None and len(end) == 10:
+        end = (datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    return start, end
+
+class BriefArchive:
+    """Brief snapshots appended to one data file, located through a SQLite index
+
+    briefs.zlog holds one compressed compact-JSON record per run, each with
+    a header carrying its length and CRC. index.sqlite maps every run to its
+    offset, and every quoted or newsworthy symbol to its price and change in
+    that run. Per-symbol history therefore never decompresses anything.
+
+    A record is written and flushed before its index rows commit. Bytes past
+    the last indexed record come from an interrupted append and are
+    truncated when the archive is opened.
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, fsync=False):
+        self.root = root
+        self.data_path = os.path.join(root, 'briefs.zlog')
+        self.fsync = fsync
+        os.makedirs(root, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(root, 'index.sqlite'))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                generated_at TEXT NOT NULL UNIQUE,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                alerts INTEGER NOT NULL,
+                source TEXT
+            );
+            CREATE TABLE IF NOT EXISTS symbols (
+                symbol TEXT NOT NULL,
+                run_id INTEGER NOT NULL,
+                price REAL,
+                change_pct REAL,
+                volume REAL,
+                news INTEGER NOT NULL,
+                PRIMARY KEY (symbol, run_id)
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+        self.end = self.recover()
+
+    def recover(self):
+        """Truncate a torn tail; returns the data file's committed end offset"""
+        row = self.conn.execute("SELECT MAX(offset + length) FROM runs").fetchone()
+        end = row[0] or 0
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if size > end:
+            print(f"[WARNING] Brief archive: dropping {size - end} bytes of an interrupted append")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(end)
+        elif size < end:
+            raise ValueError(f"{self.data_path} is shorter than its index ({size} < {end} bytes)")
+        return end
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    # ---- writing ---------------------------------------------------------
+
+    def append(self, brief, source=None):
+        """Archive one brief dict (keyed by 'generated_at'); returns its run id, or None if already archived"""
+        ids = self.append_many([(brief, source)])
+        return ids[0] if ids else None
+
+    def append_many(self, briefs):
+        """Archive [(brief, source)] with one data write and one index transaction; returns new run ids"""
+        records = []
+        offset = self.end
+        known = set()
+        for brief, source in briefs:
+            generated_at = str(brief.get('generated_at') or datetime.now().isoformat())
+            if generated_at in known or self.conn.execute(
+                    "SELECT 1 FROM runs WHERE generated_at=?", (generated_at,)).fetchone():
+                continue
+            known.add(generated_at)
+
+            raw = json.dumps(brief, separators=(',', ':'), default=str).encode('utf-8')
+            payload = zlib.compress(raw, 6)
+            record = HEADER.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload)) + payload
+            records.append((generated_at, brief, source, offset, record, len(raw)))
+            offset += len(record)
+
+        if not records:
+            return []
+
+        with open(self.data_path, 'ab') as f:
+            f.write(b''.join(r[4] for r in records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        ids = []
+        with self.conn:
+            for generated_at, brief, source, record_offset, record, raw_bytes in records:
+                cursor = self.conn.execute(
+                    "INSERT INTO runs (generated_at, offset, length, raw_bytes, alerts, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (generated_at, record_offset, len(record), raw_bytes, len(brief.get('alerts') or []), source)
+                )
+                ids.append(cursor.lastrowid)
+                self.conn.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?)",
+                                      self.symbol_rows(cursor.lastrowid, brief))
+        self.end = offset
+        return ids
+
+    @staticmethod
+    def symbol_rows(run_id, brief):
+        market_data = brief.get('market_data') or {}
+        news = brief.get('overnight_news') or {}
+        rows = []
+        for symbol in dict.fromkeys(list(market_data) + list(news)):
+            quote = market_data.get(symbol) or {}
+            rows.append((symbol.upper(), run_id, quote.get('price'), quote.get('change_pct'),
+                         quote.get('volume'), len(news.get(symbol) or [])))
+        return rows
+
+    def import_snapshots(self, directory, pattern='Market_Open_Brief_*.json', remove=False):
+        """Bulk-archive existing JSON snapshots in generated_at order; returns (imported, skipped)"""
+        briefs = []
+        failed = 0
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    brief = json.load(f)
+                if 'generated_at' not in brief:
+                    # Older snapshots: fall back to the file's modification time
+                    brief['generated_at'] = datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+                briefs.append((brief, os.path.basename(path)))
+            except Exception as e:
+                print(f"[WARNING] Skipping unreadable snapshot {path}: {e}")
+                failed += 1
+
+        briefs.sort(key=lambda item: str(item[0]['generated_at']))
+        imported = self.append_many(briefs)
+
+        if remove:
+            for _, source in briefs:
+                os.remove(os.path.join(directory, source))
+        return len(imported), len(briefs) - len(imported) + failed
+
+    # ---- reading ---------------------------------------------------------
+
+    def read_record(self, f, offset, length):
+        f.seek(offset)
+        record = f.read(length)
+        magic, size, crc = HEADER.unpack_from(record)
+        payload = record[HEADER.size:]
+        if magic != RECORD_MAGIC or size != len(payload) or zlib.crc32(payload) != crc:
+            raise ValueError(f"corrupt brief record at offset {offset}")
+        return json.loads(zlib.decompress(payload))
+
+    def runs(self, start=None, end=None, symbol=None, limit=None, newest_first=False):
+        """[(run id, generated_at)] in the date range, optionally only runs mentioning `symbol`"""
+        return [row[:2] for row in self.locate(start, end, symbol, limit, newest_first)]
+
+    def locate(self, start=None, end=None, symbol=None, limit=None, newest_first=False):
+        """[(run id, generated_at, offset, length)] for runs(); see there"""
+        start, end = day_bounds(start, end)
+        sql = "SELECT runs.id, runs.generated_at, runs.offset, runs.length FROM runs"
+        where, params = [], []
+        if symbol is not None:
+            sql += " JOIN symbols ON symbols.run_id = runs.id AND symbols.symbol = ?"
+            params.append(symbol.upper())
+        if start is not None:
+            where.append("runs.generated_at >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("runs.generated_at < ?")
+            params.append(end)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY runs.generated_at {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.conn.execute(sql, params).fetchall()
+
+    def get(self, run_id):
+        row = self.conn.execute("SELECT offset, length FROM runs WHERE id=?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        with open(self.data_path, 'rb') as f:
+            return self.read_record(f, *row)
+
+    def latest(self):
+        runs = self.runs(limit=1, newest_first=True)
+        return self.get(runs[0][0]) if runs else None
+
+    def iter_briefs(self, start=None, end=None, symbol=None, newest_first=False):
+        """Stream matching briefs one at a time (only one decompressed record in memory)"""
+        located = self.locate(start, end, symbol, newest_first=newest_first)
+        if not located:
+            return
+        with open(self.data_path, 'rb') as f:
+            for _, _, offset, length in located:
+                yield self.read_record(f, offset, length)
+
+    def symbol_history(self, symbol, start=None, end=None, last=None):
+        """[(generated_at, price, change_pct, volume, news count)] oldest first, from the index alone"""
+        start, end = day_bounds(start, end)
+        sql = ("SELECT runs.generated_at, symbols.price, symbols.change_pct, symbols.volume, symbols.news "
+               "FROM symbols JOIN runs ON runs.id = symbols.run_id WHERE symbols.symbol = ?")
+        params = [symbol.upper()]
+        if start is not None:
+            sql += " AND runs.generated_at >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND runs.generated_at < ?"
+            params.append(end)
+        sql += " ORDER BY runs.generated_at DESC"
+        if last is not None:
+            sql += f" LIMIT {int(last)}"
+        return list(reversed(self.conn.execute(sql, params).fetchall()))
+
+    def summary(self):
+        runs, raw, stored, first, last = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(length), 0), "
+            "MIN(generated_at), MAX(generated_at) FROM runs").fetchone()
+        ratio = raw / stored if stored else 0
+        return (f"Brief archive: {runs} runs ({first or '-'} to {last or '-'}), "
+                f"{stored / 1024:.1f}KB stored, {ratio:.1f}x smaller than compact JSON")
+
+    def close(self):
+        self.conn.close()
+
+def benchmark(runs=365, symbols=60):
+    """Bulk-import a year of pretty-printed snapshots, then compare a 60-run symbol query"""
+    import random
+    import shutil
+    import tempfile
+
+    rng = random.Random(7)
+    universe = ['RGTI', 'BBAI', 'LAES'] + [f"W{i:03d}" for i in range(symbols - 3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshots = os.path.join(tmp, 'output')
+        os.makedirs(snapshots)
+        start_day = datetime(2025, 1, 2, 9, 30)
+        for n in range(runs):
+            when = start_day + timedelta(days=n)
+            brief = {
+                'market_data': {s: {'price': round(rng.uniform(1, 50), 2), 'change': 0.1,
+                                    'change_pct': round(rng.uniform(-8, 8), 2), 'volume': rng.randint(1e5, 5e6),
+                                    'avg_volume': 1e6, 'day_high': 1, 'day_low': 1, 'previous_close': 1}
+                                for s in universe},
+                'overnight_news': {s: [{'title': f"{s} headline {n}", 'url': f"https://example.com/{s}/{n}"}]
+                                   for s in universe[:5]},
+                'alerts': [],
+                'generated_at': when.isoformat()
+            }
+            with open(os.path.join(snapshots, f"Market_Open_Brief_{when.strftime('%Y%m%d_%H%M')}.json"), 'w') as f:
+                json.dump(brief, f, indent=2)
+        json_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(snapshots, '*.json')))
+
+        start = time.perf_counter()
+        archive = BriefArchive(os.path.join(tmp, 'archive'))
+        imported, _ = archive.import_snapshots(snapshots)
+        import_seconds = time.perf_counter() - start
+        archive_bytes = os.path.getsize(archive.data_path) + os.path.getsize(os.path.join(archive.root, 'index.sqlite'))
+
+        start = time.perf_counter()
+        history = archive.symbol_history('RGTI', last=60)
+        index_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = []
+        for path in sorted(glob.glob(os.path.join(snapshots, '*.json')))[-60:]:
+            with open(path) as f:
+                brief = json.load(f)
+            scanned.append((brief['generated_at'], brief['market_data']['RGTI']['change_pct']))
+        scan_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        streamed = sum(1 for _ in archive.iter_briefs())
+        stream_seconds = time.perf_counter() - start
+        archive.close()
+        shutil.rmtree(snapshots)
+
+    assert [h[2] for h in history] == [s[1] for s in scanned]
+    print(f"BRIEF ARCHIVE BENCHMARK ({runs} briefs x {symbols} symbols)")
+    print("=" * 55)
+    print(f"Bulk import:             {import_seconds * 1000:8.1f}ms ({imported} runs)")
+    print(f"Disk: JSON files         {json_bytes / 1024:8.1f}KB")
+    print(f"Disk: archive + index    {archive_bytes / 1024:8.1f}KB")
+    print(f"RGTI last 60 (index):    {index_seconds * 1000:8.2f}ms")
+    print(f"RGTI last 60 (60 files): {scan_seconds * 1000:8.2f}ms")
+    print(f"Stream all {streamed} briefs:  {stream_seconds * 1000:8.1f}ms")
+
+def main():
+    """'import [DIR] [--remove]', 'history SYMBOL [N]', 'show [ID|latest]', 'stats' or 'benchmark'"""
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    args = [a for a in sys.argv[2:] if not a.startswith('--')]
+
+    if command == 'benchmark':
+        benchmark(*(int(n) for n in args[:2]))
+        return
+
+    archive = BriefArchive()
+    if command == 'import':
+        directory = args[0] if args else os.path.join(os.path.dirname(__file__), 'output')
+        imported, skipped = archive.import_snapshots(directory, remove='--remove' in sys.argv)
+        print(f"[OK] Archived {imported} snapshots ({skipped} skipped)")
+        print(archive.summary())
+    elif command == 'history' and args:
+        rows = archive.symbol_history(args[0], last=int(args[1]) if len(args) > 1 else 60)
+        if not rows:
+            print(f"No archived briefs mention {args[0].upper()}")
+        for generated_at, price, change_pct, volume, news in rows:
+            # Either column can be NULL (partial quote), so each is formatted on its own
+            price_text = f"${price:.2f}" if price is not None else "no price"
+            change_text = f"{change_pct:+.1f}%" if change_pct is not None else "n/a"
+            quote = f"{price_text} {change_text}" if price is not None or change_pct is not None else "no quote"
+            print(f"{generated_at[:16]} | {quote} | {news} news")
+    elif command == 'show':
+        brief = archive.latest() if not args or args[0] == 'latest' else archive.get(int(args[0]))
+        print(json.dumps(brief, indent=2) if brief else "[ERROR] No such brief")
+    elif command == 'stats':
+        print(archive.summary())
+    else:
+        print("Usage:")
+        print("  python brief_archive.py import [DIR] [--remove]")
+        print("  python brief_archive.py history SYMBOL [LAST_N]")
+        print("  python brief_archive.py show [RUN_ID|latest]")
+        print("  python brief_archive.py stats | benchmark [RUNS] [SYMBOLS]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Brief Renderer
+Single-pass market open brief formatting with bounded top-k selection and pre-compiled line templates
+"""
+
+import sys
+import time
+import heapq
+from datetime import datetime
+
+from news_index import group_articles
+
+# Brief selection criteria, shared with the universe scanner
+BIG_MOVE_PCT = 3
+HIGH_VOLUME_RATIO = 2
+
+# Pre-compiled line templates (bound str.format), filled once per line; the per-symbol
+# quote line is an inline f-string in render_brief, the cheapest form for the hot loop
+HEADER = "🌅 <b>MARKET OPEN BRIEF</b> 🌅\n<b>{}</b>\n\n🚨 <b>POSITION ALERTS</b>".format
+ALERT_LINE = "\n• {}".format
+NEWS_LINE = "\n• <b>{}</b>: {}".format
+MOVER_LINE = "\n• Biggest mover: {} ({:+.1f}%)".format
+HIGH_VOLUME_LINE = "\n• High volume: {}".format
+
+NO_ALERTS = "\n• All positions stable - no immediate alerts"
+PORTFOLIO_TITLE = "\n\n📊 <b>PORTFOLIO PRE-MARKET</b>"
+WATCHLIST_TITLE = "\n\n👀 <b>WATCHLIST</b>"
+NEWS_TITLE = "\n\n📰 <b>OVERNIGHT NEWS</b>"
+FOCUS_TITLE = "\n\n🎯 <b>TRADING FOCUS</b>"
+FOOTER = ("\n\n⏰ <b>Next Report:</b> 6:00 PM (Full EOD Analysis)"
+          "\n🎯 <b>Real-time alerts:</b> Active during trading hours")
+
+HIGH_VOL = " 🔥 HIGH VOL"
+ABOVE_AVG = " 📈 ABOVE AVG"
+
+def render_brief(portfolio, watchlist, market_data, overnight_news, alerts, now=None,
+                 big_move_pct=BIG_MOVE_PCT, high_volume_ratio=HIGH_VOLUME_RATIO, above_avg_ratio=1.5,
+                 movers=1, high_volume=3, stories=3):
+    """Market open brief text for Telegram
+
+    One pass over market_data computes every symbol's quote line and volume
+    ratio. The same pass keeps the `movers` largest moves in a bounded
+    min-heap, with ties going to the earlier symbol as a stable sort would.
+    It also keeps the first `high_volume` names above the volume ratio.
+    Sections are then joined from those precomputed pieces in portfolio
+    and watchlist order.
+    """
+    lines = {}
+    indicators = {}
+    mover_heap = []
+    high_volume_names = []
+
+    for seq, (symbol, data) in enumerate(market_data.items()):
+        change_pct = data['change_pct']
+        lines[symbol] = f"\n<b>{symbol}</b>: ${data['price']:.2f} {'📈' if change_pct >= 0 else '📉'}{change_pct:+.1f}%"
+
+        avg_volume = data['avg_volume']
+        if avg_volume > 0:
+            ratio = data['volume'] / avg_volume
+            if ratio > high_volume_ratio:
+                indicators[symbol] = HIGH_VOL
+                if len(high_volume_names) < high_volume:
+                    high_volume_names.append(symbol)
+            elif ratio > above_avg_ratio:
+                indicators[symbol] = ABOVE_AVG
+
+        move = abs(change_pct)
+        if move >= big_move_pct:
+            entry = (move, -seq, symbol, change_pct)
+            if len(mover_heap) < movers:
+                heapq.heappush(mover_heap, entry)
+            elif entry > mover_heap[0]:
+                heapq.heapreplace(mover_heap, entry)
+
+    parts = [HEADER((now or datetime.now()).strftime('%B %d, %Y • 9:30 AM ET'))]
+    if alerts:
+        parts.extend(ALERT_LINE(alert['message']) for alert in alerts)
+    else:
+        parts.append(NO_ALERTS)
+
+    parts.append(PORTFOLIO_TITLE)
+    parts.extend(lines[symbol] + indicators.get(symbol, '') for symbol in portfolio if symbol in lines)
+
+    parts.append(WATCHLIST_TITLE)
+    parts.extend(lines[symbol] for symbol in watchlist if symbol in lines)
+
+    if overnight_news:
+        parts.append(NEWS_TITLE)
+        # Stories shared by several tickers are listed once under all of them
+        for symbols, article in group_articles(overnight_news)[:stories]:
+            title = article.get('title', '')
+            parts.append(NEWS_LINE(', '.join(symbols), title[:60] + ('...' if len(title) > 60 else '')))
+
+    parts.append(FOCUS_TITLE)
+    if mover_heap:
+        _, _, symbol, change_pct = max(mover_heap)
+        parts.append(MOVER_LINE(symbol, change_pct))
+    if high_volume_names:
+        parts.append(HIGH_VOLUME_LINE(', '.join(high_volume_names)))
+
+    parts.append(FOOTER)
+    return ''.join(parts)
+
+def benchmark(watchlist_size=2000, runs=50):
+    """Time render_brief over a large synthetic watchlist"""
+    from stub_server import StubProviderServer
+    from quote_fetcher import QuoteFetcher
+
+    portfolio = ['RGTI', 'BBAI', 'LAES']
+    watchlist = [f"W{i:04d}" for i in range(watchlist_size)]
+    market_data = {s: QuoteFetcher.parse_quote(StubProviderServer.make_quote(s)) for s in portfolio + watchlist}
+    news = {s: StubProviderServer.make_articles(s) for s in portfolio + watchlist[:50]}
+    alerts = [{'message': f"⚠️ {s} at stop-loss level (-16.0% from entry)"} for s in portfolio]
+    now = datetime(2025, 6, 2, 9, 30)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        rendered = render_brief(portfolio, watchlist, market_data, news, alerts, now)
+    seconds = (time.perf_counter() - start) / runs
+
+    print(f"BRIEF RENDER BENCHMARK ({watchlist_size} watchlist symbols, {len(rendered):,} chars)")
+    print("=" * 55)
+    print(f"render_brief {seconds * 1000:8.2f}ms per render")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
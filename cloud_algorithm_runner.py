@@ -5,12 +5,18 @@ Runs the trading algorithm in GitHub Actions cloud environment
 
 import os
 import sys
-import json
-import urllib.request
-import urllib.parse
 import ssl
 from datetime import datetime
 
+from quote_fetcher import QuoteFetcher, FMP_BASE_URL
+from data_cache import DataCache
+from valuation import ValuationEngine
+from instrument_metadata import get_metadata_store, sector_exposure
+from price_history import HistoryStore
+from telegram_client import TelegramClient
+from run_metrics import RunMetrics
+from simple_portfolio import load_saved_portfolio
+
 class CloudAlgorithmRunner:
     def __init__(self):
         # Get credentials from environment (GitHub Secrets)
@@ -21,49 +27,72 @@ class CloudAlgorithmRunner:
             print("ERROR: Missing Telegram credentials in environment")
             sys.exit(1)
 
+        # Optional market data (positions are valued at cost without it)
+        self.fmp_api_key = os.environ.get('FMP_API_KEY')
+        self.fmp_base_url = os.environ.get('FMP_BASE_URL', FMP_BASE_URL)
+
         # SSL context for HTTPS requests
         self.ssl_context = ssl.create_default_context()
+        self.telegram = TelegramClient(self.bot_token, self.chat_id, ssl_context=self.ssl_context)
 
-    def send_telegram_message(self, message):
-        """Send message to Telegram"""
-        try:
-            data = urllib.parse.urlencode({
-                'chat_id': self.chat_id,
-                'text': message,
-                'parse_mode': 'HTML'
-            }).encode('utf-8')
+        # Per-run stage/HTTP metrics; profiling is opt-in via METRICS_PROFILE
+        self.metrics_dir = os.path.join(os.path.dirname(__file__), 'output', 'metrics')
+        self.timing_footer = True
 
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            req = urllib.request.Request(url, data=data)
+        # Sector / risk / thesis per symbol, indexed once from the data file
+        self.metadata = get_metadata_store(os.path.join(os.path.dirname(__file__), 'instrument_metadata.json'))
 
-            with urllib.request.urlopen(req, context=self.ssl_context, timeout=15) as response:
-                result = json.loads(response.read().decode())
+        # Quote cache shared with MarketOpenBrief
+        self.cache = DataCache(
+            os.path.join(os.path.dirname(__file__), 'cache', 'market_data.sqlite'),
+            ttls={'quote': 60}
+        )
 
-            if result.get('ok'):
-                print("[OK] Telegram message sent successfully")
-                return True
-            else:
-                print(f"[ERROR] Telegram error: {result}")
-                return False
+        # Daily OHLCV bars appended from each quote fetch (drawdown / volatility per position)
+        self.history = HistoryStore(os.path.join(os.path.dirname(__file__), 'cache', 'history'))
 
-        except Exception as e:
-            print(f"[ERROR] Failed to send Telegram message: {e}")
+    def send_telegram_message(self, message):
+        """Send message to Telegram"""
+        if self.telegram.send_message(message):
+            print("[OK] Telegram message sent successfully")
+            return True
+        else:
+            print("[ERROR] Failed to send Telegram message")
             return False
 
     def load_portfolio(self):
-        """Load current portfolio"""
-        portfolio_file = 'portfolio_data/current_portfolio.json'
+        """Load current portfolio from the configured backend (PORTFOLIO_BACKEND=file or sqlite)"""
+        try:
+            portfolio = load_saved_portfolio()
+        except Exception as e:
+            print(f"[WARNING] Error loading portfolio: {e}")
+            return None
+
+        if portfolio is None:
+            print("[WARNING] No portfolio file found")
+        return portfolio
+
+    def get_market_prices(self, symbols):
+        """Get current prices for symbols, served from the shared cache when fresh"""
+        if not self.fmp_api_key or not symbols:
+            return {}
+
+        fetcher = QuoteFetcher(
+            self.fmp_api_key,
+            base_url=self.fmp_base_url,
+            ssl_context=self.ssl_context,
+            cache=self.cache
+        )
+        quotes = fetcher.fetch_quotes(symbols)
+        print(f"[INFO] {self.cache.summary()}")
+        print(f"[INFO] {fetcher.http.summary()}")
 
-        if os.path.exists(portfolio_file):
-            try:
-                with open(portfolio_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"[WARNING] Error loading portfolio: {e}")
-                return None
+        try:
+            self.history.append_quotes(quotes)
+        except Exception as e:
+            print(f"[WARNING] Could not record price history: {e}")
 
-        print("[WARNING] No portfolio file found")
-        return None
+        return {symbol: quote['price'] for symbol, quote in quotes.items() if quote.get('price')}
 
     def analyze_positions(self, portfolio):
         """Analyze portfolio positions and generate insights"""
@@ -71,70 +100,48 @@ class CloudAlgorithmRunner:
             return "No portfolio data available for analysis"
 
         analysis_results = []
-        total_value = 0
         cash_balance = portfolio.get('CASH', {}).get('balance', 0)
 
-        # Analyze each position
-        for symbol, data in portfolio.items():
-            if symbol in ['CASH', 'last_updated']:
-                continue
+        symbols = [s for s in portfolio.keys() if s not in ['CASH', 'last_updated']]
+        prices = self.get_market_prices(symbols)
 
+        # Analyze each position
+        for symbol in symbols:
+            data = portfolio[symbol]
             shares = data.get('shares', 0)
             avg_cost = data.get('avg_cost', 0)
             invested = data.get('total_invested', 0)
-            total_value += invested
 
             # Generate basic analysis for each position
             position_analysis = self.get_position_analysis(symbol, shares, avg_cost, invested)
             if position_analysis:
                 analysis_results.append(position_analysis)
 
-        total_value += cash_balance
+        # Mark to market in one vectorized pass; unquoted positions are carried at cost
+        sectors = self.metadata.sectors_for(symbols)
+        valuation = ValuationEngine(portfolio, sectors).value(prices)
+        index = {symbol: i for i, symbol in enumerate(valuation['symbols'])}
+
+        for pos in analysis_results:
+            i = index[pos['symbol']]
+            pos['current_price'] = float(valuation['prices'][i]) if valuation['priced'][i] else None
+            pos['market_value'] = float(valuation['market_value'][i])
+            pos['unrealized_pnl'] = float(valuation['unrealized_pnl'][i])
+            pos['weight'] = float(valuation['weights'][i])
+            pos['risk'] = self.history.risk(pos['symbol'])
 
         return {
-            'total_value': total_value,
+            'total_value': valuation['total_value'],
             'cash_balance': cash_balance,
+            'unrealized_pnl': valuation['total_unrealized_pnl'],
+            'sector_totals': valuation['sector_totals'],
             'position_analyses': analysis_results,
-            'portfolio_health': self.assess_portfolio_health(portfolio)
+            'portfolio_health': self.assess_portfolio_health(valuation['sector_totals'])
         }
 
     def get_position_analysis(self, symbol, shares, avg_cost, invested):
         """Get analysis for individual position"""
-
-        # Position-specific insights based on our trading strategy
-        position_insights = {
-            'RGTI': {
-                'sector': 'Quantum Computing',
-                'risk_level': 'HIGH',
-                'thesis': 'Pure-play quantum leader with IBM partnership',
-                'watch_for': 'Quantum advantage demonstrations, R&D partnerships'
-            },
-            'QUBT': {
-                'sector': 'Quantum Computing',
-                'risk_level': 'HIGH',
-                'thesis': 'Breakthrough photonic quantum technology',
-                'watch_for': 'Room-temperature quantum developments, commercial partnerships'
-            },
-            'IONQ': {
-                'sector': 'Quantum Computing',
-                'risk_level': 'MEDIUM-HIGH',
-                'thesis': 'Trapped-ion quantum with cloud revenue validation',
-                'watch_for': 'Cloud quantum service adoption, enterprise partnerships'
-            },
-            'BBAI': {
-                'sector': 'Defense AI',
-                'risk_level': 'MEDIUM',
-                'thesis': 'Stable defense contractor with government contracts',
-                'watch_for': 'Defense spending, margin improvement, new contracts'
-            }
-        }
-
-        insight = position_insights.get(symbol, {
-            'sector': 'Unknown',
-            'risk_level': 'MEDIUM',
-            'thesis': 'Position under analysis',
-            'watch_for': 'Market developments, earnings updates'
-        })
+        insight = self.metadata.get(symbol)
 
         return {
             'symbol': symbol,
@@ -147,30 +154,16 @@ class CloudAlgorithmRunner:
             'watch_for': insight['watch_for']
         }
 
-    def assess_portfolio_health(self, portfolio):
-        """Assess overall portfolio health"""
-
-        # Count positions by sector
-        quantum_positions = 0
-        defense_positions = 0
-        total_positions = 0
-
-        for symbol, data in portfolio.items():
-            if symbol in ['CASH', 'last_updated']:
-                continue
-            total_positions += 1
-            if symbol in ['RGTI', 'QUBT', 'IONQ']:
-                quantum_positions += 1
-            elif symbol in ['BBAI']:
-                defense_positions += 1
-
-        quantum_concentration = (quantum_positions / total_positions * 100) if total_positions > 0 else 0
-
-        if quantum_concentration > 70:
-            health_status = "HIGH QUANTUM CONCENTRATION"
-            recommendation = "Monitor quantum sector developments closely"
-        elif quantum_concentration > 50:
-            health_status = "QUANTUM FOCUSED"
+    def assess_portfolio_health(self, sector_totals):
+        """Assess overall portfolio health from value-weighted sector exposure"""
+        exposure = sector_exposure(sector_totals)
+        top_sector, top_pct = next(iter(exposure.items()), ('None', 0.0))
+
+        if top_pct > 70:
+            health_status = f"HIGH {top_sector.upper()} CONCENTRATION"
+            recommendation = f"Monitor {top_sector.lower()} sector developments closely"
+        elif top_pct > 50:
+            health_status = f"{top_sector.upper()} FOCUSED"
             recommendation = "Good sector positioning with diversification opportunity"
         else:
             health_status = "DIVERSIFIED"
@@ -178,7 +171,9 @@ class CloudAlgorithmRunner:
 
         return {
             'status': health_status,
-            'quantum_exposure': f"{quantum_concentration:.0f}%",
+            'quantum_exposure': f"{exposure.get('Quantum Computing', 0):.0f}%",
+            'sector_exposure': exposure,
+            'top_sector': top_sector,
             'recommendation': recommendation
         }
 
@@ -198,23 +193,60 @@ class CloudAlgorithmRunner:
 
     def run_algorithm_analysis(self):
         """Run the main algorithm analysis"""
+        with RunMetrics('eod_analysis', self.metrics_dir, cache=self.cache) as metrics:
+            success = self.run_eod_analysis(metrics)
+
+        print(f"[INFO] Run metrics saved: {metrics.write()}")
+        return success
+
+    def run_eod_analysis(self, metrics):
+        """EOD pipeline with each stage wrapped in a metrics span"""
 
         print("[INFO] Starting GitHub Actions algorithm analysis...")
 
         # Load portfolio
-        portfolio = self.load_portfolio()
+        with metrics.span('load_portfolio'):
+            portfolio = self.load_portfolio()
 
         # Analyze portfolio
-        analysis = self.analyze_positions(portfolio)
+        with metrics.span('analyze'):
+            analysis = self.analyze_positions(portfolio)
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M UTC')
 
+        with metrics.span('format') as span:
+            message = self.format_eod_report(analysis, current_time)
+            span.set(chars=len(message))
+
+        if self.timing_footer:
+            message += f"\n<i>{metrics.footer()}</i>"
+
+        # Send message
+        with metrics.span('telegram'):
+            success = self.send_telegram_message(message)
+
+        if success:
+            print("[OK] EOD analysis completed successfully")
+        else:
+            print("[ERROR] EOD analysis failed - Telegram delivery error")
+
+        return success
+
+    def format_eod_report(self, analysis, current_time):
+        """Build the EOD Telegram report from analyze_positions output"""
         if isinstance(analysis, dict):
             # Generate detailed analysis message
             positions_summary = ""
             for pos in analysis['position_analyses']:
-                positions_summary += f"• {pos['symbol']}: {pos['shares']:.1f} shares @ ${pos['avg_cost']:.2f} ({pos['risk_level']})\n"
+                positions_summary += f"• {pos['symbol']}: {pos['shares']:.1f} shares @ ${pos['avg_cost']:.2f} ({pos['risk_level']})"
+                risk = pos.get('risk')
+                if risk and risk['bars'] >= 5:
+                    positions_summary += f" | DD {risk['max_drawdown']:.0f}% Vol {risk['volatility']:.0f}%"
+                positions_summary += "\n"
 
             market_insights = self.generate_market_insights()
+            sector_summary = " • ".join(
+                f"{sector} {pct:.0f}%" for sector, pct in list(analysis['portfolio_health']['sector_exposure'].items())[:3]
+            ) or "No positions"
 
             message = f"""🤖 <b>GITHUB ACTIONS EOD ANALYSIS</b>
 
@@ -224,7 +256,7 @@ class CloudAlgorithmRunner:
 
 🧠 <b>Portfolio Health:</b>
 Status: {analysis['portfolio_health']['status']}
-Quantum Exposure: {analysis['portfolio_health']['quantum_exposure']}
+Sector Exposure: {sector_summary}
 
 📈 <b>Market Insights:</b>
 {market_insights}
@@ -261,34 +293,22 @@ Quantum Exposure: {analysis['portfolio_health']['quantum_exposure']}
 <i>Upload portfolio_data/current_portfolio.json to enable full analysis</i>
 <i>📱 Automated monitoring active</i>"""
 
-        # Send message
-        success = self.send_telegram_message(message)
-
-        if success:
-            print("[OK] EOD analysis completed successfully")
-        else:
-            print("[ERROR] EOD analysis failed - Telegram delivery error")
-
-        return success
+        return message
 
 def main():
-    """Main execution function"""
+    """Main execution function; returns True if the analysis ran and was delivered"""
     try:
         runner = CloudAlgorithmRunner()
-        success = runner.run_algorithm_analysis()
-
-        if not success:
-            sys.exit(1)
+        return runner.run_algorithm_analysis()
 
     except Exception as e:
         print(f"[ERROR] Critical error in cloud algorithm runner: {e}")
 
         # Try to send error notification
         try:
-            bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-            chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+            telegram = TelegramClient.from_env(timeout=10, max_retries=2)
 
-            if bot_token and chat_id:
+            if telegram:
                 error_message = f"""🚨 <b>GITHUB ACTIONS ERROR</b>
 
 ❌ <b>Error:</b> Cloud algorithm runner failed
@@ -297,23 +317,15 @@ def main():
 
 <i>Check GitHub Actions logs for full details</i>"""
 
-                ssl_context = ssl.create_default_context()
-                data = urllib.parse.urlencode({
-                    'chat_id': chat_id,
-                    'text': error_message,
-                    'parse_mode': 'HTML'
-                }).encode('utf-8')
-
-                url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-                req = urllib.request.Request(url, data=data)
-
-                with urllib.request.urlopen(req, context=ssl_context, timeout=10) as response:
+                if telegram.send_message(error_message):
                     print("[OK] Error notification sent to Telegram")
+                else:
+                    print("[ERROR] Could not send error notification")
 
         except:
             print("[ERROR] Could not send error notification")
 
-        sys.exit(1)
+        return False
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file
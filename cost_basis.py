@@ -0,0 +1,331 @@
+"""
+Cost Basis
+Per-symbol tax lots with FIFO, LIFO or specific-ID matching and running realized/unrealized P&L
+"""
+
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+METHODS = ('FIFO', 'LIFO', 'SPECIFIC')
+
+# Share quantities below this are treated as zero (float remainders from percentage sells)
+SHARE_EPSILON = 1e-9
+
+class LotQueue:
+    """Open lots of one symbol in parallel arrays, oldest first
+
+    Fully consumed lots are zeroed in place. FIFO advances `head` past them
+    and LIFO pops them off the end, so a sell touches only the lots it
+    consumes. The dead prefix is dropped once it outgrows the live lots.
+    Open shares, open cost and realized P&L are kept as running totals.
+    """
+
+    __slots__ = ('ids', 'shares', 'prices', 'dates', 'head', 'open_shares', 'open_cost', 'realized')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.shares = array('d')
+        self.prices = array('d')
+        self.dates = []
+        self.head = 0
+        self.open_shares = 0.0
+        self.open_cost = 0.0
+        self.realized = 0.0
+
+    def __len__(self):
+        return len(self.ids) - self.head
+
+    def add(self, lot_id, shares, price, date):
+        self.ids.append(lot_id)
+        self.shares.append(shares)
+        self.prices.append(price)
+        self.dates.append(date)
+        self.open_shares += shares
+        self.open_cost += shares * price
+
+    def consume(self, i, quantity, price, fills):
+        """Take up to `quantity` shares from lot i at sale `price`; returns shares taken
+
+        Appends (lot_id, shares taken, lot price, shares left, lot date) to `fills`.
+        """
+        take = min(quantity, self.shares[i])
+        remaining = self.shares[i] - take
+        if remaining <= SHARE_EPSILON:
+            take = self.shares[i]
+            remaining = 0.0
+        self.shares[i] = remaining
+
+        cost = take * self.prices[i]
+        self.open_shares -= take
+        self.open_cost -= cost
+        self.realized += take * price - cost
+        fills.append((self.ids[i], take, self.prices[i], remaining, self.dates[i]))
+        return take
+
+    def sell(self, quantity, price, method='FIFO', lot_ids=None):
+        """Match `quantity` shares against open lots; returns the fills (see consume)"""
+        if quantity - self.open_shares > SHARE_EPSILON:
+            raise ValueError(f"selling {quantity:.6f} shares but only {self.open_shares:.6f} are open")
+
+        fills = []
+        if method == 'FIFO':
+            i = self.head
+            while quantity > SHARE_EPSILON and i < len(self.ids):
+                if self.shares[i] > 0:
+                    quantity -= self.consume(i, quantity, price, fills)
+                i += 1
+        elif method == 'LIFO':
+            i = len(self.ids) - 1
+            while quantity > SHARE_EPSILON and i >= self.head:
+                if self.shares[i] > 0:
+                    quantity -= self.consume(i, quantity, price, fills)
+                i -= 1
+        elif method == 'SPECIFIC':
+            if not lot_ids:
+                raise ValueError("specific-ID sells need lot ids")
+            if len(set(lot_ids)) != len(lot_ids):
+                raise ValueError(f"lot ids {list(lot_ids)} repeat a lot")
+            # Every check runs before the first lot is consumed, so a rejected sell changes nothing
+            indexes = []
+            for lot_id in lot_ids:
+                i = bisect_left(self.ids, lot_id, self.head)
+                if i == len(self.ids) or self.ids[i] != lot_id or self.shares[i] <= 0:
+                    raise ValueError(f"lot {lot_id} is not open")
+                indexes.append(i)
+            if quantity - sum(self.shares[i] for i in indexes) > SHARE_EPSILON:
+                raise ValueError(f"lots {list(lot_ids)} hold fewer shares than the sell")
+            for i in indexes:
+                if quantity <= SHARE_EPSILON:
+                    break
+                quantity -= self.consume(i, quantity, price, fills)
+        else:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+
+        self.trim()
+        return fills
+
+    def trim(self):
+        """Drop consumed lots from both ends and reset totals once the position is flat"""
+        while self.head < len(self.ids) and self.shares[self.head] <= 0:
+            self.head += 1
+        while len(self.ids) > self.head and self.shares[-1] <= 0:
+            for column in (self.ids, self.shares, self.prices, self.dates):
+                column.pop()
+
+        if self.head > 64 and self.head * 2 > len(self.ids):
+            for name in ('ids', 'shares', 'prices', 'dates'):
+                setattr(self, name, getattr(self, name)[self.head:])
+            self.head = 0
+
+        if self.open_shares <= SHARE_EPSILON or len(self) == 0:
+            self.open_shares = 0.0
+            self.open_cost = 0.0
+
+    def unrealized(self, price):
+        return self.open_shares * price - self.open_cost
+
+    def open_lots(self):
+        """[(lot_id, shares, price, date)] for lots still holding shares"""
+        return [(self.ids[i], self.shares[i], self.prices[i], self.dates[i])
+                for i in range(self.head, len(self.ids)) if self.shares[i] > 0]
+
+    def copy(self):
+        clone = LotQueue()
+        clone.ids = self.ids[self.head:]
+        clone.shares = self.shares[self.head:]
+        clone.prices = self.prices[self.head:]
+        clone.dates = self.dates[self.head:]
+        clone.open_shares = self.open_shares
+        clone.open_cost = self.open_cost
+        clone.realized = self.realized
+        return clone
+
+class LotBook:
+    """Lot queues for every symbol plus the default matching method
+
+    begin()/rollback() snapshot only the symbols touched in between, so an
+    all-or-nothing batch costs O(lots of the symbols it trades).
+    `changes` maps every lot opened or partly/fully closed since the last
+    save to its new (symbol, shares, price, date), or None once closed, so
+    storage can write just those rows.
+    """
+
+    def __init__(self, method='FIFO'):
+        method = method.upper()
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+        self.method = method
+        self.queues = {}
+        self.next_id = 1
+        self.dirty = set()
+        self.changes = {}
+        self.reset_symbols = set()
+        self.undo = None
+        self.saved = None
+
+    # ---- state -----------------------------------------------------------
+
+    def queue(self, symbol):
+        if self.undo is not None and symbol not in self.undo:
+            existing = self.queues.get(symbol)
+            self.undo[symbol] = existing.copy() if existing is not None else None
+        self.dirty.add(symbol)
+        return self.queues.setdefault(symbol, LotQueue())
+
+    def begin(self):
+        self.undo = {}
+        self.saved = (self.next_id, set(self.dirty), dict(self.changes))
+
+    def rollback(self):
+        if self.undo is None:
+            return
+        for symbol, queue in self.undo.items():
+            if queue is None:
+                self.queues.pop(symbol, None)
+            else:
+                self.queues[symbol] = queue
+        self.next_id, self.dirty, self.changes = self.saved
+        self.undo = None
+
+    def commit(self):
+        self.undo = None
+
+    def mark_saved(self):
+        """Forget pending changes once storage has written them"""
+        self.dirty.clear()
+        self.changes.clear()
+        self.reset_symbols.clear()
+
+    # ---- trading ---------------------------------------------------------
+
+    def buy(self, symbol, shares, price, date):
+        """Open a new lot; returns its id"""
+        lot_id = self.next_id
+        self.next_id += 1
+        self.queue(symbol).add(lot_id, shares, price, date)
+        self.changes[lot_id] = (symbol, shares, price, date)
+        return lot_id
+
+    def sell(self, symbol, shares, price, method=None, lot_ids=None):
+        """Close shares against open lots; returns a fill summary with realized P&L"""
+        if symbol not in self.queues:
+            raise ValueError(f"no open lots for {symbol}")
+        method = (method or self.method).upper()
+        queue = self.queue(symbol)
+
+        realized_before = queue.realized
+        fills = queue.sell(shares, price, method, lot_ids)
+        for lot_id, _, lot_price, remaining, date in fills:
+            self.changes[lot_id] = (symbol, remaining, lot_price, date) if remaining > 0 else None
+
+        cost = sum(take * lot_price for _, take, lot_price, _, _ in fills)
+        return {
+            'method': method,
+            'shares': sum(take for _, take, _, _, _ in fills),
+            'cost_basis': cost,
+            'realized_pnl': queue.realized - realized_before,
+            'remaining_shares': queue.open_shares,
+            'remaining_cost': queue.open_cost,
+            'fills': fills
+        }
+
+    def position(self, symbol):
+        queue = self.queues.get(symbol)
+        if queue is None or queue.open_shares <= 0:
+            return None
+        return {'shares': queue.open_shares, 'avg_cost': queue.open_cost / queue.open_shares,
+                'total_invested': queue.open_cost}
+
+    def realized_pnl(self, symbol=None):
+        if symbol is not None:
+            queue = self.queues.get(symbol)
+            return queue.realized if queue is not None else 0.0
+        return sum(queue.realized for queue in self.queues.values())
+
+    def unrealized_pnl(self, prices):
+        """{symbol: unrealized P&L} for the symbols with a price"""
+        return {symbol: queue.unrealized(prices[symbol])
+                for symbol, queue in self.queues.items() if symbol in prices and queue.open_shares > 0}
+
+    # ---- persistence -----------------------------------------------------
+
+    def reconcile(self, portfolio, reserved=('CASH', 'last_updated')):
+        """Align lots with the portfolio's share counts without replaying history
+
+        Positions with no lots (or whose share count was changed outside this
+        book) are reset to a single opening lot at their average cost.
+        """
+        reset = []
+        for symbol, data in portfolio.items():
+            if symbol in reserved:
+                continue
+            queue = self.queues.get(symbol)
+            if queue is None or abs(queue.open_shares - data['shares']) > 1e-6:
+                self.reset(symbol)
+                self.buy(symbol, data['shares'], data['avg_cost'], portfolio.get('last_updated') or '')
+                reset.append(symbol)
+
+        for symbol, queue in list(self.queues.items()):
+            if symbol not in portfolio and queue.open_shares > 0:
+                self.reset(symbol)
+                reset.append(symbol)
+        return reset
+
+    def reset(self, symbol):
+        """Drop a symbol's open lots, keeping its realized P&L"""
+        old = self.queues.get(symbol)
+        queue = LotQueue()
+        queue.realized = old.realized if old is not None else 0.0
+        self.queues[symbol] = queue
+        if symbol in self.dirty:
+            # Pending writes for the old lots are superseded by the symbol-wide delete
+            self.changes = {k: v for k, v in self.changes.items() if v is None or v[0] != symbol}
+        self.dirty.add(symbol)
+        self.reset_symbols.add(symbol)
+
+    def to_dict(self):
+        return {
+            'method': self.method,
+            'next_id': self.next_id,
+            'symbols': {
+                symbol: {'realized': queue.realized, 'lots': [list(lot) for lot in queue.open_lots()]}
+                for symbol, queue in self.queues.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data, method=None):
+        book = cls(method or data.get('method', 'FIFO'))
+        book.next_id = data.get('next_id', 1)
+        for symbol, entry in data.get('symbols', {}).items():
+            queue = LotQueue()
+            for lot_id, shares, price, date in entry.get('lots', []):
+                queue.add(lot_id, shares, price, date)
+            queue.realized = entry.get('realized', 0.0)
+            book.queues[symbol] = queue
+        return book
+
+def benchmark(lot_counts=(10, 1_000, 100_000), sells=2_000):
+    """Per-sell latency as the number of DCA lots per symbol grows"""
+    print("COST BASIS BENCHMARK (small sells against a deep lot queue)")
+    print("=" * 60)
+    for lots in lot_counts:
+        for method in ('FIFO', 'LIFO'):
+            book = LotBook(method)
+            for i in range(lots):
+                book.buy('DCA', 10.0, 5.0 + (i % 50) * 0.1, '2025-01-01')
+
+            start = time.perf_counter()
+            for _ in range(min(sells, lots * 10)):
+                book.sell('DCA', 1.0, 7.5)
+            per_sell = (time.perf_counter() - start) / min(sells, lots * 10)
+            print(f"{lots:>9,} lots | {method:<4} | {per_sell * 1e6:7.2f}us per sell | "
+                  f"realized ${book.realized_pnl():,.2f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        benchmark([int(n) for n in sys.argv[1:]])
+    else:
+        benchmark()
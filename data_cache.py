@@ -0,0 +1,136 @@
+"""
+Market Data Cache
+Persistent TTL + LRU cache for provider quotes and news, shared across entry points
+"""
+
+import os
+import json
+import time
+import sqlite3
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'market_data.sqlite')
+
+# Seconds each data type stays fresh
+DEFAULT_TTLS = {
+    'quote': 60,
+    'news': 15 * 60
+}
+
+class DataCache:
+    """On-disk cache keyed by (provider, symbol, endpoint) with per-type TTL and LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None, max_entries=20000):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                provider TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (provider, symbol, endpoint)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self.conn.commit()
+
+    def get(self, provider, symbol, endpoint, data_type):
+        """Return the cached payload if it is within its TTL, else None"""
+        value = self.lookup(provider, symbol, endpoint, data_type)
+        self.conn.commit()
+        return value
+
+    def lookup(self, provider, symbol, endpoint, data_type):
+        """Uncommitted lookup; callers batch the LRU touch into one commit"""
+        row = self.conn.execute(
+            "SELECT payload, stored_at FROM entries WHERE provider=? AND symbol=? AND endpoint=?",
+            (provider, symbol, endpoint)
+        ).fetchone()
+
+        now = time.time()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+
+        payload, stored_at = row
+        if now - stored_at > self.ttls.get(data_type, 0):
+            self.stats['misses'] += 1
+            self.stats['expired'] += 1
+            return None
+
+        self.conn.execute(
+            "UPDATE entries SET accessed_at=? WHERE provider=? AND symbol=? AND endpoint=?",
+            (now, provider, symbol, endpoint)
+        )
+        self.stats['hits'] += 1
+        return json.loads(payload)
+
+    def get_many(self, provider, symbols, endpoint, data_type):
+        """Look up several symbols; returns (hits dict, list of missing symbols)"""
+        hits = {}
+        missing = []
+        for symbol in symbols:
+            value = self.lookup(provider, symbol, endpoint, data_type)
+            if value is None:
+                missing.append(symbol)
+            else:
+                hits[symbol] = value
+        self.conn.commit()
+        return hits, missing
+
+    def put(self, provider, symbol, endpoint, data_type, payload):
+        self.put_many(provider, {symbol: payload}, endpoint, data_type)
+
+    def put_many(self, provider, payloads, endpoint, data_type):
+        """Store {symbol: payload} in one transaction, then enforce the size bound"""
+        if not payloads:
+            return
+
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(provider, symbol, endpoint, data_type, json.dumps(payload, default=str), now, now)
+             for symbol, payload in payloads.items()]
+        )
+        self.stats['writes'] += len(payloads)
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        """Drop least-recently-used entries beyond max_entries"""
+        count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM entries WHERE rowid IN "
+                "(SELECT rowid FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,)
+            )
+            self.stats['evictions'] += excess
+
+    def clear(self):
+        self.conn.execute("DELETE FROM entries")
+        self.conn.commit()
+
+    def summary(self):
+        """One-line hit/miss summary for progress output"""
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        rate = (s['hits'] / lookups * 100) if lookups else 0
+        return (f"Cache: {s['hits']} hits, {s['misses']} misses ({rate:.0f}% hit rate), "
+                f"{s['writes']} writes, {s['evictions']} evictions")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,114 @@
+"""
+Instrument Metadata
+Sector, risk level, thesis and watch-for per symbol, indexed by symbol and by sector
+"""
+
+import os
+import sys
+import json
+import time
+
+DEFAULT_METADATA_FILE = os.path.join(os.path.dirname(__file__), 'instrument_metadata.json')
+
+FIELDS = ['sector', 'risk_level', 'thesis', 'watch_for']
+
+class MetadataStore:
+    """In-memory metadata index built once from the data file
+
+    Symbols missing from the file resolve to the shared defaults record, so
+    lookups never build anything per call.
+    """
+
+    def __init__(self, instruments, defaults=None):
+        self.defaults = {field: (defaults or {}).get(field, '') for field in FIELDS}
+        self.by_symbol = {}
+        self.by_sector = {}
+        for symbol, record in instruments.items():
+            symbol = symbol.upper()
+            entry = {field: record.get(field, self.defaults[field]) for field in FIELDS}
+            self.by_symbol[symbol] = entry
+            self.by_sector.setdefault(entry['sector'], []).append(symbol)
+
+    @classmethod
+    def load(cls, path=DEFAULT_METADATA_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('instruments', {}), config.get('defaults'))
+
+    def __len__(self):
+        return len(self.by_symbol)
+
+    def get(self, symbol):
+        """Metadata record for a symbol (the defaults for unknown symbols); do not mutate"""
+        return self.by_symbol.get(symbol.upper(), self.defaults)
+
+    def sector_of(self, symbol):
+        return self.get(symbol)['sector']
+
+    def sectors_for(self, symbols):
+        """{symbol: sector} for a batch of symbols"""
+        return {symbol: self.sector_of(symbol) for symbol in symbols}
+
+    def symbols_in(self, sector):
+        return list(self.by_sector.get(sector, []))
+
+    def sectors(self):
+        return sorted(self.by_sector)
+
+_stores = {}
+
+def get_metadata_store(path=DEFAULT_METADATA_FILE):
+    """Shared store for a metadata file, reloaded only when the file changes"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        print(f"[WARNING] Instrument metadata not found: {path}")
+        return MetadataStore({})
+
+    cached = _stores.get(path)
+    if cached is None or cached[0] != mtime:
+        _stores[path] = (mtime, MetadataStore.load(path))
+    return _stores[path][1]
+
+def sector_exposure(sector_totals):
+    """Value-weighted exposure (percent of position value) per sector, largest first"""
+    total = sum(sector_totals.values())
+    if total <= 0:
+        return {}
+    ranked = sorted(sector_totals.items(), key=lambda item: item[1], reverse=True)
+    return {sector: value / total * 100 for sector, value in ranked}
+
+def benchmark(symbol_count=10_000, lookups=100):
+    """Time loading a large metadata file and per-run lookups over the whole universe"""
+    import tempfile
+
+    sectors = ['Quantum Computing', 'Defense AI', 'Biotech', 'Space', 'Fintech', 'Energy']
+    instruments = {
+        f"S{i:05d}": {'sector': sectors[i % len(sectors)], 'risk_level': 'HIGH' if i % 3 else 'MEDIUM',
+                      'thesis': f"Synthetic thesis {i}", 'watch_for': f"Synthetic catalyst {i}"}
+        for i in range(symbol_count)
+    }
+    symbols = list(instruments)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'instrument_metadata.json')
+        with open(path, 'w') as f:
+            json.dump({'instruments': instruments}, f)
+
+        start = time.perf_counter()
+        store = get_metadata_store(path)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(lookups):
+            get_metadata_store(path).sectors_for(symbols)
+        lookup_seconds = (time.perf_counter() - start) / lookups
+
+    print(f"INSTRUMENT METADATA BENCHMARK ({symbol_count:,} symbols)")
+    print("=" * 50)
+    print(f"Load + index:        {load_seconds * 1000:8.2f}ms (once per process)")
+    print(f"Sector map per run:  {lookup_seconds * 1000:8.2f}ms")
+    print(f"Sectors indexed:     {len(store.sectors())}")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
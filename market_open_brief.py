@@ -4,21 +4,37 @@ Specialized 9:30 AM report focused on overnight developments and trading opportu
 """
 
 import os
+import sys
 import csv
-import json
-import urllib.request
-import urllib.parse
 import ssl
-from datetime import datetime, timedelta
-import time
+from datetime import datetime, timedelta, timezone
+
+from quote_fetcher import QuoteFetcher, FMP_BASE_URL
+from news_scanner import NewsScanner, NEWSAPI_BASE_URL, get_rate_limiter
+from data_cache import DataCache
+from provider_http import get_http_client
+from news_index import NewsIndex
+from alert_rules import AlertEngine
+from price_history import HistoryStore
+from brief_archive import BriefArchive
+from brief_renderer import render_brief
+from universe_scanner import UniverseScanner, EXCHANGES, MICROCAP_MAX, format_candidates, peak_rss_mb
+from telegram_client import TelegramClient
+from run_metrics import RunMetrics
 
 class MarketOpenBrief:
-    """Generate focused market open intelligence brief"""
+    """Generate focused market open intelligence brief
 
-    def __init__(self):
+    `cache_dir` (quote/news caches, HTTP bodies, price history) and
+    `output_dir` (briefs, metrics, archive) default to cache/ and output/
+    next to this module.
+    """
+
+    def __init__(self, cache_dir=None, output_dir=None):
         self.base_dir = os.path.dirname(__file__)
         self.data_dir = os.path.join(self.base_dir, 'data')
-        self.output_dir = os.path.join(self.base_dir, 'output')
+        self.output_dir = output_dir or os.path.join(self.base_dir, 'output')
+        self.cache_dir = cache_dir or os.path.join(self.base_dir, 'cache')
 
         # Telegram configuration
         self.telegram_config = {
@@ -36,6 +52,35 @@ class MarketOpenBrief:
         # Watchlist for quick monitoring
         self.watchlist = ['ARQQ', 'IONQ', 'INOD', 'RKLB']
 
+        # Alert rule table (thresholds and per-symbol overrides)
+        self.alert_rules_file = os.path.join(self.base_dir, 'alert_rules.json')
+        self.alert_engine = AlertEngine.load(self.alert_rules_file)
+
+        # Quote fetch configuration (base URL can point at a local stub server)
+        self.quote_config = {
+            'base_url': os.environ.get('FMP_BASE_URL', FMP_BASE_URL),
+            'batch_size': 50,
+            'max_workers': 4,
+            'timeout': 10
+        }
+
+        # News scan configuration: NewsAPI token bucket and in-flight cap
+        self.news_config = {
+            'base_url': os.environ.get('NEWSAPI_BASE_URL', NEWSAPI_BASE_URL),
+            'rate_per_sec': 5.0,
+            'burst': 5,
+            'max_in_flight': 8,
+            'timeout': 10
+        }
+
+        # Scanner mode: whole-exchange listings streamed and filtered by the brief's criteria
+        self.scan_config = {
+            'exchanges': list(EXCHANGES),
+            'max_market_cap': MICROCAP_MAX,
+            'top_n': 20,
+            'timeout': 60
+        }
+
         # SSL context
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.check_hostname = False
@@ -43,6 +88,36 @@ class MarketOpenBrief:
 
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Per-run stage/HTTP metrics; profiling is opt-in via METRICS_PROFILE
+        self.metrics_config = {
+            'metrics_dir': os.path.join(self.output_dir, 'metrics'),
+            'timing_footer': True
+        }
+
+        self.telegram = TelegramClient(
+            self.telegram_config['bot_token'],
+            self.telegram_config['chat_id'],
+            timeout=10,
+            ssl_context=self.ssl_context
+        )
+
+        # Quote/news cache shared with CloudAlgorithmRunner (TTL in seconds per data type)
+        self.cache = DataCache(
+            os.path.join(self.cache_dir, 'market_data.sqlite'),
+            ttls={'quote': 60, 'news': 15 * 60}
+        )
+
+        # Per-symbol news watermarks and seen-article index (keys kept for 72 hours)
+        self.news_index = NewsIndex(os.path.join(self.cache_dir, 'news_index.sqlite'), retention_hours=72)
+        # Seen keys and watermarks from the last scan, committed only once the brief is delivered
+        self.pending_news = None
+
+        # gzip + ETag/Last-Modified revalidation for every provider GET (bodies kept for 304 replays)
+        self.http = get_http_client(os.path.join(self.cache_dir, 'http'))
+
+        # Daily OHLCV bars shared with CloudAlgorithmRunner, appended from each quote fetch
+        self.history = HistoryStore(os.path.join(self.cache_dir, 'history'))
+
     def load_api_keys(self):
         """Load API keys from CSV file"""
         api_keys = {}
@@ -65,31 +140,24 @@ class MarketOpenBrief:
             return {}
 
         all_symbols = list(self.current_portfolio.keys()) + self.watchlist
-        market_data = {}
 
-        for symbol in all_symbols:
-            try:
-                url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={api_keys['FMP']}"
-                with urllib.request.urlopen(url, context=self.ssl_context, timeout=10) as response:
-                    data = json.loads(response.read().decode())
-
-                if data and isinstance(data, list) and len(data) > 0:
-                    quote = data[0]
-                    market_data[symbol] = {
-                        'price': quote.get('price', 0),
-                        'change': quote.get('change', 0),
-                        'change_pct': quote.get('changesPercentage', 0),
-                        'volume': quote.get('volume', 0),
-                        'avg_volume': quote.get('avgVolume', 0),
-                        'day_high': quote.get('dayHigh', 0),
-                        'day_low': quote.get('dayLow', 0),
-                        'previous_close': quote.get('previousClose', 0)
-                    }
-
-                time.sleep(0.1)
+        fetcher = QuoteFetcher(
+            api_keys['FMP'],
+            base_url=self.quote_config['base_url'],
+            batch_size=self.quote_config['batch_size'],
+            max_workers=self.quote_config['max_workers'],
+            timeout=self.quote_config['timeout'],
+            ssl_context=self.ssl_context,
+            cache=self.cache,
+            http=self.http
+        )
 
-            except Exception as e:
-                print(f"Market data error for {symbol}: {e}")
+        market_data = fetcher.fetch_quotes(all_symbols)
+
+        try:
+            self.history.append_quotes(market_data)
+        except Exception as e:
+            print(f"[WARNING] Could not record price history: {e}")
 
         return market_data
 
@@ -99,180 +167,95 @@ class MarketOpenBrief:
         if 'NewsAPI' not in api_keys:
             return {}
 
-        # Look for news from last 18 hours (overnight + pre-market)
-        from_date = (datetime.now() - timedelta(hours=18)).strftime('%Y-%m-%dT%H:%M:%S')
+        # Look for news from last 18 hours (overnight + pre-market), in UTC like publishedAt;
+        # symbols with a newer watermark only ask for what came after it
+        from_date = (datetime.now(timezone.utc) - timedelta(hours=18)).strftime('%Y-%m-%dT%H:%M:%S')
 
-        portfolio_news = {}
         all_symbols = list(self.current_portfolio.keys()) + self.watchlist
 
-        for symbol in all_symbols:
-            try:
-                url = f"https://newsapi.org/v2/everything?q={symbol}&apiKey={api_keys['NewsAPI']}&sortBy=publishedAt&pageSize=3&language=en&from={from_date}"
-
-                with urllib.request.urlopen(url, context=self.ssl_context, timeout=10) as response:
-                    data = json.loads(response.read().decode())
-
-                articles = data.get('articles', [])
-                if articles:
-                    portfolio_news[symbol] = articles[:2]  # Top 2 overnight articles
-
-                time.sleep(0.1)
-
-            except Exception as e:
-                print(f"News error for {symbol}: {e}")
-
-        return portfolio_news
+        scanner = NewsScanner(
+            api_keys['NewsAPI'],
+            base_url=self.news_config['base_url'],
+            rate_limiter=get_rate_limiter(
+                'NewsAPI',
+                rate=self.news_config['rate_per_sec'],
+                capacity=self.news_config['burst']
+            ),
+            max_in_flight=self.news_config['max_in_flight'],
+            timeout=self.news_config['timeout'],
+            ssl_context=self.ssl_context,
+            cache=self.cache,
+            index=self.news_index,
+            http=self.http
+        )
+
+        news = scanner.fetch_news(all_symbols, from_date)
+        self.pending_news = scanner.pending
+        print(self.news_index.summary())
+        return news
 
     def check_position_alerts(self, market_data):
         """Check for any position alerts at market open"""
-        alerts = []
-
-        for symbol, position in self.current_portfolio.items():
-            if symbol not in market_data:
-                continue
-
-            current_price = market_data[symbol]['price']
-            entry_price = position['entry_price']
-            change_pct = ((current_price - entry_price) / entry_price) * 100
-
-            # Check for significant overnight moves
-            daily_change_pct = market_data[symbol]['change_pct']
-
-            # Emergency alert (down 20% from entry)
-            if change_pct <= -20:
-                alerts.append({
-                    'type': 'EMERGENCY',
-                    'symbol': symbol,
-                    'message': f"🚨 {symbol} down {change_pct:.1f}% from entry - REVIEW POSITION"
-                })
-
-            # Stop loss alert (down 15% from entry)
-            elif change_pct <= -15:
-                alerts.append({
-                    'type': 'STOP_LOSS',
-                    'symbol': symbol,
-                    'message': f"⚠️ {symbol} at stop-loss level ({change_pct:.1f}% from entry)"
-                })
-
-            # Big overnight move (up or down 5%+)
-            elif abs(daily_change_pct) >= 5:
-                direction = "📈" if daily_change_pct > 0 else "📉"
-                alerts.append({
-                    'type': 'BIG_MOVE',
-                    'symbol': symbol,
-                    'message': f"{direction} {symbol} moved {daily_change_pct:+.1f}% overnight"
-                })
-
-            # Profit harvest (up 50% from entry)
-            elif change_pct >= 50:
-                alerts.append({
-                    'type': 'PROFIT_HARVEST',
-                    'symbol': symbol,
-                    'message': f"🎯 {symbol} up {change_pct:.1f}% - consider profit taking"
-                })
-
-        return alerts
+        symbols = [s for s in self.current_portfolio.keys() if s in market_data]
 
-    def format_market_open_brief(self, market_data, overnight_news, alerts):
-        """Format market open brief for Telegram"""
+        return self.alert_engine.evaluate(
+            symbols,
+            entry_price=[self.current_portfolio[s]['entry_price'] for s in symbols],
+            price=[market_data[s]['price'] for s in symbols],
+            daily_change_pct=[market_data[s]['change_pct'] for s in symbols]
+        )
 
-        message = f"""🌅 <b>MARKET OPEN BRIEF</b> 🌅
-<b>{datetime.now().strftime('%B %d, %Y • 9:30 AM ET')}</b>
+    def format_market_open_brief(self, market_data, overnight_news, alerts):
+        """Format market open brief for Telegram (single pass over market_data, see brief_renderer)"""
+        return render_brief(self.current_portfolio.keys(), self.watchlist, market_data, overnight_news, alerts)
 
-🚨 <b>POSITION ALERTS</b>"""
+    def scan_universe(self, top_n=None):
+        """Scanner mode: top microcap movers across every exchange listing, not just the watchlist
 
-        if alerts:
-            for alert in alerts:
-                message += f"\n• {alert['message']}"
+        Returns None when the scan could not run (no API key, or every listing failed).
+        """
+        api_keys = self.load_api_keys()
+        if 'FMP' not in api_keys:
+            print("[ERROR] FMP API key not found")
+            return None
+
+        scanner = UniverseScanner(
+            api_keys['FMP'],
+            base_url=self.quote_config['base_url'],
+            exchanges=self.scan_config['exchanges'],
+            top_n=top_n or self.scan_config['top_n'],
+            max_market_cap=self.scan_config['max_market_cap'],
+            timeout=self.scan_config['timeout'],
+            ssl_context=self.ssl_context,
+            http=self.http
+        )
+
+        print("SCANNING MICROCAP UNIVERSE")
+        print("=" * 45)
+        with RunMetrics('universe_scan', self.metrics_config['metrics_dir'], cache=self.cache) as metrics:
+            with metrics.span('scan') as span:
+                candidates = scanner.scan()
+                span.set(quotes=scanner.stats['quotes'], candidates=len(candidates or []),
+                         failed_exchanges=scanner.stats['failed'])
+
+        print(scanner.summary())
+        print(self.http.summary())
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"Peak memory: {peak:.1f}MB RSS")
+        if candidates is None:
+            print("[ERROR] Every exchange listing failed - nothing was scanned")
+        elif candidates:
+            print(format_candidates(candidates))
         else:
-            message += f"\n• All positions stable - no immediate alerts"
-
-        message += f"\n\n📊 <b>PORTFOLIO PRE-MARKET</b>"
-
-        for symbol in self.current_portfolio.keys():
-            if symbol in market_data:
-                data = market_data[symbol]
-                price = data['price']
-                change_pct = data['change_pct']
-                volume = data['volume']
-                avg_volume = data['avg_volume']
-
-                # Volume analysis
-                volume_indicator = ""
-                if avg_volume > 0:
-                    volume_ratio = volume / avg_volume
-                    if volume_ratio > 2:
-                        volume_indicator = " 🔥 HIGH VOL"
-                    elif volume_ratio > 1.5:
-                        volume_indicator = " 📈 ABOVE AVG"
-
-                emoji = "📈" if change_pct >= 0 else "📉"
-                message += f"\n<b>{symbol}</b>: ${price:.2f} {emoji}{change_pct:+.1f}%{volume_indicator}"
-
-        message += f"\n\n👀 <b>WATCHLIST</b>"
-
-        for symbol in self.watchlist:
-            if symbol in market_data:
-                data = market_data[symbol]
-                price = data['price']
-                change_pct = data['change_pct']
-                emoji = "📈" if change_pct >= 0 else "📉"
-                message += f"\n<b>{symbol}</b>: ${price:.2f} {emoji}{change_pct:+.1f}%"
-
-        # Overnight news highlights
-        if overnight_news:
-            message += f"\n\n📰 <b>OVERNIGHT NEWS</b>"
-            news_count = 0
-            for symbol, articles in overnight_news.items():
-                for article in articles:
-                    if news_count < 3:  # Limit to top 3 overnight stories
-                        title = article.get('title', '')[:60] + ('...' if len(article.get('title', '')) > 60 else '')
-                        message += f"\n• <b>{symbol}</b>: {title}"
-                        news_count += 1
-
-        # Market context
-        message += f"\n\n🎯 <b>TRADING FOCUS</b>"
-
-        # Find biggest movers
-        big_movers = []
-        for symbol, data in market_data.items():
-            if abs(data['change_pct']) >= 3:
-                big_movers.append((symbol, data['change_pct']))
-
-        if big_movers:
-            big_movers.sort(key=lambda x: abs(x[1]), reverse=True)
-            message += f"\n• Biggest mover: {big_movers[0][0]} ({big_movers[0][1]:+.1f}%)"
-
-        # Check for high volume stocks
-        high_vol_stocks = []
-        for symbol, data in market_data.items():
-            if data['avg_volume'] > 0 and data['volume'] / data['avg_volume'] > 2:
-                high_vol_stocks.append(symbol)
-
-        if high_vol_stocks:
-            message += f"\n• High volume: {', '.join(high_vol_stocks[:3])}"
-
-        message += f"\n\n⏰ <b>Next Report:</b> 6:00 PM (Full EOD Analysis)"
-        message += f"\n🎯 <b>Real-time alerts:</b> Active during trading hours"
-
-        return message
+            print("[INFO] No microcaps met the move and volume criteria")
+        print(f"Run metrics saved: {metrics.write()}")
+        return candidates
 
     def send_telegram_message(self, message):
         """Send message via Telegram"""
         try:
-            data = urllib.parse.urlencode({
-                'chat_id': self.telegram_config['chat_id'],
-                'text': message,
-                'parse_mode': 'HTML'
-            }).encode('utf-8')
-
-            url = f"https://api.telegram.org/bot{self.telegram_config['bot_token']}/sendMessage"
-            req = urllib.request.Request(url, data=data)
-
-            with urllib.request.urlopen(req, context=self.ssl_context, timeout=10) as response:
-                result = json.loads(response.read().decode())
-
-            return result.get('ok', False)
+            return self.telegram.send_message(message)
 
         except Exception as e:
             print(f"Telegram message failed: {e}")
@@ -280,33 +263,62 @@ class MarketOpenBrief:
 
     def generate_market_open_brief(self):
         """Generate and send market open brief"""
+        with RunMetrics('market_open_brief', self.metrics_config['metrics_dir'], cache=self.cache) as metrics:
+            success = self.run_market_open_brief(metrics)
+
+        metrics_file = metrics.write()
+        print(f"Run metrics saved: {metrics_file}")
+        return success
+
+    def run_market_open_brief(self, metrics):
+        """Brief pipeline with each stage wrapped in a metrics span"""
         print("GENERATING MARKET OPEN INTELLIGENCE BRIEF")
         print("=" * 45)
 
         # Get pre-market data
         print("Fetching pre-market data...")
-        market_data = self.get_pre_market_data()
+        with metrics.span('quotes') as span:
+            market_data = self.get_pre_market_data()
+            span.set(symbols=len(market_data))
 
         # Get overnight news
         print("Scanning overnight news...")
-        overnight_news = self.get_overnight_news()
+        with metrics.span('news') as span:
+            overnight_news = self.get_overnight_news()
+            span.set(symbols=len(overnight_news))
+        print(self.cache.summary())
+        print(self.http.summary())
 
         # Check for alerts
         print("Checking position alerts...")
-        alerts = self.check_position_alerts(market_data)
+        with metrics.span('alerts') as span:
+            alerts = self.check_position_alerts(market_data)
+            span.set(alerts=len(alerts))
 
         # Format brief
-        telegram_message = self.format_market_open_brief(market_data, overnight_news, alerts)
+        with metrics.span('format') as span:
+            telegram_message = self.format_market_open_brief(market_data, overnight_news, alerts)
+            span.set(chars=len(telegram_message))
+
+        if self.metrics_config['timing_footer']:
+            telegram_message += f"\n\n<i>{metrics.footer()}</i>"
 
         # Send brief
         print("Sending market open brief to Telegram...")
-        success = self.send_telegram_message(telegram_message)
+        with metrics.span('telegram'):
+            success = self.send_telegram_message(telegram_message)
 
         if success:
             print("SUCCESS: Market open brief sent to Kyle's Telegram!")
 
-            # Save brief copy
-            today_str = datetime.now().strftime('%Y%m%d_%H%M')
+            # Only delivered articles count as seen; a failed send leaves them for the next run
+            try:
+                self.news_index.commit(self.pending_news)
+                self.pending_news = None
+            except Exception as e:
+                print(f"[WARNING] Could not update news index: {e}")
+
+            # Save brief copy as one compressed record in the brief archive
             brief_data = {
                 'market_data': market_data,
                 'overnight_news': overnight_news,
@@ -314,11 +326,13 @@ class MarketOpenBrief:
                 'generated_at': datetime.now().isoformat()
             }
 
-            json_file = os.path.join(self.output_dir, f'Market_Open_Brief_{today_str}.json')
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(brief_data, f, indent=2, default=str)
-
-            print(f"Brief data saved: {json_file}")
+            try:
+                archive = BriefArchive(os.path.join(self.output_dir, 'brief_archive'))
+                run_id = archive.append(brief_data)
+                archive.close()
+                print(f"Brief data archived: run #{run_id} in {archive.data_path}")
+            except Exception as e:
+                print(f"[WARNING] Could not archive brief data: {e}")
             return True
         else:
             print("FAILED: Could not send market open brief")
@@ -327,7 +341,11 @@ class MarketOpenBrief:
 def main():
     """Main function"""
     brief = MarketOpenBrief()
-    brief.generate_market_open_brief()
+    if len(sys.argv) > 1 and sys.argv[1] == '--scan':
+        if brief.scan_universe(int(sys.argv[2]) if len(sys.argv) > 2 else None) is None:
+            sys.exit(1)
+    else:
+        brief.generate_market_open_brief()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
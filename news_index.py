@@ -0,0 +1,182 @@
+"""
+News Index
+Per-symbol publishedAt watermarks and a hashed URL/title index of articles already seen
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import urllib.parse
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'news_index.sqlite')
+
+def normalize_timestamp(value):
+    """NewsAPI publishedAt ('2025-01-01T09:30:00Z' / '...00.123Z') as 'YYYY-MM-DDTHH:MM:SS'"""
+    return (value or '')[:19]
+
+def article_keys(article):
+    """Hashes identifying an article: its canonical URL and its normalized title
+
+    Syndicated copies of a story often share the title but not the URL, so an
+    article counts as seen when either key is already indexed.
+    """
+    keys = []
+    url = article.get('url') or ''
+    if url:
+        parsed = urllib.parse.urlsplit(url.strip())
+        canonical = f"{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+        keys.append('u:' + hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:20])
+    title = ' '.join((article.get('title') or '').lower().split())
+    if title:
+        keys.append('t:' + hashlib.sha1(title.encode('utf-8')).hexdigest()[:20])
+    return keys
+
+def group_articles(portfolio_news):
+    """Merge articles shared by several symbols: [(symbols, article)] in first-seen order"""
+    groups = []
+    by_key = {}
+    for symbol, articles in portfolio_news.items():
+        for article in articles:
+            keys = article_keys(article)
+            group = next((by_key[k] for k in keys if k in by_key), None)
+            if group is None:
+                group = ([], article)
+                groups.append(group)
+            for key in keys:
+                by_key.setdefault(key, group)
+            if symbol not in group[0]:
+                group[0].append(symbol)
+    return groups
+
+class NewsIndex:
+    """SQLite-backed news ingestion state shared by every brief run
+
+    `watermarks` holds the newest publishedAt seen per symbol, so the next scan
+    only asks NewsAPI for articles after it. `seen` holds hashed article keys,
+    which drop repeats from overlapping windows. Seen keys older than
+    `retention_hours` are evicted.
+
+    Filtering and recording are split: ingest() only reads the index and
+    returns what it would record, and commit() saves that once the brief has
+    actually been delivered, so a failed send or a retried run sees the same
+    articles again.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, retention_hours=72):
+        self.path = path
+        self.retention = retention_hours * 3600
+        self.stats = {'fetched': 0, 'duplicates': 0, 'new': 0, 'evicted': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                symbol TEXT PRIMARY KEY,
+                published_at TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                key TEXT PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_first ON seen (first_seen)")
+        self.conn.commit()
+
+    def watermarks(self, symbols):
+        """{symbol: newest publishedAt seen} for the symbols that have one"""
+        marks = {}
+        for symbol in symbols:
+            row = self.conn.execute(
+                "SELECT published_at FROM watermarks WHERE symbol=?", (symbol,)
+            ).fetchone()
+            if row:
+                marks[symbol] = row[0]
+        return marks
+
+    def from_dates(self, symbols, floor):
+        """Per-symbol `from` parameter: the later of the symbol's watermark and `floor`"""
+        marks = self.watermarks(symbols)
+        floor = normalize_timestamp(floor)
+        return {symbol: max(floor, marks.get(symbol, floor)) for symbol in symbols}
+
+    def ingest(self, fetched):
+        """Drop articles delivered in earlier runs; returns (fresh, pending)
+
+        `fetched` is {symbol: [articles]}. Articles shared between symbols in this
+        batch are kept under each symbol so the brief can group them. `pending`
+        holds the new keys and watermarks; nothing is written until commit(pending).
+        """
+        batch = {}
+        for symbol, articles in fetched.items():
+            for article in articles:
+                for key in article_keys(article):
+                    batch.setdefault(key, symbol)
+
+        known = set()
+        keys = list(batch)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT key FROM seen WHERE key IN ({placeholders})", chunk
+            ))
+
+        fresh = {}
+        marks = {}
+        for symbol, articles in fetched.items():
+            self.stats['fetched'] += len(articles)
+            kept = [a for a in articles if not known.intersection(article_keys(a))]
+            self.stats['duplicates'] += len(articles) - len(kept)
+            fresh[symbol] = kept
+
+            published = [normalize_timestamp(a.get('publishedAt')) for a in articles if a.get('publishedAt')]
+            if published:
+                marks[symbol] = max(published)
+
+        self.stats['new'] += sum(len(a) for a in fresh.values())
+        pending = {
+            'keys': {key: symbol for key, symbol in batch.items() if key not in known},
+            'watermarks': marks
+        }
+        return fresh, pending
+
+    def commit(self, pending):
+        """Record the keys and watermarks from ingest() once their brief has been delivered"""
+        if not pending:
+            return
+        now = time.time()
+        self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)",
+                              [(key, symbol, now) for key, symbol in pending['keys'].items()])
+        self.conn.executemany(
+            "INSERT INTO watermarks VALUES (?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET "
+            "published_at=MAX(published_at, excluded.published_at), updated_at=excluded.updated_at",
+            [(symbol, mark, now) for symbol, mark in pending['watermarks'].items()]
+        )
+        self.evict(now)
+        self.conn.commit()
+
+    def evict(self, now=None):
+        """Forget seen keys older than the retention window"""
+        cutoff = (now or time.time()) - self.retention
+        removed = self.conn.execute("DELETE FROM seen WHERE first_seen < ?", (cutoff,)).rowcount
+        self.stats['evicted'] += max(removed, 0)
+
+    def reset(self):
+        self.conn.execute("DELETE FROM watermarks")
+        self.conn.execute("DELETE FROM seen")
+        self.conn.commit()
+
+    def summary(self):
+        s = self.stats
+        return (f"News: {s['fetched']} fetched, {s['new']} new, {s['duplicates']} duplicates, "
+                f"{s['evicted']} evicted")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,174 @@
+"""
+News Scanner
+Asyncio NewsAPI fetching with per-provider token-bucket rate limiting and incremental ingestion
+"""
+
+import json
+import time
+import asyncio
+import urllib.parse
+import ssl
+
+from provider_http import get_http_client
+
+NEWSAPI_BASE_URL = 'https://newsapi.org/v2'
+
+# Default request budgets per provider: sustained requests/sec and burst size
+PROVIDER_RATE_LIMITS = {
+    'NewsAPI': {'rate': 5.0, 'capacity': 5},
+    'FMP': {'rate': 10.0, 'capacity': 10}
+}
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = None
+        self.lock_loop = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens=1):
+        """Wait until `tokens` are available, then consume them"""
+        # Buckets outlive a single asyncio.run(), so bind the lock per event loop
+        loop = asyncio.get_running_loop()
+        if self.lock_loop is not loop:
+            self.lock = asyncio.Lock()
+            self.lock_loop = loop
+
+        # Serialize waiters so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                self.refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+_rate_limiters = {}
+
+def get_rate_limiter(provider, rate=None, capacity=None):
+    """Return the shared token bucket for a provider, creating it on first use
+
+    An explicit `rate` or `capacity` that differs from the existing bucket's is
+    applied to it in place, so every holder of the shared bucket sees the new
+    limit. Omitted values keep the current (or default) setting.
+    """
+    bucket = _rate_limiters.get(provider)
+    if bucket is None:
+        defaults = PROVIDER_RATE_LIMITS.get(provider, {'rate': 1.0, 'capacity': 1})
+        _rate_limiters[provider] = TokenBucket(
+            rate if rate is not None else defaults['rate'],
+            capacity if capacity is not None else defaults['capacity']
+        )
+        return _rate_limiters[provider]
+
+    if rate is not None and float(rate) != bucket.rate:
+        bucket.refill()
+        bucket.rate = float(rate)
+    if capacity is not None and float(capacity) != bucket.capacity:
+        bucket.refill()
+        bucket.capacity = float(capacity)
+        bucket.tokens = min(bucket.tokens, bucket.capacity)
+    return bucket
+
+class NewsScanner:
+    """Fetch recent articles for many symbols concurrently within provider limits
+
+    With a NewsIndex attached, each symbol is requested only from its last seen
+    publishedAt, and articles already delivered by earlier runs are dropped.
+    What this scan would record is left in `pending` for the caller to commit
+    to the index after delivery.
+    """
+
+    def __init__(self, api_key, base_url=NEWSAPI_BASE_URL, rate_limiter=None,
+                 max_in_flight=8, timeout=10, page_size=3, articles_per_symbol=2,
+                 ssl_context=None, cache=None, index=None, http=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter or get_rate_limiter('NewsAPI')
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.page_size = page_size
+        self.articles_per_symbol = articles_per_symbol
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.cache = cache
+        self.index = index
+        self.pending = None
+        self.http = http or get_http_client()
+
+    def news_url(self, symbol, from_date):
+        """Build the NewsAPI /everything URL for one symbol"""
+        params = urllib.parse.urlencode({
+            'q': symbol,
+            'apiKey': self.api_key,
+            'sortBy': 'publishedAt',
+            'pageSize': self.page_size,
+            'language': 'en',
+            'from': from_date
+        })
+        return f"{self.base_url}/everything?{params}"
+
+    def fetch_symbol(self, symbol, from_date):
+        """Blocking fetch of one symbol's articles"""
+        raw = self.http.get('NewsAPI', 'everything', self.news_url(symbol, from_date), self.timeout,
+                            self.ssl_context, symbol=symbol)
+        data = json.loads(raw.decode())
+        return data.get('articles', [])
+
+    async def scan_symbol(self, symbol, from_date, semaphore):
+        async with semaphore:
+            await self.rate_limiter.acquire()
+            try:
+                articles = await asyncio.to_thread(self.fetch_symbol, symbol, from_date)
+                return symbol, articles
+            except Exception as e:
+                print(f"News error for {symbol}: {e}")
+                return symbol, None
+
+    async def scan(self, symbols, from_date):
+        """Fetch news for all symbols, returning {symbol: [articles]}"""
+        if self.cache is not None:
+            cached, missing = self.cache.get_many('NewsAPI', symbols, 'everything', 'news')
+        else:
+            cached, missing = {}, symbols
+
+        if self.index is not None:
+            from_dates = self.index.from_dates(missing, from_date)
+        else:
+            from_dates = {symbol: from_date for symbol in missing}
+
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = await asyncio.gather(*(
+            self.scan_symbol(symbol, from_dates[symbol], semaphore) for symbol in missing
+        ))
+        fetched = {symbol: articles for symbol, articles in results if articles is not None}
+
+        # The cache holds what the provider returned; empty results are cached too so quiet
+        # symbols are not re-polled inside the TTL. Failed requests (None) are not cached
+        if self.cache is not None:
+            self.cache.put_many('NewsAPI', fetched, 'everything', 'news')
+
+        # Cache hits go through the index as well, so a rerun inside the TTL does not
+        # repeat stories a delivered brief already committed as seen
+        articles_by_symbol = {**cached, **fetched}
+        if self.index is not None:
+            articles_by_symbol, self.pending = self.index.ingest(articles_by_symbol)
+
+        portfolio_news = {}
+        for symbol in symbols:
+            articles = articles_by_symbol.get(symbol)
+            if articles:
+                portfolio_news[symbol] = articles[:self.articles_per_symbol]
+        return portfolio_news
+
+    def fetch_news(self, symbols, from_date):
+        """Synchronous entry point for callers outside an event loop"""
+        return asyncio.run(self.scan(list(dict.fromkeys(symbols)), from_date))
@@ -0,0 +1,278 @@
+"""
+Portfolio Database
+SQLite (WAL) backend holding positions, cash and transactions with atomic trade commits
+"""
+
+import os
+import sys
+import csv
+import sqlite3
+from datetime import datetime
+
+from transaction_log import FIELDNAMES
+
+RESERVED_KEYS = ['CASH', 'last_updated']
+
+SYNCHRONOUS = {
+    'none': 'NORMAL',      # WAL + NORMAL: commits survive a crashed process, not power loss
+    'snapshot': 'NORMAL',
+    'always': 'FULL'
+}
+
+class PortfolioDB:
+    """Positions and transaction history in one SQLite file
+
+    Exposes the PortfolioStore interface (load/save) and the TransactionLog
+    read interface (tail/since/for_symbol), so SimplePortfolio can use it in
+    place of the JSON + CSV pair. commit() writes a trade's transaction rows
+    and the positions it touched in a single transaction, so the two can never
+    disagree after a crash.
+    """
+
+    def __init__(self, path, fsync='none'):
+        if fsync not in SYNCHRONOUS:
+            raise ValueError(f"fsync must be one of {tuple(SYNCHRONOUS)}, got {fsync!r}")
+
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        # Callers serialize access; the portfolio service flushes from a worker thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[fsync]}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS positions (
+                symbol TEXT PRIMARY KEY,
+                shares REAL NOT NULL,
+                avg_cost REAL NOT NULL,
+                total_invested REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS account (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                action TEXT NOT NULL,
+                shares REAL NOT NULL,
+                price REAL NOT NULL,
+                amount REAL NOT NULL,
+                notes TEXT
+            );
+            CREATE TABLE IF NOT EXISTS lots (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                shares REAL NOT NULL,
+                price REAL NOT NULL,
+                date TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS realized (
+                symbol TEXT PRIMARY KEY,
+                amount REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_transactions_symbol_date ON transactions (symbol, date);
+            CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+            CREATE INDEX IF NOT EXISTS idx_lots_symbol ON lots (symbol, id);
+        """)
+        self.conn.commit()
+
+    # ---- portfolio state -------------------------------------------------
+
+    def load(self):
+        """Portfolio dict in the JSON layout, or None for an empty database"""
+        account = dict(self.conn.execute("SELECT key, value FROM account"))
+        if 'cash' not in account:
+            return None
+
+        portfolio = {
+            symbol: {'shares': shares, 'avg_cost': avg_cost, 'total_invested': total_invested}
+            for symbol, shares, avg_cost, total_invested in self.conn.execute(
+                "SELECT symbol, shares, avg_cost, total_invested FROM positions ORDER BY rowid"
+            )
+        }
+        portfolio['CASH'] = {'balance': float(account['cash'])}
+        portfolio['last_updated'] = account.get('last_updated')
+        return portfolio
+
+    def save(self, state):
+        """Replace all positions with `state` (used for initial/imported state)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM positions")
+            self.write_positions(state, [s for s in state if s not in RESERVED_KEYS])
+
+    def write_positions(self, state, symbols):
+        """Upsert the given symbols from `state` (deleting closed ones) plus cash; caller commits"""
+        for symbol in symbols:
+            position = state.get(symbol)
+            if position is None:
+                self.conn.execute("DELETE FROM positions WHERE symbol=?", (symbol,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO positions VALUES (?, ?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET "
+                    "shares=excluded.shares, avg_cost=excluded.avg_cost, total_invested=excluded.total_invested",
+                    (symbol, position['shares'], position['avg_cost'], position['total_invested'])
+                )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO account VALUES (?, ?)",
+            [('cash', repr(float(state['CASH']['balance']))),
+             ('last_updated', state.get('last_updated') or datetime.now().isoformat())]
+        )
+
+    def commit(self, state, rows, lots=None):
+        """Record transaction rows, the positions they touched and their lots in one atomic transaction"""
+        with self.conn:
+            self.insert_transactions(rows)
+            self.write_positions(state, list(dict.fromkeys(row['symbol'] for row in rows)))
+            if lots is not None:
+                self.write_lots(lots)
+
+    # ---- tax lots --------------------------------------------------------
+
+    def load_lots(self):
+        """LotBook.to_dict() layout, or None if no lots were ever saved"""
+        account = dict(self.conn.execute("SELECT key, value FROM account WHERE key IN ('lots_next_id', 'lots_method')"))
+        if 'lots_next_id' not in account:
+            return None
+
+        symbols = {}
+        for symbol, amount in self.conn.execute("SELECT symbol, amount FROM realized"):
+            symbols[symbol] = {'realized': amount, 'lots': []}
+        for lot_id, symbol, shares, price, date in self.conn.execute(
+                "SELECT id, symbol, shares, price, date FROM lots ORDER BY id"):
+            symbols.setdefault(symbol, {'realized': 0.0, 'lots': []})['lots'].append([lot_id, shares, price, date])
+
+        return {'method': account.get('lots_method', 'FIFO'), 'next_id': int(account['lots_next_id']),
+                'symbols': symbols}
+
+    def write_lots(self, book):
+        """Write only the lots changed since the last save; caller commits"""
+        for symbol in book.reset_symbols:
+            self.conn.execute("DELETE FROM lots WHERE symbol=?", (symbol,))
+        for lot_id, lot in book.changes.items():
+            if lot is None:
+                self.conn.execute("DELETE FROM lots WHERE id=?", (lot_id,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO lots VALUES (?, ?, ?, ?, ?)", (lot_id,) + lot)
+        self.conn.executemany("INSERT OR REPLACE INTO realized VALUES (?, ?)",
+                              [(symbol, book.realized_pnl(symbol)) for symbol in book.dirty])
+        self.conn.executemany("INSERT OR REPLACE INTO account VALUES (?, ?)",
+                              [('lots_next_id', str(book.next_id)), ('lots_method', book.method)])
+
+    def save_lots(self, book):
+        with self.conn:
+            self.write_lots(book)
+
+    def flush(self):
+        pass  # every commit is already durable per the synchronous setting
+
+    # ---- transactions ----------------------------------------------------
+
+    def insert_transactions(self, rows):
+        self.conn.executemany(
+            "INSERT INTO transactions (date, symbol, action, shares, price, amount, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(row['date'], row['symbol'].upper(), row['action'], float(row['shares']),
+              float(row['price']), float(row['amount']), row.get('notes', '')) for row in rows]
+        )
+
+    def append(self, trans_data):
+        self.append_many([trans_data])
+
+    def append_many(self, rows):
+        with self.conn:
+            self.insert_transactions(rows)
+
+    def query(self, where='', params=(), order='DESC', limit=None):
+        sql = f"SELECT {', '.join(FIELDNAMES)} FROM transactions {where} ORDER BY date {order}, id {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(zip(FIELDNAMES, row)) for row in self.conn.execute(sql, params)]
+
+    def tail(self, n=10):
+        """Last n transactions, newest first"""
+        return self.query(limit=n)
+
+    def since(self, date_str):
+        """Transactions dated at or after date_str, newest first"""
+        return self.query("WHERE date >= ?", (date_str,))
+
+    def for_symbol(self, symbol):
+        """All transactions for a symbol in chronological order"""
+        return self.query("WHERE symbol = ?", (symbol.upper(),), order='ASC')
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    # ---- import ----------------------------------------------------------
+
+    def import_files(self, portfolio_file, transactions_file, lots_file=None, batch_size=50_000):
+        """One-shot import of current_portfolio.json, transactions.csv and lots.json; returns rows imported
+
+        The lot book carries each symbol's open lots and realized P&L, so
+        positions keep their lot-level cost basis after the move. The whole
+        import is one transaction, so an interrupted import leaves the
+        database empty. Importing into a non-empty database is refused.
+        """
+        from portfolio_store import PortfolioStore
+        from cost_basis import LotBook
+
+        if self.count() or self.load() is not None:
+            raise ValueError(f"{self.path} already holds data; import into a fresh database")
+
+        state = PortfolioStore(portfolio_file).load()
+        lots = PortfolioStore(lots_file, journal=False).load() if lots_file else None
+        imported = 0
+        with self.conn:
+            if os.path.exists(transactions_file):
+                with open(transactions_file, 'r', newline='', encoding='utf-8') as f:
+                    batch = []
+                    for row in csv.DictReader(f):
+                        batch.append(row)
+                        if len(batch) >= batch_size:
+                            self.insert_transactions(batch)
+                            imported += len(batch)
+                            batch = []
+                    self.insert_transactions(batch)
+                    imported += len(batch)
+
+            if state is not None:
+                self.write_positions(state, [s for s in state if s not in RESERVED_KEYS])
+
+            if lots:
+                # Mark every lot and symbol as changed so write_lots() copies the whole book
+                book = LotBook.from_dict(lots)
+                book.changes = {lot_id: (symbol, shares, price, date) for symbol, queue in book.queues.items()
+                                for lot_id, shares, price, date in queue.open_lots()}
+                book.dirty = set(book.queues)
+                self.write_lots(book)
+
+        return imported
+
+    def close(self):
+        self.conn.close()
+
+def main():
+    """'import [DATA_DIR]': copy the JSON/CSV portfolio files and lot book into DATA_DIR/portfolio.db"""
+    if len(sys.argv) < 2 or sys.argv[1] != 'import':
+        print("Usage: python portfolio_db.py import [DATA_DIR]")
+        sys.exit(1)
+
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), 'portfolio_data')
+    db = PortfolioDB(os.path.join(data_dir, 'portfolio.db'))
+    try:
+        imported = db.import_files(os.path.join(data_dir, 'current_portfolio.json'),
+                                   os.path.join(data_dir, 'transactions.csv'),
+                                   os.path.join(data_dir, 'lots.json'))
+    except Exception as e:
+        print(f"[ERROR] Import failed: {e}")
+        sys.exit(1)
+
+    positions = len([s for s in (db.load() or {}) if s not in RESERVED_KEYS])
+    lots = sum(len(entry['lots']) for entry in (db.load_lots() or {}).get('symbols', {}).values())
+    print(f"[OK] Imported {imported} transactions, {positions} positions and {lots} lots into {db.path}")
+    print("     Set PORTFOLIO_BACKEND=sqlite to use it")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Portfolio Service
+Single-writer daemon owning the portfolio in memory; trades arrive over a Unix socket and are group-committed
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import contextlib
+
+from simple_portfolio import SimplePortfolio
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'portfolio_data')
+
+# SimplePortfolio methods a client may call; everything runs in the service's single writer
+SERVICE_METHODS = (
+    'buy_stock',
+    'sell_stock',
+    'execute_batch',
+    'show_portfolio',
+    'show_recent_transactions',
+    'show_symbol_transactions',
+    'show_lots'
+)
+
+def default_socket_path(data_dir=None):
+    return os.environ.get('PORTFOLIO_SOCKET') or os.path.join(data_dir or DEFAULT_DATA_DIR, 'portfolio.sock')
+
+class PortfolioService:
+    """Apply requests one at a time in arrival order, then write them to disk together
+
+    The writer takes every request queued so far (up to `max_group`),
+    applies each through SimplePortfolio with writes deferred, then flushes
+    the whole group with one transaction-log append and one snapshot (or one
+    SQLite transaction) on a worker thread. Requests that arrive during the
+    flush form the next group. Clients get their reply only after their
+    group is on disk. If a flush fails, every trade in the group is reported
+    failed and the in-memory state is reloaded from disk.
+    """
+
+    def __init__(self, data_dir=None, socket_path=None, backend=None, fsync='none', max_group=256):
+        self.data_dir = data_dir or DEFAULT_DATA_DIR
+        self.socket_path = socket_path or default_socket_path(self.data_dir)
+        self.backend = backend
+        self.fsync = fsync
+        self.max_group = max(1, max_group)
+
+        self.manager = self.open_manager()
+        self.queue = None
+        self.stop_event = None
+        self.handlers = set()
+        self.stats = {'requests': 0, 'trades': 0, 'groups': 0, 'largest_group': 0, 'flush_errors': 0}
+
+    def open_manager(self):
+        manager = SimplePortfolio(self.data_dir, fsync=self.fsync, backend=self.backend)
+        manager.defer_writes()
+        return manager
+
+    # ---- request handling ------------------------------------------------
+
+    def apply(self, request):
+        """Run one request against the in-memory portfolio; returns the reply (output captured)"""
+        method = request.get('method')
+        if method == 'service_stats':
+            return {'ok': True, 'result': dict(self.stats), 'output': ''}
+        if method == 'shutdown':
+            self.stop_event.set()
+            return {'ok': True, 'result': True, 'output': "[OK] Portfolio service stopping\n"}
+        if method not in SERVICE_METHODS:
+            return {'ok': False, 'error': f"unknown method {method!r}", 'output': ''}
+
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                result = getattr(self.manager, method)(*request.get('args', []), **request.get('kwargs', {}))
+            return {'ok': True, 'result': result, 'output': output.getvalue()}
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'output': output.getvalue()}
+
+    async def writer(self):
+        """Single writer: drain a group of requests, apply them in order, flush once, reply
+
+        Returns after the group holding the None sentinel queued by run() at shutdown.
+        """
+        stopping = False
+        while not stopping:
+            group = []
+            item = await self.queue.get()
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    group.append(item)
+                if stopping or len(group) >= self.max_group or self.queue.empty():
+                    break
+                item = self.queue.get_nowait()
+            if group:
+                await self.commit_group(group)
+
+    async def commit_group(self, group):
+        replies = [self.apply(request) for request, _ in group]
+        try:
+            written = await asyncio.to_thread(self.manager.flush_trades)
+        except Exception as e:
+            print(f"[ERROR] Group commit failed, reloading portfolio from disk: {e}")
+            self.stats['flush_errors'] += 1
+            self.manager = self.open_manager()
+            replies = [{'ok': False, 'error': f"not saved: {e}", 'output': ''}
+                       if request.get('method') in ('buy_stock', 'sell_stock', 'execute_batch') else reply
+                       for (request, _), reply in zip(group, replies)]
+            written = 0
+
+        self.stats['requests'] += len(group)
+        if written:
+            self.stats['trades'] += written
+            self.stats['groups'] += 1
+            self.stats['largest_group'] = max(self.stats['largest_group'], len(group))
+
+        for (_, future), reply in zip(group, replies):
+            if not future.done():
+                future.set_result(reply)
+
+    async def handle_client(self, reader, writer):
+        """One JSON request per line, one JSON reply per line, in order"""
+        loop = asyncio.get_running_loop()
+        self.handlers.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    reply = {'ok': False, 'error': f"bad request: {e}", 'output': ''}
+                else:
+                    future = loop.create_future()
+                    await self.queue.put((request, future))
+                    reply = await future
+                writer.write(json.dumps(reply, default=str).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def claim_socket(self):
+        """Remove a stale socket file; refuse to start if another service answers on it"""
+        if not os.path.exists(self.socket_path):
+            return
+        client = PortfolioClient.connect(self.socket_path)
+        if client is not None:
+            client.close()
+            raise RuntimeError(f"a portfolio service is already running on {self.socket_path}")
+        os.remove(self.socket_path)
+
+    async def run(self):
+        """Serve until SIGINT/SIGTERM or a 'shutdown' request"""
+        self.claim_socket()
+        self.queue = asyncio.Queue()
+        self.stop_event = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # non-main thread: rely on shutdown requests
+
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        writer = asyncio.create_task(self.writer())
+        print(f"[INFO] Portfolio service listening on {self.socket_path} ({self.manager.backend} backend)")
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            server.close()
+            # Finish every queued request (replies included) before exiting
+            await self.queue.put(None)
+            await writer
+            if self.handlers:
+                await asyncio.wait(self.handlers, timeout=0.5)
+            self.manager.flush_trades()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            print(f"[INFO] Portfolio service stopped: {self.stats['trades']} trades in "
+                  f"{self.stats['groups']} group commits")
+
+class PortfolioClient:
+    """Thin client with SimplePortfolio's trade/report methods, executed by the running service"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('r', encoding='utf-8')
+
+    @classmethod
+    def connect(cls, socket_path=None, timeout=30):
+        """Client for a running service, or None if nothing is listening"""
+        socket_path = socket_path or default_socket_path()
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock)
+
+    def request(self, method, /, *args, **kwargs):
+        self.sock.sendall(json.dumps({'method': method, 'args': args, 'kwargs': kwargs}).encode() + b'\n')
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("portfolio service closed the connection")
+        return json.loads(line)
+
+    def call(self, method, /, *args, **kwargs):
+        """Run a method in the service, echo its output and return its result"""
+        reply = self.request(method, *args, **kwargs)
+        if reply.get('output'):
+            sys.stdout.write(reply['output'])
+        if not reply['ok']:
+            print(f"[ERROR] Portfolio service: {reply['error']}")
+            return False
+        return reply['result']
+
+    def __getattr__(self, name):
+        if name in SERVICE_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def load_order_file(self, path, default_action):
+        # Order files are read on the client side; only the parsed orders are sent
+        return SimplePortfolio.load_order_file(self, path, default_action)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+# ---- benchmark -----------------------------------------------------------
+
+def direct_worker(data_dir, trades, symbol):
+    """Today's path: every trade loads, mutates and rewrites the whole portfolio"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(trades):
+            SimplePortfolio(data_dir).buy_stock(symbol, 1.0, 1.0, is_dollar_amount=True)
+
+def client_worker(socket_path, trades, symbol):
+    """Service path: each trade is one request on a fresh connection, like a CLI invocation"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(trades):
+            client = PortfolioClient.connect(socket_path)
+            client.buy_stock(symbol, 1.0, 1.0, is_dollar_amount=True)
+            client.close()
+
+def run_concurrent(target, args_for, clients):
+    import multiprocessing
+
+    # fork keeps client start-up out of the measurement where it is available
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    processes = [context.Process(target=target, args=args_for(i)) for i in range(clients)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return time.perf_counter() - start
+
+def check_state(data_dir, expected_trades, starting_cash):
+    """(trades logged, trades reflected in cash) after a run"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = SimplePortfolio(data_dir)
+    logged = len(manager.transaction_log.tail(expected_trades * 2))
+    in_cash = round(starting_cash - manager.portfolio['CASH']['balance'])
+    return logged, in_cash
+
+def benchmark(clients=8, trades=50):
+    """Concurrent buys from `clients` processes: direct file rewrites vs the service"""
+    import tempfile
+    import threading
+
+    total = clients * trades
+    print(f"PORTFOLIO SERVICE BENCHMARK ({clients} concurrent clients x {trades} buys)")
+    print("=" * 60)
+
+    for label in ('direct file rewrite', 'portfolio service'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager = SimplePortfolio(data_dir)
+                manager.portfolio['CASH']['balance'] = 1e6
+                manager.save_portfolio()
+            starting_cash = 1e6
+
+            if label == 'direct file rewrite':
+                elapsed = run_concurrent(direct_worker, lambda i: (data_dir, trades, f"C{i}"), clients)
+                groups = None
+            else:
+                socket_path = os.path.join(data_dir, 'portfolio.sock')
+                service = PortfolioService(data_dir, socket_path)
+                thread = threading.Thread(target=asyncio.run, args=(service.run(),), daemon=True)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    thread.start()
+                    while not os.path.exists(socket_path):
+                        time.sleep(0.01)
+                    elapsed = run_concurrent(client_worker, lambda i: (socket_path, trades, f"C{i}"), clients)
+                    groups = service.stats['groups']
+                    client = PortfolioClient.connect(socket_path)
+                    client.call('shutdown')
+                    client.close()
+                    thread.join()
+
+            logged, in_cash = check_state(data_dir, total, starting_cash)
+            commits = f", {groups} group commits" if groups is not None else ""
+            print(f"{label:<20} {total / elapsed:8.1f} trades/sec | logged {logged}/{total} | "
+                  f"in cash {in_cash}/{total} | lost {total - in_cash}{commits}")
+
+def control(action, data_dir=None, backend=None):
+    """'serve' (blocks until stopped), 'stop' or 'status'; returns True on success"""
+    if action == 'serve':
+        if not hasattr(socket, 'AF_UNIX'):
+            print("[ERROR] The portfolio service needs Unix domain sockets")
+            return False
+        try:
+            asyncio.run(PortfolioService(data_dir, backend=backend).run())
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            return False
+        return True
+
+    client = PortfolioClient.connect(default_socket_path(data_dir))
+    if client is None:
+        print("[INFO] Portfolio service is not running")
+        return action == 'stop'
+    try:
+        if action == 'stop':
+            return client.call('shutdown')
+        stats = client.call('service_stats')
+        print(f"[OK] Portfolio service running: {stats['trades']} trades in {stats['groups']} group commits "
+              f"(largest group {stats['largest_group']}), {stats['requests']} requests")
+        return True
+    finally:
+        client.close()
+
+def main():
+    """'serve [DATA_DIR]', 'stop', 'status' or 'benchmark [CLIENTS] [TRADES]'"""
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command in ('serve', 'stop', 'status'):
+        data_dir = sys.argv[2] if len(sys.argv) > 2 else None
+        sys.exit(0 if control(command, data_dir) else 1)
+    elif command == 'benchmark':
+        benchmark(*(int(n) for n in sys.argv[2:4]))
+    else:
+        print("Usage:")
+        print("  python portfolio_service.py serve|stop|status [DATA_DIR]")
+        print("  python portfolio_service.py benchmark [CLIENTS] [TRADES]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Portfolio Store
+Crash-safe JSON persistence: atomic snapshots, an append-only journal and write-behind saves
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import tempfile
+import threading
+
+FSYNC_POLICIES = ('none', 'snapshot', 'always')
+
+class PortfolioStore:
+    """Persist the portfolio dict without ever leaving a truncated file behind
+
+    Every save appends the full state as one line to `<file>.journal`, then
+    the snapshot is rewritten through a temp file and os.replace(). Once the
+    snapshot is in place the journal is truncated. If a save is torn, load()
+    returns the newest complete journal entry instead of resetting state.
+
+    fsync policy: 'none' (rely on the OS), 'snapshot' (fsync the snapshot and
+    its directory) or 'always' (also fsync every journal append).
+    With write_behind=True, snapshot rewrites are coalesced: saves inside
+    `flush_delay` seconds produce one rewrite. The journal keeps each save.
+    """
+
+    def __init__(self, path, fsync='none', write_behind=False, flush_delay=0.25, journal=True):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.fsync = fsync
+        self.write_behind = write_behind
+        self.flush_delay = flush_delay
+        self.journal = journal
+
+        self.lock = threading.RLock()
+        self.pending = None
+        self.timer = None
+        self.stats = {'saves': 0, 'snapshots': 0, 'recoveries': 0}
+
+        if write_behind:
+            atexit.register(self.flush)
+
+    # ---- loading -------------------------------------------------------
+
+    def read_snapshot(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARNING] Portfolio snapshot unreadable: {e}")
+            return None
+
+    def read_journal(self):
+        """Newest complete journal entry, skipping a torn final line"""
+        try:
+            with open(self.journal_path, 'r') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+        for line in reversed(lines):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+        return None
+
+    def load(self):
+        """Return the latest durable state, or None if nothing has been saved"""
+        snapshot = self.read_snapshot()
+        journaled = self.read_journal() if self.journal else None
+
+        if journaled is not None and journaled != snapshot:
+            print("[WARNING] Recovered portfolio from journal (last save was interrupted)")
+            self.stats['recoveries'] += 1
+            # Put the recovered state back into the snapshot straight away
+            self.write_snapshot(json.dumps(journaled, indent=2))
+            return journaled
+
+        return snapshot
+
+    # ---- saving --------------------------------------------------------
+
+    def save(self, state):
+        with self.lock:
+            data = json.dumps(state, indent=2)
+            self.stats['saves'] += 1
+
+            if self.journal:
+                self.append_journal(json.dumps(state, separators=(',', ':')))
+
+            if self.write_behind:
+                self.pending = data
+                if self.timer is None:
+                    self.timer = threading.Timer(self.flush_delay, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+            else:
+                self.write_snapshot(data)
+
+    def flush(self):
+        """Write any coalesced snapshot now"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.pending is not None:
+                data, self.pending = self.pending, None
+                self.write_snapshot(data)
+
+    def append_journal(self, line):
+        with open(self.journal_path, 'a') as f:
+            f.write(line + '\n')
+            if self.fsync == 'always':
+                f.flush()
+                os.fsync(f.fileno())
+
+    def write_snapshot(self, data):
+        """Atomically replace the snapshot, then checkpoint the journal"""
+        directory = os.path.dirname(self.path) or '.'
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+                if self.fsync != 'none':
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self.fsync != 'none':
+            self.fsync_directory(directory)
+
+        # The snapshot now holds everything the journal did
+        if self.journal and os.path.exists(self.journal_path):
+            open(self.journal_path, 'w').close()
+
+        self.stats['snapshots'] += 1
+
+    @staticmethod
+    def fsync_directory(directory):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return  # Windows cannot fsync a directory handle
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def benchmark(saves=500, positions=50):
+    """Measure saves/sec for the legacy in-place write and each durability setting"""
+    state = {f"SYM{i:03d}": {'shares': 10.0 + i, 'avg_cost': 5.0, 'total_invested': 50.0 + i}
+             for i in range(positions)}
+    state['CASH'] = {'balance': 650.0}
+
+    settings = [
+        ('legacy open(w) + json.dump', None),
+        ('atomic, fsync=none', {'fsync': 'none'}),
+        ('atomic, fsync=snapshot', {'fsync': 'snapshot'}),
+        ('atomic, fsync=always', {'fsync': 'always'}),
+        ('write-behind, fsync=none', {'fsync': 'none', 'write_behind': True}),
+        ('write-behind, fsync=always', {'fsync': 'always', 'write_behind': True})
+    ]
+
+    print(f"PORTFOLIO SAVE BENCHMARK ({saves} saves, {positions} positions)")
+    print("=" * 55)
+
+    for label, options in settings:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'current_portfolio.json')
+            store = PortfolioStore(path, **options) if options is not None else None
+
+            start = time.perf_counter()
+            for i in range(saves):
+                state['CASH']['balance'] = 650.0 + i
+                if store is None:
+                    with open(path, 'w') as f:
+                        json.dump(state, f, indent=2)
+                else:
+                    store.save(state)
+            if store is not None:
+                store.flush()
+            elapsed = time.perf_counter() - start
+
+            snapshots = store.stats['snapshots'] if store else saves
+            print(f"{label:<30} {saves / elapsed:10.0f} saves/sec  ({snapshots} snapshot writes)")
+
+if __name__ == "__main__":
+    benchmark(saves=int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,290 @@
+"""
+Price History
+Columnar daily OHLCV store: one fixed-dtype NumPy memmap per field per symbol, indexed by date
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import date as date_type
+
+import numpy as np
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.dirname(__file__), 'cache', 'history')
+
+# Column name -> on-disk dtype; every column of a symbol has the same row count
+FIELDS = {
+    'date': np.dtype('<M8[D]'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<i8')
+}
+
+TRADING_DAYS = 252
+
+def to_day(value):
+    """numpy datetime64[D] for a date, datetime, ISO string or datetime64"""
+    if isinstance(value, date_type):
+        value = value.isoformat()[:10]
+    return np.datetime64(value, 'D')
+
+def max_drawdown(close):
+    """Largest peak-to-trough decline as a negative percent (0.0 for fewer than two bars)"""
+    close = np.asarray(close, dtype=np.float64)
+    if close.size < 2:
+        return 0.0
+    peaks = np.maximum.accumulate(close)
+    return float(((close - peaks) / peaks).min() * 100)
+
+def volatility(close, periods=TRADING_DAYS):
+    """Annualized standard deviation of daily log returns, in percent"""
+    close = np.asarray(close, dtype=np.float64)
+    if close.size < 3:
+        return 0.0
+    returns = np.diff(np.log(close))
+    return float(returns.std(ddof=1) * np.sqrt(periods) * 100)
+
+class HistoryStore:
+    """Append-only daily bars under root/SYMBOL/<field>.bin
+
+    Columns are raw little-endian arrays, so readers map them with np.memmap
+    and slice without parsing or copying. index.json holds each symbol's
+    committed row count and date range; it is rewritten atomically after the
+    columns are appended, so a crash mid-append leaves extra bytes that the
+    next append truncates away rather than a torn bar. Dates are stored in
+    ascending order, so a date range is two binary searches on the date column.
+    """
+
+    def __init__(self, root=DEFAULT_HISTORY_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        os.makedirs(root, exist_ok=True)
+        self.index = self.load_index()
+        self.maps = {}
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARNING] History index unreadable, starting empty: {e}")
+            return {}
+
+    def save_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def column_path(self, symbol, field):
+        return os.path.join(self.root, symbol, f"{field}.bin")
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self.index
+
+    def symbols(self):
+        return sorted(self.index)
+
+    def rows(self, symbol):
+        return self.index.get(symbol.upper(), {}).get('rows', 0)
+
+    # ---- writing ---------------------------------------------------------
+
+    def extend(self, symbol, dates, opens, highs, lows, closes, volumes, save=True):
+        """Append bars (ascending dates, all after the last stored bar); returns rows written
+
+        A first bar dated the same day as the last stored bar replaces it,
+        so intraday refreshes keep one bar per day.
+        """
+        symbol = symbol.upper()
+        columns = {
+            'date': np.asarray(dates, dtype=FIELDS['date']),
+            'open': np.asarray(opens, dtype=FIELDS['open']),
+            'high': np.asarray(highs, dtype=FIELDS['high']),
+            'low': np.asarray(lows, dtype=FIELDS['low']),
+            'close': np.asarray(closes, dtype=FIELDS['close']),
+            'volume': np.asarray(volumes, dtype=FIELDS['volume'])
+        }
+        count = len(columns['date'])
+        if count == 0:
+            return 0
+        if any(len(values) != count for values in columns.values()):
+            raise ValueError("all OHLCV columns need the same length")
+        if count > 1 and not (np.diff(columns['date']).astype(np.int64) > 0).all():
+            raise ValueError(f"{symbol} bars must have strictly ascending dates")
+
+        entry = self.index.get(symbol, {'rows': 0})
+        rows = entry['rows']
+        replace_last = False
+        if rows:
+            last = np.datetime64(entry['last'], 'D')
+            first_new = columns['date'][0]
+            if first_new < last:
+                raise ValueError(f"{symbol} bar for {first_new} is older than the stored {last}")
+            replace_last = first_new == last
+
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+        start = rows - 1 if replace_last else rows
+        for field, dtype in FIELDS.items():
+            path = self.column_path(symbol, field)
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                # Drop bytes past the committed rows (a torn append); committed bars are
+                # never shrunk, so open maps stay valid and a replaced bar is overwritten in place
+                f.truncate(rows * dtype.itemsize)
+                f.seek(start * dtype.itemsize)
+                columns[field].tofile(f)
+
+        entry = {
+            'rows': start + count,
+            'first': entry.get('first') or str(columns['date'][0]),
+            'last': str(columns['date'][-1])
+        }
+        self.index[symbol] = entry
+        self.maps.pop(symbol, None)
+        if save:
+            self.save_index()
+        return count
+
+    def append(self, symbol, day, open_, high, low, close, volume, save=True):
+        return self.extend(symbol, [to_day(day)], [open_], [high], [low], [close], [volume], save=save)
+
+    def append_quotes(self, market_data, day=None):
+        """Record one daily bar per quote ({symbol: market_data entry}); returns bars written
+
+        The quote's price is the bar's close so far; re-running on the same day
+        replaces that day's bar.
+        """
+        day = to_day(day or date_type.today())
+        written = 0
+        for symbol, quote in market_data.items():
+            price = quote.get('price') or 0
+            if price <= 0:
+                continue
+            try:
+                written += self.append(
+                    symbol, day,
+                    quote.get('open') or quote.get('previous_close') or price,
+                    quote.get('day_high') or price,
+                    quote.get('day_low') or price,
+                    price,
+                    int(quote.get('volume') or 0),
+                    save=False
+                )
+            except Exception as e:
+                print(f"[WARNING] History append failed for {symbol}: {e}")
+        if written:
+            self.save_index()
+        return written
+
+    # ---- reading ---------------------------------------------------------
+
+    def columns(self, symbol):
+        """{field: read-only memmap} over a symbol's committed rows (empty arrays if none)"""
+        symbol = symbol.upper()
+        rows = self.rows(symbol)
+        cached = self.maps.get(symbol)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+
+        if rows == 0:
+            maps = {field: np.empty(0, dtype=dtype) for field, dtype in FIELDS.items()}
+        else:
+            maps = {field: np.memmap(self.column_path(symbol, field), dtype=dtype, mode='r', shape=(rows,))
+                    for field, dtype in FIELDS.items()}
+        self.maps[symbol] = (rows, maps)
+        return maps
+
+    def bars(self, symbol, start=None, end=None, fields=None):
+        """Zero-copy {field: array} of bars with start <= date <= end (either bound optional)"""
+        columns = self.columns(symbol)
+        dates = columns['date']
+        lo = int(np.searchsorted(dates, to_day(start), 'left')) if start is not None else 0
+        hi = int(np.searchsorted(dates, to_day(end), 'right')) if end is not None else len(dates)
+        return {field: columns[field][lo:hi] for field in (fields or FIELDS)}
+
+    def last(self, symbol, count):
+        """Zero-copy {field: array} of the most recent `count` bars"""
+        columns = self.columns(symbol)
+        return {field: values[-count:] if count else values[:0] for field, values in columns.items()}
+
+    def risk(self, symbol, days=TRADING_DAYS):
+        """Drawdown, volatility and return over the last `days` bars; None without two bars"""
+        close = self.last(symbol, days)['close']
+        if len(close) < 2:
+            return None
+        return {
+            'bars': len(close),
+            'max_drawdown': max_drawdown(close),
+            'volatility': volatility(close),
+            'return_pct': float((close[-1] / close[0] - 1) * 100)
+        }
+
+    def close(self):
+        self.maps.clear()
+
+def benchmark(symbol_count=50, years=10, reads=200):
+    """Time a bulk backfill, range reads and risk stats against a JSON-per-symbol layout"""
+    import tempfile
+
+    days = years * TRADING_DAYS
+    dates = np.datetime64('2015-01-02') + np.arange(days)
+    rng = np.random.default_rng(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history'))
+        json_dir = os.path.join(tmp, 'json')
+        os.makedirs(json_dir)
+
+        series = {}
+        for i in range(symbol_count):
+            close = 10 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+            series[f"S{i:03d}"] = close
+
+        start = time.perf_counter()
+        for symbol, close in series.items():
+            store.extend(symbol, dates, close, close * 1.02, close * 0.98, close,
+                         np.full(days, 1_000_000), save=False)
+        store.save_index()
+        write_seconds = time.perf_counter() - start
+
+        for symbol, close in series.items():
+            with open(os.path.join(json_dir, f"{symbol}.json"), 'w') as f:
+                json.dump([{'date': str(d), 'open': c, 'high': c * 1.02, 'low': c * 0.98, 'close': c,
+                            'volume': 1_000_000} for d, c in zip(dates, close)], f)
+
+        symbols = list(series)
+        window = (str(dates[-TRADING_DAYS]), str(dates[-1]))
+
+        start = time.perf_counter()
+        reader = HistoryStore(store.root)
+        for n in range(reads):
+            close = reader.bars(symbols[n % symbol_count], *window, fields=['close'])['close']
+            max_drawdown(close), volatility(close)
+        memmap_seconds = (time.perf_counter() - start) / reads
+
+        start = time.perf_counter()
+        json_reads = max(1, reads // 10)
+        for n in range(json_reads):
+            with open(os.path.join(json_dir, f"{symbols[n % symbol_count]}.json")) as f:
+                bars = [b for b in json.load(f) if window[0] <= b['date'] <= window[1]]
+            close = np.array([b['close'] for b in bars])
+            max_drawdown(close), volatility(close)
+        json_seconds = (time.perf_counter() - start) / json_reads
+
+    print(f"PRICE HISTORY BENCHMARK ({symbol_count} symbols x {days:,} bars)")
+    print("=" * 55)
+    print(f"Backfill:                    {write_seconds * 1000:8.1f}ms")
+    print(f"1y range + risk (memmap):    {memmap_seconds * 1e6:8.1f}us per symbol")
+    print(f"1y range + risk (JSON file): {json_seconds * 1e6:8.1f}us per symbol")
+    print(f"Speedup:                     {json_seconds / memmap_seconds:8.1f}x")
+
+if __name__ == "__main__":
+    benchmark(*(int(n) for n in sys.argv[1:3]))
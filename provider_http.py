@@ -0,0 +1,322 @@
+"""
+Provider HTTP
+Shared GET layer for provider APIs: gzip transfer, ETag/Last-Modified revalidation and per-provider byte accounting
+"""
+
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+from run_metrics import http_span
+
+DEFAULT_HTTP_DIR = os.path.join(os.path.dirname(__file__), 'cache', 'http')
+
+# Query parameters carrying credentials; stripped from stored keys so API keys never reach disk
+CREDENTIAL_PARAMS = {'apikey', 'apiKey', 'token', 'api_token'}
+
+READ_SIZE = 64 * 1024
+
+class ResponseBody:
+    """Decoded, file-like view of a response or of a replayed stored body
+
+    read(size) returns at most `size` decoded bytes, and b'' only once the
+    body is done. With a `sink`, the raw wire bytes are copied to it as they
+    arrive. That stores a fresh 200 for later 304 replays without keeping a
+    second copy in memory.
+    """
+
+    def __init__(self, raw, encoding=None, sink=None):
+        self.raw = raw
+        self.decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+        self.sink = sink
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.done = False
+
+    def read(self, size=-1):
+        limit = size if size is not None and size > 0 else 0
+        while True:
+            if self.decoder is not None and self.decoder.unconsumed_tail:
+                # Output is capped at `size`, so a highly compressed chunk is inflated over several reads
+                data = self.decoder.decompress(self.decoder.unconsumed_tail, limit)
+            elif self.done:
+                return b''
+            else:
+                # http.client wants None, not -1, for "the rest"
+                raw = self.raw.read(limit or None)
+                if not raw:
+                    self.done = True
+                    data = self.decoder.flush() if self.decoder is not None else b''
+                else:
+                    self.wire_bytes += len(raw)
+                    if self.sink is not None:
+                        self.sink.write(raw)
+                    data = self.decoder.decompress(raw, limit) if self.decoder is not None else raw
+            # A gzip header alone decodes to nothing; keep reading rather than signal the end
+            if data or self.done:
+                self.body_bytes += len(data)
+                return data
+
+class ProviderHTTP:
+    """GET provider URLs with gzip transfer and conditional revalidation
+
+    A response with an ETag or Last-Modified is kept: the raw wire bytes go
+    under root/bodies and the validators into root/validators.sqlite. The
+    next request for that URL sends If-None-Match / If-Modified-Since. A 304
+    replays the stored body through the same decoder, so callers always get
+    a full body. Per-provider request, wire and decoded byte counts are kept
+    in `stats`, and each call's http span records bytes and bytes_saved.
+    """
+
+    def __init__(self, root=DEFAULT_HTTP_DIR, max_entries=5000):
+        self.root = root
+        self.bodies_dir = os.path.join(root, 'bodies')
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {}
+
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        # Quote batches and news scans call in from worker threads; every use holds self.lock
+        self.conn = sqlite3.connect(os.path.join(root, 'validators.sqlite'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                wire_bytes INTEGER NOT NULL,
+                validated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_validators_validated ON validators (validated_at)")
+        self.conn.commit()
+
+    # ---- stored validators ---------------------------------------------
+
+    @staticmethod
+    def cache_key(url):
+        """The URL without credential parameters or fragment"""
+        parts = urllib.parse.urlsplit(url)
+        query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                 if k not in CREDENTIAL_PARAMS]
+        return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query), fragment=''))
+
+    def body_path(self, key):
+        return os.path.join(self.bodies_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.body')
+
+    def validators(self, key):
+        """(etag, last_modified, encoding) for a stored body, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, encoding FROM validators WHERE key=?", (key,)
+            ).fetchone()
+        if row is not None and not os.path.exists(self.body_path(key)):
+            return None
+        return row
+
+    def remember(self, key, provider, etag, last_modified, encoding, wire_bytes, tmp_path):
+        os.replace(tmp_path, self.body_path(key))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, etag, last_modified, encoding, wire_bytes, time.time())
+            )
+            self.evict()
+            self.conn.commit()
+
+    def touch(self, key):
+        with self.lock:
+            self.conn.execute("UPDATE validators SET validated_at=? WHERE key=?", (time.time(), key))
+            self.conn.commit()
+
+    def evict(self):
+        """Drop the least recently validated bodies beyond max_entries (caller holds the lock)"""
+        count = self.conn.execute("SELECT COUNT(*) FROM validators").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            keys = [row[0] for row in self.conn.execute(
+                "SELECT key FROM validators ORDER BY validated_at ASC LIMIT ?", (excess,))]
+            self.conn.executemany("DELETE FROM validators WHERE key=?", [(k,) for k in keys])
+            for key in keys:
+                try:
+                    os.remove(self.body_path(key))
+                except OSError:
+                    pass
+
+    # ---- requests ------------------------------------------------------
+
+    def record(self, provider, **counts):
+        with self.lock:
+            totals = self.stats.setdefault(provider, {'requests': 0, 'not_modified': 0,
+                                                      'wire_bytes': 0, 'body_bytes': 0})
+            for name, amount in counts.items():
+                totals[name] += amount
+
+    @contextmanager
+    def stream(self, provider, endpoint, url, timeout=10, ssl_context=None, **attrs):
+        """GET `url` and yield its decoded ResponseBody; a 304 yields the stored body instead
+
+        HTTP errors other than a revalidated 304 propagate as urllib raises them.
+        """
+        key = self.cache_key(url)
+        stored = self.validators(key)
+        headers = {'Accept-Encoding': 'gzip'}
+        if stored is not None:
+            etag, last_modified, _ = stored
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        with http_span(provider, endpoint, **attrs) as span:
+            try:
+                response = urllib.request.urlopen(urllib.request.Request(url, headers=headers),
+                                                  context=ssl_context, timeout=timeout)
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or stored is None:
+                    raise
+                e.close()
+                response = None
+
+            if response is None:
+                with open(self.body_path(key), 'rb') as f:
+                    body = ResponseBody(f, stored[2])
+                    yield body
+                self.touch(key)
+                self.record(provider, requests=1, not_modified=1, body_bytes=body.body_bytes)
+                span.set(status=304, bytes=0, bytes_saved=body.body_bytes)
+                return
+
+            with response:
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                encoding = (response.headers.get('Content-Encoding') or '').lower() or None
+
+                sink = tmp_path = None
+                if etag or last_modified:
+                    tmp_path = f"{self.body_path(key)}.{threading.get_ident()}.tmp"
+                    sink = open(tmp_path, 'wb')
+                body = ResponseBody(response, encoding, sink)
+
+                try:
+                    yield body
+                    if sink is not None:
+                        # The caller may stop at the closing ']'; the stored copy must be whole
+                        while body.read(READ_SIZE):
+                            pass
+                except BaseException:
+                    if sink is not None:
+                        sink.close()
+                        os.remove(tmp_path)
+                    raise
+
+                if sink is not None:
+                    sink.close()
+                    self.remember(key, provider, etag, last_modified, encoding, body.wire_bytes, tmp_path)
+
+            self.record(provider, requests=1, wire_bytes=body.wire_bytes, body_bytes=body.body_bytes)
+            span.set(status=response.status, bytes=body.wire_bytes,
+                     bytes_saved=body.body_bytes - body.wire_bytes)
+
+    def get(self, provider, endpoint, url, timeout=10, ssl_context=None, **attrs):
+        """Whole decoded body of a GET (see stream)"""
+        with self.stream(provider, endpoint, url, timeout, ssl_context, **attrs) as body:
+            return b''.join(iter(lambda: body.read(READ_SIZE), b''))
+
+    def summary(self):
+        """One-line transfer summary per provider for progress output"""
+        with self.lock:
+            stats = {provider: dict(s) for provider, s in self.stats.items()}
+        if not stats:
+            return "HTTP: no provider requests"
+
+        parts = []
+        for provider, s in sorted(stats.items()):
+            saved = s['body_bytes'] - s['wire_bytes']
+            rate = (saved / s['body_bytes'] * 100) if s['body_bytes'] else 0
+            parts.append(f"{provider} {s['requests']} requests ({s['not_modified']} not modified), "
+                         f"{format_bytes(s['wire_bytes'])} transferred, {format_bytes(saved)} saved ({rate:.0f}%)")
+        return "HTTP: " + "; ".join(parts)
+
+    def close(self):
+        self.conn.close()
+
+def format_bytes(count):
+    if count < 1024:
+        return f"{count}B"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f}KB"
+    return f"{count / 1024 / 1024:.1f}MB"
+
+_clients = {}
+
+def get_http_client(root=DEFAULT_HTTP_DIR):
+    """Return the shared ProviderHTTP for a cache directory, creating it on first use"""
+    root = os.path.abspath(root)
+    if root not in _clients:
+        _clients[root] = ProviderHTTP(root)
+    return _clients[root]
+
+def benchmark(symbol_count=200, news_symbols=50, universe_size=3000, latency=0.01):
+    """Poll quotes, news and a universe listing twice through the stub: cold, then revalidated"""
+    import tempfile
+    from stub_server import StubProviderServer
+    from quote_fetcher import QuoteFetcher
+    from news_scanner import NewsScanner, TokenBucket
+    from universe_scanner import UniverseScanner
+
+    symbols = [f"S{i:04d}" for i in range(symbol_count)]
+    server = StubProviderServer(latency=latency, universe_size=universe_size).start()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            http = ProviderHTTP(tmp)
+            fetcher = QuoteFetcher('stub', base_url=server.base_url, http=http)
+            scanner = NewsScanner('stub', base_url=server.news_url, rate_limiter=TokenBucket(200, 200), http=http)
+            universe = UniverseScanner('stub', base_url=server.base_url, top_n=20, http=http)
+
+            polls = []
+            for label in ('cold poll', 'repeat poll'):
+                before = {p: dict(s) for p, s in http.stats.items()}
+                start = time.perf_counter()
+                results = (fetcher.fetch_quotes(symbols),
+                           scanner.fetch_news(symbols[:news_symbols], '2025-01-01T00:00:00'),
+                           universe.scan())
+                seconds = time.perf_counter() - start
+                delta = {p: {name: s[name] - before.get(p, {}).get(name, 0) for name in s}
+                         for p, s in http.stats.items()}
+                polls.append((label, seconds, delta, results))
+            http.close()
+    finally:
+        server.stop()
+
+    print(f"PROVIDER HTTP BENCHMARK ({symbol_count} quotes, {news_symbols} news symbols, "
+          f"{universe_size * 3:,}-ticker universe)")
+    print("=" * 78)
+    print(f"{'poll':<12} {'provider':<8} {'requests':>8} {'304s':>5} {'uncompressed':>13} "
+          f"{'transferred':>12} {'saved':>6}")
+    for label, seconds, delta, _ in polls:
+        for provider, s in sorted(delta.items()):
+            saved = s['body_bytes'] - s['wire_bytes']
+            rate = (saved / s['body_bytes'] * 100) if s['body_bytes'] else 0
+            print(f"{label:<12} {provider:<8} {s['requests']:>8} {s['not_modified']:>5} "
+                  f"{format_bytes(s['body_bytes']):>13} {format_bytes(s['wire_bytes']):>12} {rate:5.1f}%")
+        print(f"{label:<12} {'':<8} {seconds:7.2f}s end to end")
+
+    if polls[0][3] != polls[1][3]:
+        print("[ERROR] Revalidated poll returned different data")
+        sys.exit(1)
+    print("[OK] Revalidated poll returned the same quotes, news and candidates")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,96 @@
+"""
+Quote Fetcher
+Batched, concurrent FMP quote retrieval for portfolio and watchlist symbols
+"""
+
+import json
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+
+from provider_http import get_http_client
+
+FMP_BASE_URL = 'https://financialmodelingprep.com/api/v3'
+
+class QuoteFetcher:
+    """Fetch FMP quotes in comma-separated batches over a bounded worker pool"""
+
+    def __init__(self, api_key, base_url=FMP_BASE_URL, batch_size=50, max_workers=4,
+                 timeout=10, ssl_context=None, cache=None, http=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.cache = cache
+        self.http = http or get_http_client()
+
+    @staticmethod
+    def parse_quote(quote):
+        """Convert one FMP quote record into the market_data entry shape"""
+        return {
+            'price': quote.get('price', 0),
+            'open': quote.get('open', 0),
+            'change': quote.get('change', 0),
+            'change_pct': quote.get('changesPercentage', 0),
+            'volume': quote.get('volume', 0),
+            'avg_volume': quote.get('avgVolume', 0),
+            'day_high': quote.get('dayHigh', 0),
+            'day_low': quote.get('dayLow', 0),
+            'previous_close': quote.get('previousClose', 0)
+        }
+
+    def make_batches(self, symbols):
+        """Split symbols into de-duplicated batches of at most batch_size"""
+        unique = list(dict.fromkeys(s.upper() for s in symbols))
+        return [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+
+    def batch_url(self, batch):
+        """Build the quote URL for one batch of symbols"""
+        return f"{self.base_url}/quote/{','.join(batch)}?apikey={self.api_key}"
+
+    def fetch_batch(self, batch):
+        """Fetch one batch; returns a list of raw FMP quote records"""
+        try:
+            raw = self.http.get('FMP', 'quote', self.batch_url(batch), self.timeout, self.ssl_context,
+                                symbols=len(batch))
+            data = json.loads(raw.decode())
+
+            if isinstance(data, list):
+                return data
+            return []
+
+        except Exception as e:
+            print(f"Market data error for {','.join(batch)}: {e}")
+            return []
+
+    def fetch_quotes(self, symbols):
+        """Fetch quotes for all symbols, returning {symbol: market_data entry}"""
+        ordered = list(dict.fromkeys(s.upper() for s in symbols))
+        market_data = {}
+
+        # Fresh cached quotes skip the network entirely
+        if self.cache is not None:
+            market_data, ordered_missing = self.cache.get_many('FMP', ordered, 'quote', 'quote')
+        else:
+            ordered_missing = ordered
+
+        batches = self.make_batches(ordered_missing)
+        if batches:
+            requested = {s for batch in batches for s in batch}
+            fetched = {}
+
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for quotes in pool.map(self.fetch_batch, batches):
+                    for quote in quotes:
+                        symbol = str(quote.get('symbol', '')).upper()
+                        if symbol in requested:
+                            fetched[symbol] = self.parse_quote(quote)
+
+            if self.cache is not None:
+                self.cache.put_many('FMP', fetched, 'quote', 'quote')
+            market_data.update(fetched)
+
+        # Keep the caller's symbol order, matching the one-request-per-symbol loop
+        return {s: market_data[s] for s in ordered if s in market_data}
@@ -0,0 +1,186 @@
+"""
+Run Metrics
+Lightweight spans for pipeline stages and outbound HTTP calls, written as JSON per run
+"""
+
+import os
+import io
+import json
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+DEFAULT_METRICS_DIR = os.path.join(os.path.dirname(__file__), 'output', 'metrics')
+
+class Span:
+    """One timed unit of work with free-form attributes"""
+
+    def __init__(self, kind, name, attrs):
+        self.kind = kind
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self):
+        return {'kind': self.kind, 'name': self.name,
+                'duration_ms': round((self.duration or 0) * 1000, 3), **self.attrs}
+
+class RunMetrics:
+    """Collect stage and HTTP spans for one pipeline run
+
+    Profiling is opt-in through `profile`: 'cprofile', 'tracemalloc' or 'all'
+    (the METRICS_PROFILE environment variable sets the default).
+    """
+
+    def __init__(self, pipeline, metrics_dir=DEFAULT_METRICS_DIR, profile=None, cache=None):
+        self.pipeline = pipeline
+        self.metrics_dir = metrics_dir
+        self.profile = (profile if profile is not None else os.environ.get('METRICS_PROFILE', '')).lower()
+        self.cache = cache
+        self.spans = []
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.profiler = None
+        self.memory = None
+
+    def __enter__(self):
+        set_current(self)
+        # Profilers are imported on demand so unprofiled runs start faster
+        if self.profile in ('cprofile', 'all'):
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if self.profile in ('tracemalloc', 'all'):
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.profile in ('tracemalloc', 'all'):
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+                tracemalloc.stop()
+                self.memory = {
+                    'current_kb': round(current / 1024, 1),
+                    'peak_kb': round(peak / 1024, 1),
+                    'top_allocations': [{'site': str(stat.traceback), 'kb': round(stat.size / 1024, 1)}
+                                        for stat in top]
+                }
+        set_current(None)
+        return False
+
+    @contextmanager
+    def span(self, name, kind='stage', **attrs):
+        """Time a block; cache hit/miss deltas are recorded when a cache is attached"""
+        span = Span(kind, name, attrs)
+        cache_before = dict(self.cache.stats) if self.cache is not None else None
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=str(e)[:200])
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            if cache_before is not None and kind == 'stage':
+                hits = self.cache.stats['hits'] - cache_before['hits']
+                misses = self.cache.stats['misses'] - cache_before['misses']
+                if hits or misses:
+                    span.set(cache_hits=hits, cache_misses=misses)
+            with self.lock:
+                self.spans.append(span)
+
+    def stage_durations(self):
+        return {s.name: s.duration for s in self.spans if s.kind == 'stage'}
+
+    def footer(self, labels=None):
+        """Compact one-line timing summary for appending to a Telegram report"""
+        labels = labels or {}
+        parts = [f"{labels.get(name, name)} {format_duration(seconds)}"
+                 for name, seconds in self.stage_durations().items()]
+        http_calls = sum(1 for s in self.spans if s.kind == 'http')
+        parts.append(f"{http_calls} calls")
+        return "⏱ " + " • ".join(parts)
+
+    def summary(self):
+        http = [s for s in self.spans if s.kind == 'http']
+        by_provider = {}
+        for s in http:
+            p = by_provider.setdefault(s.attrs.get('provider', 'unknown'),
+                                       {'calls': 0, 'duration_ms': 0.0, 'bytes': 0, 'bytes_saved': 0,
+                                        'not_modified': 0, 'retries': 0, 'errors': 0})
+            p['calls'] += 1
+            p['duration_ms'] += (s.duration or 0) * 1000
+            p['bytes'] += s.attrs.get('bytes', 0)
+            p['bytes_saved'] += s.attrs.get('bytes_saved', 0)
+            p['not_modified'] += s.attrs.get('status') == 304
+            p['retries'] += s.attrs.get('retry', 0) > 0
+            p['errors'] += 'error' in s.attrs
+
+        data = {
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.isoformat(),
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'stages': [s.to_dict() for s in self.spans if s.kind == 'stage'],
+            'http': by_provider,
+            'http_calls': [s.to_dict() for s in http]
+        }
+        if self.cache is not None:
+            data['cache'] = dict(self.cache.stats)
+        if self.memory is not None:
+            data['memory'] = self.memory
+        if self.profiler is not None:
+            import pstats
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(15)
+            data['profile_top'] = stream.getvalue().splitlines()
+        return data
+
+    def write(self):
+        """Write the metrics JSON (and .prof when profiling); returns the JSON path"""
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        stamp = self.started_at.strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.metrics_dir, f"{self.pipeline}_{stamp}.json")
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2, default=str)
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(self.metrics_dir, f"{self.pipeline}_{stamp}.prof"))
+        return path
+
+class NullMetrics:
+    """Stand-in used when no run is active, so instrumentation costs nothing"""
+
+    @contextmanager
+    def span(self, name, kind='stage', **attrs):
+        yield Span(kind, name, attrs)
+
+_null = NullMetrics()
+_current = None
+
+def set_current(run):
+    global _current
+    _current = run
+
+def current():
+    """The active RunMetrics, or a no-op recorder"""
+    return _current or _null
+
+def http_span(provider, endpoint, **attrs):
+    """Span for one outbound HTTP call on the active run"""
+    return current().span(endpoint, kind='http', provider=provider, **attrs)
+
+def format_duration(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
@@ -5,19 +5,16 @@ Reports GitHub Actions workflow status to Telegram
 
 import os
 import sys
-import json
-import urllib.request
-import urllib.parse
-import ssl
 from datetime import datetime
 
+from telegram_client import TelegramClient
+
 def send_status_update(job_status):
     """Send workflow status update to Telegram"""
 
-    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+    telegram = TelegramClient.from_env()
 
-    if not bot_token or not chat_id:
+    if telegram is None:
         print("[ERROR] Missing Telegram credentials")
         return
 
@@ -68,36 +65,17 @@ def send_status_update(job_status):
 
 <i>Automated status from enterprise cloud infrastructure</i>"""
 
-    try:
-        ssl_context = ssl.create_default_context()
-
-        data = urllib.parse.urlencode({
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }).encode('utf-8')
-
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        req = urllib.request.Request(url, data=data)
-
-        with urllib.request.urlopen(req, context=ssl_context, timeout=15) as response:
-            result = json.loads(response.read().decode())
-
-        if result.get('ok'):
-            print(f"[OK] Status update sent successfully: {status_text}")
-        else:
-            print(f"[ERROR] Status update failed: {result}")
-
-    except Exception as e:
-        print(f"[ERROR] Failed to send status update: {e}")
+    if telegram.send_message(message):
+        print(f"[OK] Status update sent successfully: {status_text}")
+    else:
+        print(f"[ERROR] Status update failed: {status_text}")
 
 def send_system_health_check():
     """Send periodic system health check"""
 
-    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+    telegram = TelegramClient.from_env()
 
-    if not bot_token or not chat_id:
+    if telegram is None:
         print("[ERROR] Missing credentials for health check")
         return
 
@@ -136,28 +114,10 @@ def send_system_health_check():
 
 <i>All systems nominal - trading alerts guaranteed</i>"""
 
-    try:
-        ssl_context = ssl.create_default_context()
-
-        data = urllib.parse.urlencode({
-            'chat_id': chat_id,
-            'text': health_message,
-            'parse_mode': 'HTML'
-        }).encode('utf-8')
-
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        req = urllib.request.Request(url, data=data)
-
-        with urllib.request.urlopen(req, context=ssl_context, timeout=15) as response:
-            result = json.loads(response.read().decode())
-
-        if result.get('ok'):
-            print("[OK] Health check sent successfully")
-        else:
-            print(f"[ERROR] Health check failed: {result}")
-
-    except Exception as e:
-        print(f"[ERROR] Failed to send health check: {e}")
+    if telegram.send_message(health_message):
+        print("[OK] Health check sent successfully")
+    else:
+        print("[ERROR] Health check failed")
 
 def main():
     """Main function to handle different status update types"""
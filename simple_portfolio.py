@@ -4,29 +4,101 @@ Simple Portfolio Manager - No Unicode Issues
 """
 
 import os
-import json
 import csv
+import copy
 from datetime import datetime
 
+from transaction_log import TransactionLog
+from portfolio_store import PortfolioStore
+from cost_basis import LotBook, SHARE_EPSILON
+
+BACKENDS = ('file', 'sqlite')
+
+def open_portfolio(data_dir=None):
+    """Client for the running portfolio service (see portfolio_service.py), else a local SimplePortfolio
+
+    Through the service, concurrent trades are applied one at a time instead
+    of each process rewriting the files it loaded.
+    """
+    from portfolio_service import PortfolioClient, default_socket_path
+    return PortfolioClient.connect(default_socket_path(data_dir)) or SimplePortfolio(data_dir)
+
+def load_saved_portfolio(data_dir=None, backend=None):
+    """Saved portfolio dict from the configured backend, or None if nothing was saved
+
+    Read-only (no starting portfolio is created), so reports can read the
+    state the portfolio service or CLI last committed.
+    """
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'portfolio_data')
+    backend = backend or os.environ.get('PORTFOLIO_BACKEND', 'file')
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+
+    if backend == 'sqlite':
+        database_file = os.path.join(data_dir, 'portfolio.db')
+        if not os.path.exists(database_file):
+            return None
+        from portfolio_db import PortfolioDB
+        db = PortfolioDB(database_file)
+        try:
+            return db.load()
+        finally:
+            db.close()
+    return PortfolioStore(os.path.join(data_dir, 'current_portfolio.json')).load()
+
 class SimplePortfolio:
-    def __init__(self):
+    def __init__(self, data_dir=None, fsync='none', write_behind=False, backend=None, cost_method=None):
         self.base_dir = os.path.dirname(__file__)
-        self.data_dir = os.path.join(self.base_dir, 'portfolio_data')
+        self.data_dir = data_dir or os.path.join(self.base_dir, 'portfolio_data')
         self.portfolio_file = os.path.join(self.data_dir, 'current_portfolio.json')
         self.transactions_file = os.path.join(self.data_dir, 'transactions.csv')
+        self.database_file = os.path.join(self.data_dir, 'portfolio.db')
+        self.lots_file = os.path.join(self.data_dir, 'lots.json')
+
+        # 'file' = JSON snapshot + CSV log, 'sqlite' = portfolio.db (see portfolio_db.py import)
+        self.backend = backend or os.environ.get('PORTFOLIO_BACKEND', 'file')
+        if self.backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {self.backend!r}")
 
         os.makedirs(self.data_dir, exist_ok=True)
+        if self.backend == 'sqlite':
+            from portfolio_db import PortfolioDB
+            self.db = PortfolioDB(self.database_file, fsync=fsync)
+            self.transaction_log = self.db
+            self.store = self.db
+            self.lot_store = None
+        else:
+            self.db = None
+            self.transaction_log = TransactionLog(self.transactions_file)
+            self.store = PortfolioStore(self.portfolio_file, fsync=fsync, write_behind=write_behind)
+            # No journal: a lost lot save is repaired by reconcile() against the portfolio
+            self.lot_store = PortfolioStore(self.lots_file, fsync=fsync, write_behind=write_behind, journal=False)
         self.portfolio = self.load_portfolio()
 
+        # Tax lots per symbol; sells match lots FIFO unless told otherwise (FIFO/LIFO/SPECIFIC)
+        self.cost_method = (cost_method or os.environ.get('COST_BASIS_METHOD', 'FIFO')).upper()
+        self.lots = self.load_lots()
+
+        # Trade rows waiting for flush_trades() while writes are deferred (None = write through)
+        self.pending_trades = None
+
     def load_portfolio(self):
-        if os.path.exists(self.portfolio_file):
-            try:
-                with open(self.portfolio_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return self.init_portfolio()
-        else:
-            return self.init_portfolio()
+        portfolio = self.store.load()
+        if portfolio is None:
+            portfolio = self.init_portfolio()
+            if self.db is not None:
+                # Trades only upsert the symbols they touch, so seed every starting position
+                self.db.save(portfolio)
+        return portfolio
+
+    def load_lots(self):
+        """Saved lot book, reconciled against the portfolio (positions without lots get one at avg cost)"""
+        data = self.db.load_lots() if self.db is not None else self.lot_store.load()
+        lots = LotBook.from_dict(data, self.cost_method) if data else LotBook(self.cost_method)
+        reset = lots.reconcile(self.portfolio)
+        if data and reset:
+            print(f"[WARNING] Lots out of sync with portfolio, reset at average cost: {', '.join(reset)}")
+        return lots
 
     def init_portfolio(self):
         return {
@@ -40,17 +112,41 @@ class SimplePortfolio:
 
     def save_portfolio(self):
         self.portfolio['last_updated'] = datetime.now().isoformat()
-        with open(self.portfolio_file, 'w') as f:
-            json.dump(self.portfolio, f, indent=2)
+        self.store.save(self.portfolio)
 
     def save_transaction(self, trans_data):
-        file_exists = os.path.exists(self.transactions_file)
-        with open(self.transactions_file, 'a', newline='') as f:
-            fieldnames = ['date', 'symbol', 'action', 'shares', 'price', 'amount', 'notes']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(trans_data)
+        self.transaction_log.append(trans_data)
+
+    def record_trades(self, transactions):
+        """Persist trade rows, lots and the updated portfolio, or queue them while writes are deferred"""
+        if self.pending_trades is not None:
+            self.pending_trades.extend(transactions)
+            return
+        self.write_trades(transactions)
+
+    def defer_writes(self):
+        """Hold trades in memory until flush_trades(), so many trades share one write"""
+        if self.pending_trades is None:
+            self.pending_trades = []
+
+    def flush_trades(self):
+        """Write every deferred trade with one log append and one snapshot; returns rows written"""
+        if not self.pending_trades:
+            return 0
+        transactions, self.pending_trades = self.pending_trades, []
+        self.write_trades(transactions)
+        return len(transactions)
+
+    def write_trades(self, transactions):
+        """Persist trade rows, lots and the portfolio (one atomic transaction on SQLite)"""
+        if self.db is not None:
+            self.portfolio['last_updated'] = datetime.now().isoformat()
+            self.db.commit(self.portfolio, transactions, self.lots)
+        else:
+            self.transaction_log.append_many(transactions)
+            self.lot_store.save(self.lots.to_dict())
+            self.save_portfolio()
+        self.lots.mark_saved()
 
     def buy_stock(self, symbol, shares_or_amount, price, is_dollar_amount=False):
         symbol = symbol.upper()
@@ -66,26 +162,7 @@ class SimplePortfolio:
             print(f"[ERROR] Not enough cash! Need ${dollar_amount:.2f}, have ${self.portfolio['CASH']['balance']:.2f}")
             return False
 
-        self.portfolio['CASH']['balance'] -= dollar_amount
-
-        if symbol in self.portfolio and symbol != 'CASH':
-            old_shares = self.portfolio[symbol]['shares']
-            old_total = self.portfolio[symbol]['total_invested']
-            new_shares = old_shares + shares
-            new_total = old_total + dollar_amount
-            new_avg_cost = new_total / new_shares
-
-            self.portfolio[symbol] = {
-                'shares': new_shares,
-                'avg_cost': new_avg_cost,
-                'total_invested': new_total
-            }
-        else:
-            self.portfolio[symbol] = {
-                'shares': shares,
-                'avg_cost': price,
-                'total_invested': dollar_amount
-            }
+        self.apply_buy(self.portfolio, symbol, shares, dollar_amount, price)
 
         transaction = {
             'date': datetime.now().strftime('%Y-%m-%d %H:%M'),
@@ -97,8 +174,7 @@ class SimplePortfolio:
             'notes': f"{'Dollar amount' if is_dollar_amount else 'Share count'} purchase"
         }
 
-        self.save_transaction(transaction)
-        self.save_portfolio()
+        self.record_trades([transaction])
 
         print(f"[OK] BUY CONFIRMED:")
         print(f"     {shares:.2f} shares of {symbol} at ${price:.2f}")
@@ -107,7 +183,7 @@ class SimplePortfolio:
 
         return True
 
-    def sell_stock(self, symbol, shares_or_percentage, price, is_percentage=False):
+    def sell_stock(self, symbol, shares_or_percentage, price, is_percentage=False, method=None, lot_ids=None):
         symbol = symbol.upper()
 
         if symbol not in self.portfolio or symbol == 'CASH':
@@ -121,27 +197,23 @@ class SimplePortfolio:
         else:
             shares = shares_or_percentage
 
-        if self.portfolio[symbol]['shares'] < shares:
+        if shares - self.portfolio[symbol]['shares'] > SHARE_EPSILON:
             print(f"[ERROR] Not enough shares! Have {self.portfolio[symbol]['shares']:.2f}, trying to sell {shares:.2f}")
             return False
 
         dollar_amount = shares * price
-        self.portfolio['CASH']['balance'] += dollar_amount
-
-        remaining_shares = self.portfolio[symbol]['shares'] - shares
+        self.lots.begin()
+        try:
+            fill = self.apply_sell(self.portfolio, symbol, shares, dollar_amount, price, method, lot_ids)
+        except ValueError as e:
+            self.lots.rollback()
+            print(f"[ERROR] Cannot match {symbol} lots: {e}")
+            return False
+        self.lots.commit()
 
-        if remaining_shares == 0:
-            del self.portfolio[symbol]
+        if symbol not in self.portfolio:
             print(f"[OK] POSITION CLOSED: {symbol}")
         else:
-            old_avg_cost = self.portfolio[symbol]['avg_cost']
-            new_total_invested = remaining_shares * old_avg_cost
-
-            self.portfolio[symbol] = {
-                'shares': remaining_shares,
-                'avg_cost': old_avg_cost,
-                'total_invested': new_total_invested
-            }
             print(f"[OK] PARTIAL SALE: {shares:.2f} shares of {symbol}")
 
         transaction = {
@@ -151,43 +223,210 @@ class SimplePortfolio:
             'shares': shares,
             'price': price,
             'amount': dollar_amount,
-            'notes': f"{'Percentage' if is_percentage else 'Share count'} sale"
+            'notes': f"{'Percentage' if is_percentage else 'Share count'} sale "
+                     f"({fill['method']}, realized ${fill['realized_pnl']:+.2f})"
         }
 
-        self.save_transaction(transaction)
-        self.save_portfolio()
+        self.record_trades([transaction])
 
         print(f"     {shares:.2f} shares at ${price:.2f}")
         print(f"     Total received: ${dollar_amount:.2f}")
+        print(f"     Realized P&L: ${fill['realized_pnl']:+.2f} ({fill['method']}, {len(fill['fills'])} lots)")
         print(f"     Cash balance: ${self.portfolio['CASH']['balance']:.2f}")
 
         return True
 
-    def show_portfolio(self):
+    def apply_buy(self, portfolio, symbol, shares, dollar_amount, price):
+        """Move cash into a new lot; the position's average cost is the open lots' cost"""
+        portfolio['CASH']['balance'] -= dollar_amount
+        self.lots.buy(symbol, shares, price, datetime.now().strftime('%Y-%m-%d %H:%M'))
+        portfolio[symbol] = self.lots.position(symbol)
+
+    def apply_sell(self, portfolio, symbol, shares, dollar_amount, price, method=None, lot_ids=None):
+        """Close shares against the symbol's lots and move the proceeds to cash; returns the fill"""
+        fill = self.lots.sell(symbol, shares, price, method, lot_ids)
+        portfolio['CASH']['balance'] += dollar_amount
+
+        position = self.lots.position(symbol)
+        if position is None:
+            del portfolio[symbol]
+        else:
+            portfolio[symbol] = position
+
+        return fill
+
+    def execute_batch(self, orders):
+        """Validate and apply a list of orders all-or-nothing with one portfolio save
+
+        Each order is a dict with 'action' (BUY/SELL), 'symbol', 'price' and one of
+        'shares', 'amount' (BUY dollars) or 'percentage' (SELL). A SELL may also
+        give a lot 'method' and, for SPECIFIC, 'lots' (ids separated by ';').
+        Legs are checked in order against the cash and share balances left by
+        the legs before them. Lot changes are rolled back if any leg fails.
+        """
+        self.lots.begin()
+        executed = False
+        try:
+            executed = self.apply_batch(orders)
+            return executed
+        finally:
+            if executed:
+                self.lots.commit()
+            else:
+                self.lots.rollback()
+
+    def apply_batch(self, orders):
+        working = copy.deepcopy(self.portfolio)
+        date = datetime.now().strftime('%Y-%m-%d %H:%M')
+        transactions = []
+
+        for leg_number, order in enumerate(orders, 1):
+            try:
+                action = str(order['action']).upper()
+                symbol = str(order['symbol']).upper()
+                price = float(order['price'])
+                # Optional numeric fields are parsed here too, so a bad value is an order error
+                amount, share_count, percentage = (
+                    None if order.get(field) in (None, '') else float(order[field])
+                    for field in ('amount', 'shares', 'percentage')
+                )
+            except (KeyError, ValueError, TypeError) as e:
+                print(f"[ERROR] Order {leg_number}: invalid order {order} ({e})")
+                return False
+
+            if price <= 0 or symbol in ['CASH', 'LAST_UPDATED']:
+                print(f"[ERROR] Order {leg_number}: invalid symbol or price for {symbol}")
+                return False
+
+            if action == 'BUY':
+                if amount is not None:
+                    dollar_amount = amount
+                    shares = dollar_amount / price
+                    notes = "Dollar amount purchase (batch)"
+                else:
+                    shares = share_count or 0
+                    dollar_amount = shares * price
+                    notes = "Share count purchase (batch)"
+
+                if shares <= 0:
+                    print(f"[ERROR] Order {leg_number}: nothing to buy for {symbol}")
+                    return False
+                if working['CASH']['balance'] < dollar_amount:
+                    print(f"[ERROR] Order {leg_number}: not enough cash for {symbol}! "
+                          f"Need ${dollar_amount:.2f}, have ${working['CASH']['balance']:.2f}")
+                    return False
+
+                self.apply_buy(working, symbol, shares, dollar_amount, price)
+
+            elif action == 'SELL':
+                if symbol not in working:
+                    print(f"[ERROR] Order {leg_number}: no position in {symbol}")
+                    return False
+
+                if percentage is not None:
+                    shares = working[symbol]['shares'] * (percentage / 100)
+                    notes = "Percentage sale (batch)"
+                else:
+                    shares = share_count or 0
+                    notes = "Share count sale (batch)"
+
+                if shares <= 0:
+                    print(f"[ERROR] Order {leg_number}: nothing to sell for {symbol}")
+                    return False
+                if shares - working[symbol]['shares'] > SHARE_EPSILON:
+                    print(f"[ERROR] Order {leg_number}: not enough {symbol} shares! "
+                          f"Have {working[symbol]['shares']:.2f}, trying to sell {shares:.2f}")
+                    return False
+
+                dollar_amount = shares * price
+                try:
+                    lot_ids = [int(i) for i in str(order.get('lots') or '').replace(';', ' ').split()]
+                    fill = self.apply_sell(working, symbol, shares, dollar_amount, price,
+                                           order.get('method') or None, lot_ids or None)
+                except ValueError as e:
+                    print(f"[ERROR] Order {leg_number}: cannot match {symbol} lots: {e}")
+                    return False
+                notes += f" ({fill['method']}, realized ${fill['realized_pnl']:+.2f})"
+
+            else:
+                print(f"[ERROR] Order {leg_number}: unknown action {action}")
+                return False
+
+            transactions.append({
+                'date': date,
+                'symbol': symbol,
+                'action': action,
+                'shares': shares,
+                'price': price,
+                'amount': dollar_amount,
+                'notes': notes
+            })
+
+        if not transactions:
+            print("[ERROR] No orders to execute")
+            return False
+
+        # Every leg validated: commit the batch with one append and one save
+        self.portfolio = working
+        self.record_trades(transactions)
+
+        print(f"[OK] BATCH EXECUTED: {len(transactions)} orders")
+        for trans in transactions:
+            print(f"     {trans['action']} {trans['shares']:.2f} {trans['symbol']} @ ${trans['price']:.2f} = ${trans['amount']:.2f}")
+        print(f"     Cash balance: ${self.portfolio['CASH']['balance']:.2f}")
+
+        return True
+
+    def load_order_file(self, path, default_action):
+        """Read orders from a CSV with a header of symbol, price and amount/percentage/shares
+
+        An optional 'action' column overrides the action given on the command line.
+        """
+        orders = []
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+                if not row.get('symbol'):
+                    continue
+                row['action'] = row.get('action') or default_action
+                orders.append(row)
+        return orders
+
+    def show_portfolio(self, prices=None):
         print("\n" + "="*50)
         print("CURRENT PORTFOLIO")
         print("="*50)
 
-        total_value = 0
-        cash = self.portfolio['CASH']['balance']
+        # Imported here so buy/sell never pay for numpy at startup
+        from valuation import ValuationEngine
+
+        # Value every position in one vectorized pass; without prices this is cost basis
+        valuation = ValuationEngine(self.portfolio).value(prices)
+        index = {symbol: i for i, symbol in enumerate(valuation['symbols'])}
+        cash = valuation['cash']
 
-        for symbol, data in self.portfolio.items():
+        for symbol in self.portfolio.keys():
             if symbol in ['CASH', 'last_updated']:
                 continue
 
-            shares = data['shares']
-            avg_cost = data['avg_cost']
-            invested = data['total_invested']
-
+            i = index[symbol]
             print(f"\n{symbol}:")
-            print(f"  Shares: {shares:.2f}")
-            print(f"  Avg Cost: ${avg_cost:.2f}")
-            print(f"  Invested: ${invested:.2f}")
+            data = self.portfolio[symbol]
+            print(f"  Shares: {data['shares']:.2f}")
+            print(f"  Avg Cost: ${data['avg_cost']:.2f}")
+            print(f"  Invested: ${data['total_invested']:.2f}")
 
-            total_value += invested
+            if valuation['priced'][i]:
+                print(f"  Price: ${valuation['prices'][i]:.2f}")
+                print(f"  Market Value: ${valuation['market_value'][i]:.2f}")
+                print(f"  Unrealized P&L: ${valuation['unrealized_pnl'][i]:+.2f} ({valuation['unrealized_pct'][i]:+.1f}%)")
 
         print(f"\nCASH: ${cash:.2f}")
-        print(f"TOTAL PORTFOLIO: ${total_value + cash:.2f}")
+        print(f"TOTAL PORTFOLIO: ${valuation['total_value']:.2f}")
+
+        realized = self.lots.realized_pnl()
+        if realized:
+            print(f"REALIZED P&L: ${realized:+.2f}")
         print("="*50)
 
     def quick_menu(self):
@@ -262,44 +501,89 @@ class SimplePortfolio:
             shares = float(input("Number of shares to sell: "))
             self.sell_stock(symbol, shares, price, is_percentage=False)
 
-    def show_recent_transactions(self):
-        if not os.path.exists(self.transactions_file):
+    def show_recent_transactions(self, count=10):
+        # Newest first, read backwards from the end of the log
+        transactions = self.transaction_log.tail(count)
+        if not transactions:
             print("No transactions yet")
             return
 
         print("\nRECENT TRANSACTIONS")
         print("-" * 30)
 
-        with open(self.transactions_file, 'r') as f:
-            reader = csv.DictReader(f)
-            transactions = list(reader)
+        for trans in transactions:
+            self.print_transaction(trans)
 
-        recent = transactions[-10:] if len(transactions) > 10 else transactions
+    def show_symbol_transactions(self, symbol):
+        symbol = symbol.upper()
+        transactions = self.transaction_log.for_symbol(symbol)
+        if not transactions:
+            print(f"No transactions for {symbol}")
+            return
 
-        for trans in reversed(recent):
-            action_symbol = "BUY" if trans['action'] == 'BUY' else "SELL"
-            print(f"{trans['date']} | {action_symbol} {trans['shares']} {trans['symbol']} @ ${trans['price']} = ${trans['amount']}")
+        print(f"\n{symbol} TRANSACTIONS")
+        print("-" * 30)
+
+        for trans in transactions:
+            self.print_transaction(trans)
+
+    def show_lots(self, symbol):
+        symbol = symbol.upper()
+        queue = self.lots.queues.get(symbol)
+        if queue is None or not len(queue):
+            print(f"No open lots for {symbol}")
+            return
+
+        print(f"\n{symbol} OPEN LOTS ({self.lots.method})")
+        print("-" * 30)
+        for lot_id, shares, price, date in queue.open_lots():
+            print(f"#{lot_id} | {date} | {shares:.4f} @ ${price:.2f}")
+        print(f"Realized P&L: ${queue.realized:+.2f}")
+
+    def print_transaction(self, trans):
+        action_symbol = "BUY" if trans['action'] == 'BUY' else "SELL"
+        print(f"{trans['date']} | {action_symbol} {trans['shares']} {trans['symbol']} @ ${trans['price']} = ${trans['amount']}")
 
 if __name__ == "__main__":
     import sys
 
     if len(sys.argv) > 1:
-        if sys.argv[1] == 'buy' and len(sys.argv) >= 5:
-            manager = SimplePortfolio()
+        if sys.argv[1] in ['buy', 'sell'] and len(sys.argv) >= 4 and sys.argv[2] == '--file':
+            manager = open_portfolio()
+            orders = manager.load_order_file(sys.argv[3], sys.argv[1].upper())
+            if not manager.execute_batch(orders):
+                sys.exit(1)
+        elif sys.argv[1] == 'buy' and len(sys.argv) >= 5:
+            manager = open_portfolio()
             symbol, amount, price = sys.argv[2], float(sys.argv[3]), float(sys.argv[4])
             manager.buy_stock(symbol, amount, price, is_dollar_amount=True)
         elif sys.argv[1] == 'sell' and len(sys.argv) >= 5:
-            manager = SimplePortfolio()
+            manager = open_portfolio()
             symbol, percentage, price = sys.argv[2], float(sys.argv[3]), float(sys.argv[4])
             manager.sell_stock(symbol, percentage, price, is_percentage=True)
         elif sys.argv[1] == 'portfolio':
-            manager = SimplePortfolio()
+            manager = open_portfolio()
             manager.show_portfolio()
+        elif sys.argv[1] == 'lots' and len(sys.argv) >= 3:
+            manager = open_portfolio()
+            manager.show_lots(sys.argv[2])
+        elif sys.argv[1] == 'history':
+            manager = open_portfolio()
+            if len(sys.argv) >= 3:
+                manager.show_symbol_transactions(sys.argv[2])
+            else:
+                manager.show_recent_transactions()
         else:
             print("Usage:")
             print("  py simple_portfolio.py buy SYMBOL DOLLARS PRICE")
             print("  py simple_portfolio.py sell SYMBOL PERCENTAGE PRICE")
+            print("  py simple_portfolio.py buy|sell --file ORDERS.csv")
             print("  py simple_portfolio.py portfolio")
+            print("  py simple_portfolio.py history [SYMBOL]")
+            print("  py simple_portfolio.py lots SYMBOL")
     else:
+        from portfolio_service import PortfolioClient
+        if PortfolioClient.connect() is not None:
+            print("[WARNING] Portfolio service is running; trades from this menu bypass it and may be lost")
         manager = SimplePortfolio()
         manager.quick_menu()
\ No newline at end of file
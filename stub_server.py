@@ -0,0 +1,422 @@
+"""
+Stub Provider Server
+Local FMP/NewsAPI/Telegram simulator for measuring latency offline
+"""
+
+import sys
+import json
+import time
+import zlib
+import random
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PROVIDERS = ['FMP', 'NewsAPI', 'Telegram']
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Serve synthetic FMP quotes, NewsAPI articles and Telegram sendMessage replies"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def accepts_gzip(self):
+        return 'gzip' in (self.headers.get('Accept-Encoding') or '')
+
+    def not_modified(self, etag):
+        """True if the request's validators match (If-None-Match wins over If-Modified-Since)"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= int(self.server.started_at)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_not_modified(self, provider, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.server.last_modified)
+        self.end_headers()
+        self.server.record(provider, 'not_modified', 1)
+
+    def send_json(self, provider, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        headers = dict(headers or {})
+
+        # Provider GETs carry validators and honour gzip, like the real APIs' CDNs
+        if status == 200 and self.command == 'GET':
+            etag = f'"{hashlib.md5(body).hexdigest()[:16]}"'
+            if self.not_modified(etag):
+                self.send_not_modified(provider, etag)
+                return
+            headers.update({'ETag': etag, 'Last-Modified': self.server.last_modified})
+            if self.accepts_gzip():
+                body = zlib.compress(body, 6, wbits=31)
+                headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(provider, 'bytes_out', len(body))
+
+    def send_json_stream(self, provider, records, etag, per_chunk=500):
+        """Write a JSON array with chunked transfer encoding, never building the whole body
+
+        The listing is deterministic, so its ETag comes from the request, not the body.
+        """
+        if self.not_modified(etag):
+            self.send_not_modified(provider, etag)
+            return
+
+        compressor = zlib.compressobj(6, wbits=31) if self.accepts_gzip() else None
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.server.last_modified)
+        if compressor is not None:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+
+        sent = 0
+        def write_chunk(data, final=False):
+            nonlocal sent
+            if compressor is not None:
+                data = compressor.compress(data) + (compressor.flush() if final else b'')
+            if data:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                sent += len(data)
+
+        pending = ['[']
+        for i, record in enumerate(records):
+            pending.append((',' if i else '') + json.dumps(record))
+            if len(pending) >= per_chunk:
+                write_chunk(''.join(pending).encode('utf-8'))
+                pending = []
+        pending.append(']')
+        write_chunk(''.join(pending).encode('utf-8'), final=True)
+        self.wfile.write(b"0\r\n\r\n")
+        self.server.record(provider, 'bytes_out', sent)
+
+    def route(self, method):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if method == 'GET' and (path.startswith('/api/v3/quote/') or path.startswith('/api/v3/quotes/')):
+            return 'FMP', parsed
+        if method == 'GET' and path == '/v2/everything':
+            return 'NewsAPI', parsed
+        if method == 'POST' and path.startswith('/bot') and path.endswith('/sendMessage'):
+            return 'Telegram', parsed
+        return None, parsed
+
+    def handle_request(self, method):
+        server = self.server
+        provider, parsed = self.route(method)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        with server.lock:
+            server.request_count += 1
+
+        if provider is None:
+            self.send_json(None, 404, {'error': 'not found'})
+            return
+
+        server.record(provider, 'requests', 1)
+        server.record(provider, 'bytes_in', len(self.path) + len(body))
+        time.sleep(server.latency_for(provider))
+
+        # Simulated provider throttling and failures
+        if server.rate_limited(provider):
+            server.record(provider, 'rate_limited', 1)
+            self.send_json(provider, 429, {
+                'ok': False, 'error_code': 429, 'status': 'error', 'code': 'rateLimited',
+                'parameters': {'retry_after': server.retry_after}
+            }, headers={'Retry-After': str(server.retry_after)})
+            return
+        if server.should_fail(provider):
+            server.record(provider, 'errors', 1)
+            self.send_json(provider, 500, {'ok': False, 'error_code': 500, 'description': 'Simulated failure'})
+            return
+
+        if provider == 'FMP' and parsed.path.startswith('/api/v3/quotes/'):
+            exchange = parsed.path[len('/api/v3/quotes/'):]
+            listing = f"{exchange}:{server.universe_size}".encode()
+            etag = f'"{hashlib.md5(listing).hexdigest()[:16]}"'
+            self.send_json_stream(provider, server.make_universe(exchange), etag)
+        elif provider == 'FMP':
+            symbols = [s for s in parsed.path[len('/api/v3/quote/'):].split(',') if s]
+            self.send_json(provider, 200, [server.make_quote(s) for s in symbols])
+        elif provider == 'NewsAPI':
+            query = parse_qs(parsed.query)
+            symbol = query.get('q', [''])[0]
+            from_date = query.get('from', [''])[0]
+            articles = [a for a in server.make_articles(symbol) if a['publishedAt'][:19] >= from_date]
+            self.send_json(provider, 200, {'status': 'ok', 'totalResults': len(articles), 'articles': articles})
+        else:
+            text = parse_qs(body.decode('utf-8')).get('text', [''])[0]
+            server.messages.append(text)
+            self.send_json(provider, 200, {'ok': True, 'result': {'message_id': len(server.messages)}})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+class StubProviderServer(ThreadingHTTPServer):
+    """Threaded provider simulator with per-provider latency, error rate and rate limits
+
+    `latency` and `error_rate` are either one value for every provider or a
+    {provider: value} dict. `rate_limits` maps a provider to the requests per
+    second it accepts before answering 429. `universe_size` is the number of
+    quotes each /quotes/{exchange} listing streams back. Provider GETs are
+    gzipped when the client asks and answer 304 to matching validators.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, error_rate=0.0,
+                 rate_limits=None, retry_after=1, seed=7, universe_size=3000):
+        super().__init__((host, port), StubProviderHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits or {}
+        self.retry_after = retry_after
+        self.universe_size = universe_size
+        self.started_at = time.time()
+        self.last_modified = formatdate(int(self.started_at), usegmt=True)
+        self.rng = random.Random(seed)
+        self.request_count = 0
+        self.messages = []
+        self.windows = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.request_count = 0
+            self.stats = {p: {'requests': 0, 'errors': 0, 'rate_limited': 0, 'bytes_in': 0, 'bytes_out': 0,
+                               'not_modified': 0}
+                          for p in PROVIDERS}
+
+    def snapshot(self):
+        """Copy of the per-provider counters"""
+        with self.lock:
+            return {p: dict(counters) for p, counters in self.stats.items()}
+
+    def record(self, provider, counter, amount):
+        if provider is None:
+            return
+        with self.lock:
+            self.stats[provider][counter] += amount
+
+    def setting(self, value, provider):
+        return value.get(provider, 0) if isinstance(value, dict) else value
+
+    def latency_for(self, provider):
+        return self.setting(self.latency, provider)
+
+    def should_fail(self, provider):
+        rate = self.setting(self.error_rate, provider)
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def rate_limited(self, provider):
+        """Fixed one-second window counter per provider"""
+        limit = self.rate_limits.get(provider)
+        if not limit:
+            return False
+        with self.lock:
+            window = int(time.monotonic())
+            current, count = self.windows.get(provider, (window, 0))
+            if current != window:
+                current, count = window, 0
+            count += 1
+            self.windows[provider] = (current, count)
+            return count > limit
+
+    @property
+    def root_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"{self.root_url}/api/v3"
+
+    @property
+    def news_url(self):
+        return f"{self.root_url}/v2"
+
+    def environment(self):
+        """Environment overrides that point every entry point at this simulator"""
+        return {
+            'FMP_BASE_URL': self.base_url,
+            'NEWSAPI_BASE_URL': self.news_url,
+            'TELEGRAM_API_URL': self.root_url
+        }
+
+    @staticmethod
+    def make_quote(symbol):
+        """Deterministic synthetic quote for a symbol"""
+        rng = random.Random(symbol)
+        previous_close = round(rng.uniform(1, 50), 2)
+        change_pct = round(rng.uniform(-8, 8), 2)
+        price = round(previous_close * (1 + change_pct / 100), 2)
+        avg_volume = rng.randint(100_000, 5_000_000)
+        return {
+            'symbol': symbol,
+            'price': price,
+            'change': round(price - previous_close, 2),
+            'changesPercentage': change_pct,
+            'volume': int(avg_volume * rng.uniform(0.3, 3.0)),
+            'avgVolume': avg_volume,
+            'open': round(previous_close * (1 + change_pct / 200), 2),
+            'dayHigh': round(price * 1.03, 2),
+            'dayLow': round(price * 0.97, 2),
+            'previousClose': previous_close,
+            'marketCap': int(price * rng.randint(1_000_000, 60_000_000))
+        }
+
+    def make_universe(self, exchange):
+        """Synthetic whole-exchange quote list (FMP /quotes/{exchange}), generated lazily"""
+        prefix = exchange[:1].upper()
+        return (self.make_quote(f"{prefix}{i:05d}") for i in range(self.universe_size))
+
+    @staticmethod
+    def make_articles(symbol, count=3):
+        """Synthetic NewsAPI articles for a symbol, newest first
+
+        Timestamps step back hourly from the current hour, so they fall inside
+        a brief's overnight window. The second article is a market-wide story
+        that every symbol shares.
+        """
+        hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        articles = [{
+            'source': {'id': None, 'name': 'Stub Wire'},
+            'title': f"{symbol} stub headline {i + 1}",
+            'url': f"https://example.com/{symbol.lower()}/{i + 1}",
+            'publishedAt': (hour - timedelta(hours=2 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        } for i in range(count - 1)]
+        articles.insert(1, {
+            'source': {'id': None, 'name': 'Stub Wire'},
+            'title': "Small caps rally as rate cut bets build",
+            'url': "https://example.com/markets/small-caps-rally",
+            'publishedAt': (hour - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        })
+        return articles
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def benchmark_quotes(symbol_count=200, latency=0.05):
+    """Compare the per-symbol loop against batched concurrent fetching"""
+    import urllib.request
+    from quote_fetcher import QuoteFetcher
+
+    symbols = [f"S{i:04d}" for i in range(symbol_count)]
+    server = StubProviderServer(latency=latency).start()
+
+    try:
+        # Legacy path: one request per symbol plus the fixed 0.1s pause
+        start = time.perf_counter()
+        legacy = {}
+        for symbol in symbols:
+            url = f"{server.base_url}/quote/{symbol}?apikey=stub"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                data = json.loads(response.read().decode())
+            if data:
+                legacy[symbol] = QuoteFetcher.parse_quote(data[0])
+            time.sleep(0.1)
+        legacy_time = time.perf_counter() - start
+        legacy_requests = server.request_count
+
+        server.reset_stats()
+        fetcher = QuoteFetcher('stub', base_url=server.base_url)
+        start = time.perf_counter()
+        batched = fetcher.fetch_quotes(symbols)
+        batched_time = time.perf_counter() - start
+        batched_requests = server.request_count
+    finally:
+        server.stop()
+
+    print(f"QUOTE FETCH BENCHMARK ({symbol_count} symbols, {latency * 1000:.0f}ms latency)")
+    print("=" * 45)
+    print(f"Per-symbol loop:  {legacy_time:8.3f}s  {legacy_requests} requests")
+    print(f"Batched fetch:    {batched_time:8.3f}s  {batched_requests} requests")
+    print(f"Speedup:          {legacy_time / batched_time:8.1f}x")
+    print(f"Results match:    {legacy == batched}")
+
+def benchmark_news(symbol_count=100, latency=0.05, rate=20.0, max_in_flight=8):
+    """Compare the sequential news loop against the rate-limited async scanner"""
+    import urllib.request
+    from news_scanner import NewsScanner, TokenBucket
+
+    symbols = [f"S{i:04d}" for i in range(symbol_count)]
+    server = StubProviderServer(latency=latency).start()
+
+    try:
+        start = time.perf_counter()
+        for symbol in symbols:
+            url = f"{server.news_url}/everything?q={symbol}&apiKey=stub"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                json.loads(response.read().decode())
+            time.sleep(0.1)
+        legacy_time = time.perf_counter() - start
+
+        scanner = NewsScanner('stub', base_url=server.news_url,
+                              rate_limiter=TokenBucket(rate, rate),
+                              max_in_flight=max_in_flight)
+        start = time.perf_counter()
+        news = scanner.fetch_news(symbols, '2025-01-01T00:00:00')
+        async_time = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    print(f"NEWS SCAN BENCHMARK ({symbol_count} symbols, {rate:.0f} req/s limit)")
+    print("=" * 45)
+    print(f"Sequential loop:  {legacy_time:8.3f}s")
+    print(f"Async scanner:    {async_time:8.3f}s  ({len(news)} symbols with news)")
+    print(f"Speedup:          {legacy_time / async_time:8.1f}x")
+
+def main():
+    """Run the benchmarks, or serve until interrupted with 'serve [port]'"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+        server = StubProviderServer(port=port)
+        print(f"Stub provider serving at {server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+        benchmark_quotes(symbol_count=count)
+        print()
+        benchmark_news(symbol_count=count)
+
+if __name__ == "__main__":
+    main()
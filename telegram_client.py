@@ -0,0 +1,207 @@
+"""
+Telegram Client
+Shared Telegram delivery: keep-alive connection, retries with backoff, message splitting
+"""
+
+import os
+import json
+import time
+import ssl
+import threading
+import http.client
+import urllib.parse
+from collections import deque
+
+from run_metrics import http_span
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+MAX_MESSAGE_LENGTH = 4096
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Split text into chunks of at most `limit` chars, breaking on line boundaries"""
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = ''
+    for line in text.split('\n'):
+        # A single over-long line has to be cut mid-line
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(line[:limit])
+            line = line[limit:]
+
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+class TelegramClient:
+    """Send messages over one persistent HTTPS connection from an outbound queue
+
+    Connection errors and 429/5xx responses are retried with exponential
+    backoff; a 429 waits for Telegram's `retry_after` first. Anything else
+    (a read timeout, say) may mean Telegram already has the message, so it is
+    not resent. Messages longer than 4096 characters are split on line
+    boundaries and sending stops at the first chunk that is not accepted.
+    """
+
+    def __init__(self, bot_token, chat_id, timeout=15, max_retries=4, backoff=1.0,
+                 ssl_context=None, api_url=None):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.ssl_context = ssl_context or ssl.create_default_context()
+
+        api_url = api_url or os.environ.get('TELEGRAM_API_URL', TELEGRAM_API_URL)
+        parsed = urllib.parse.urlparse(api_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.netloc
+        self.path_prefix = parsed.path.rstrip('/')
+
+        self.connection = None
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'connections': 0}
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build a client from TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID, or None if missing"""
+        bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+        chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+        if not bot_token or not chat_id:
+            return None
+        return cls(bot_token, chat_id, **kwargs)
+
+    # ---- connection ------------------------------------------------------
+
+    def connect(self):
+        if self.connection is None:
+            if self.scheme == 'http':
+                self.connection = http.client.HTTPConnection(self.host, timeout=self.timeout)
+            else:
+                self.connection = http.client.HTTPSConnection(
+                    self.host, timeout=self.timeout, context=self.ssl_context
+                )
+            self.stats['connections'] += 1
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def post(self, method, params, retry=0):
+        """POST one API call on the kept-alive connection; returns (status, parsed body)"""
+        body = urllib.parse.urlencode(params).encode('utf-8')
+        path = f"{self.path_prefix}/bot{self.bot_token}/{method}"
+        with http_span('Telegram', method, retry=retry) as span:
+            connection = self.connect()
+            if connection.sock is None:
+                try:
+                    connection.connect()
+                except OSError as e:
+                    # Nothing was sent, so the caller may safely retry
+                    self.close()
+                    raise ConnectionError(f"cannot connect to {self.host}: {e}") from e
+            try:
+                connection.request('POST', path, body=body, headers={
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'Connection': 'keep-alive'
+                })
+                response = connection.getresponse()
+                payload = response.read()
+            except Exception:
+                # Drop the broken connection; the retry opens a fresh one
+                self.close()
+                raise
+            span.set(status=response.status, bytes=len(body) + len(payload))
+
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+
+        try:
+            result = json.loads(payload.decode())
+        except ValueError:
+            result = {'ok': False, 'description': payload[:200].decode(errors='replace')}
+        return response.status, result
+
+    # ---- sending ---------------------------------------------------------
+
+    def send_chunk(self, text, parse_mode='HTML'):
+        """Send one chunk, retrying connection errors and 429/5xx; returns True once Telegram accepts it"""
+        params = {'chat_id': self.chat_id, 'text': text}
+        if parse_mode:
+            params['parse_mode'] = parse_mode
+
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                status, result = self.post('sendMessage', params, retry=attempt)
+                if result.get('ok'):
+                    self.stats['sent'] += 1
+                    return True
+
+                if status == 429:
+                    delay = result.get('parameters', {}).get('retry_after', delay)
+                elif status < 500:
+                    # Bad request / auth errors will not succeed on retry
+                    print(f"[ERROR] Telegram error: {result}")
+                    break
+            except ConnectionError as e:
+                print(f"[WARNING] Telegram send attempt {attempt + 1} failed: {e}")
+            except Exception as e:
+                # No reply (e.g. read timeout): Telegram may have the message, so a resend could duplicate it
+                print(f"[ERROR] Telegram send failed without a reply, not retrying: {e}")
+                break
+
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                time.sleep(delay)
+
+        self.stats['failed'] += 1
+        return False
+
+    def enqueue(self, text, parse_mode='HTML'):
+        for chunk in split_message(text):
+            self.queue.append((chunk, parse_mode))
+
+    def flush(self):
+        """Send queued chunks in order, stopping at the first one that fails; returns chunks delivered
+
+        The failed chunk and everything after it stay queued, so the next
+        flush() resumes there instead of repeating what already went out.
+        """
+        with self.lock:
+            delivered = 0
+            while self.queue:
+                chunk, parse_mode = self.queue[0]
+                if not self.send_chunk(chunk, parse_mode):
+                    break
+                self.queue.popleft()
+                delivered += 1
+            return delivered
+
+    def send_message(self, text, parse_mode='HTML'):
+        """Queue a message (split if needed) and deliver it immediately; returns True if all of it went out
+
+        On failure the undelivered rest is dropped, so it is not sent ahead of a later message.
+        """
+        self.enqueue(text, parse_mode)
+        total = len(self.queue)
+        delivered = self.flush()
+        if self.queue:
+            print(f"[ERROR] Telegram delivered {delivered} of {total} chunks; stopped at the first failure")
+            self.queue.clear()
+            return False
+        return True
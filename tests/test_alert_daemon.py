@@ -0,0 +1,66 @@
+import os
+import asyncio
+
+import pytest
+
+from alert_daemon import AlertDaemon
+from market_open_brief import MarketOpenBrief
+from quote_fetcher import QuoteFetcher
+from stub_server import StubProviderServer
+
+@pytest.fixture
+def server():
+    server = StubProviderServer(latency=0).start()
+    yield server
+    server.stop()
+
+def make_daemon(server, tmp_path, send_results):
+    brief = MarketOpenBrief(cache_dir=os.path.join(tmp_path, 'cache'), output_dir=os.path.join(tmp_path, 'output'))
+    # Stub RGTI trades at 18.69, far below this entry, so a loss alert holds every tick
+    brief.current_portfolio = {'RGTI': {'shares': 1, 'entry_price': 40.0}}
+    sent = []
+
+    def send(message):
+        ok = send_results.pop(0)
+        if ok:
+            sent.append(message)
+        return ok
+
+    brief.send_telegram_message = send
+    daemon = AlertDaemon(
+        brief, poll_interval=0, trading_hours_only=False,
+        fetcher=QuoteFetcher('stub', base_url=server.base_url, http=brief.http)
+    )
+    return daemon, sent
+
+def test_failed_send_is_retried_when_quote_is_unchanged(server, tmp_path):
+    daemon, sent = make_daemon(server, tmp_path, [False, True])
+
+    first = asyncio.run(daemon.tick())
+    assert first and not sent
+    assert daemon.active_alerts == set()
+
+    # Same stub quote, so nothing "changed"; the unsent alert must still go out
+    second = asyncio.run(daemon.tick())
+    assert [a['symbol'] for a in second] == ['RGTI'] * len(second)
+    assert len(sent) == 1 and 'RGTI' in sent[0]
+    assert daemon.unsent_symbols == set()
+
+    # Delivered: the next unchanged tick sends nothing
+    assert asyncio.run(daemon.tick()) == []
+    assert len(sent) == 1
+
+def test_successful_send_is_not_repeated(server, tmp_path):
+    daemon, sent = make_daemon(server, tmp_path, [True])
+
+    assert asyncio.run(daemon.tick())
+    assert asyncio.run(daemon.tick()) == []
+    assert len(sent) == 1
+
+def test_brief_state_lives_under_the_given_dirs(tmp_path):
+    cache_dir, output_dir = os.path.join(tmp_path, 'cache'), os.path.join(tmp_path, 'output')
+    daemon = AlertDaemon(MarketOpenBrief(cache_dir=cache_dir, output_dir=output_dir))
+
+    assert {'market_data.sqlite', 'news_index.sqlite', 'http'} <= set(os.listdir(cache_dir))
+    assert os.path.isdir(output_dir)
+    assert os.path.dirname(daemon.state_file) == cache_dir
@@ -0,0 +1,20 @@
+import sys
+
+import brief_archive
+from brief_archive import BriefArchive
+
+def test_history_prints_rows_with_missing_values(tmp_path, monkeypatch, capsys):
+    archive = BriefArchive(str(tmp_path))
+    archive.append_many([
+        ({'generated_at': '2026-10-15T09:00:00', 'market_data': {'RGTI': {'price': 18.69, 'change_pct': None}}}, None),
+        ({'generated_at': '2026-10-16T09:00:00', 'market_data': {'RGTI': {'price': None, 'change_pct': 2.5}}}, None),
+        ({'generated_at': '2026-10-17T09:00:00', 'market_data': {'RGTI': {'price': 19.1, 'change_pct': -1.25}}}, None),
+    ])
+    archive.close()
+
+    monkeypatch.setattr(brief_archive, 'BriefArchive', lambda: BriefArchive(str(tmp_path)))
+    monkeypatch.setattr(sys, 'argv', ['brief_archive.py', 'history', 'RGTI'])
+    brief_archive.main()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(' | ')[1] for line in lines] == ['$18.69 n/a', 'no price +2.5%', '$19.10 -1.2%']
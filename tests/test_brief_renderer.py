@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from brief_renderer import render_brief
+from news_index import group_articles
+from quote_fetcher import QuoteFetcher
+from stub_server import StubProviderServer
+
+def reference_render(portfolio, watchlist, market_data, overnight_news, alerts, now):
+    """The formatter render_brief replaced, frozen here as the expected output"""
+    message = f"""🌅 <b>MARKET OPEN BRIEF</b> 🌅
+<b>{now.strftime('%B %d, %Y • 9:30 AM ET')}</b>
+
+🚨 <b>POSITION ALERTS</b>"""
+    if alerts:
+        for alert in alerts:
+            message += f"\n• {alert['message']}"
+    else:
+        message += f"\n• All positions stable - no immediate alerts"
+    message += f"\n\n📊 <b>PORTFOLIO PRE-MARKET</b>"
+    for symbol in portfolio:
+        if symbol in market_data:
+            data = market_data[symbol]
+            volume_indicator = ""
+            if data['avg_volume'] > 0:
+                volume_ratio = data['volume'] / data['avg_volume']
+                if volume_ratio > 2:
+                    volume_indicator = " 🔥 HIGH VOL"
+                elif volume_ratio > 1.5:
+                    volume_indicator = " 📈 ABOVE AVG"
+            emoji = "📈" if data['change_pct'] >= 0 else "📉"
+            message += f"\n<b>{symbol}</b>: ${data['price']:.2f} {emoji}{data['change_pct']:+.1f}%{volume_indicator}"
+    message += f"\n\n👀 <b>WATCHLIST</b>"
+    for symbol in watchlist:
+        if symbol in market_data:
+            data = market_data[symbol]
+            emoji = "📈" if data['change_pct'] >= 0 else "📉"
+            message += f"\n<b>{symbol}</b>: ${data['price']:.2f} {emoji}{data['change_pct']:+.1f}%"
+    if overnight_news:
+        message += f"\n\n📰 <b>OVERNIGHT NEWS</b>"
+        for symbols, article in group_articles(overnight_news)[:3]:
+            title = article.get('title', '')[:60] + ('...' if len(article.get('title', '')) > 60 else '')
+            message += f"\n• <b>{', '.join(symbols)}</b>: {title}"
+    message += f"\n\n🎯 <b>TRADING FOCUS</b>"
+    big_movers = [(s, d['change_pct']) for s, d in market_data.items() if abs(d['change_pct']) >= 3]
+    if big_movers:
+        big_movers.sort(key=lambda x: abs(x[1]), reverse=True)
+        message += f"\n• Biggest mover: {big_movers[0][0]} ({big_movers[0][1]:+.1f}%)"
+    high_vol_stocks = [s for s, d in market_data.items() if d['avg_volume'] > 0 and d['volume'] / d['avg_volume'] > 2]
+    if high_vol_stocks:
+        message += f"\n• High volume: {', '.join(high_vol_stocks[:3])}"
+    message += f"\n\n⏰ <b>Next Report:</b> 6:00 PM (Full EOD Analysis)"
+    message += f"\n🎯 <b>Real-time alerts:</b> Active during trading hours"
+    return message
+
+def make_inputs(watchlist_size):
+    portfolio = ['RGTI', 'BBAI', 'LAES']
+    watchlist = [f"W{i:04d}" for i in range(watchlist_size)]
+    market_data = {s: QuoteFetcher.parse_quote(StubProviderServer.make_quote(s)) for s in portfolio + watchlist}
+    news = {s: StubProviderServer.make_articles(s) for s in portfolio + watchlist[:50]}
+    return portfolio, watchlist, market_data, news
+
+@pytest.mark.parametrize('watchlist_size', [0, 4, 2000])
+@pytest.mark.parametrize('with_alerts', [False, True])
+def test_render_matches_reference(watchlist_size, with_alerts):
+    portfolio, watchlist, market_data, news = make_inputs(watchlist_size)
+    alerts = [{'message': f"⚠️ {s} at stop-loss level"} for s in portfolio] if with_alerts else []
+    now = datetime(2025, 6, 2, 9, 30)
+
+    expected = reference_render(portfolio, watchlist, market_data, news, alerts, now)
+    assert render_brief(portfolio, watchlist, market_data, news, alerts, now) == expected
+
+def test_ties_zero_volume_and_no_news_match_reference():
+    portfolio, watchlist, market_data, _ = make_inputs(20)
+    # Equal biggest moves go to the earlier symbol; a zero average volume has no indicator
+    market_data['W0005']['change_pct'] = market_data['W0009']['change_pct'] = 12.5
+    market_data['W0007']['avg_volume'] = 0
+    market_data['RGTI']['avg_volume'] = 0
+    now = datetime(2025, 6, 2, 9, 30)
+
+    expected = reference_render(portfolio, watchlist, market_data, {}, [], now)
+    assert render_brief(portfolio, watchlist, market_data, {}, [], now) == expected
+    assert "Biggest mover: W0005" in expected
@@ -0,0 +1,45 @@
+import pytest
+
+from cost_basis import LotBook
+
+def make_book(method='FIFO'):
+    book = LotBook(method)
+    for shares, price in ((10, 1.0), (10, 2.0), (10, 3.0)):
+        book.buy('ABC', shares, price, '2026-01-01')
+    return book
+
+def test_fifo_sells_oldest_lots_first():
+    book = make_book()
+    fill = book.sell('ABC', 15, 4.0)
+    assert [(lot_id, take) for lot_id, take, *_ in fill['fills']] == [(1, 10), (2, 5)]
+    assert fill['realized_pnl'] == pytest.approx(15 * 4.0 - (10 * 1.0 + 5 * 2.0))
+    assert book.position('ABC')['shares'] == pytest.approx(15)
+
+def test_lifo_sells_newest_lots_first():
+    book = make_book('LIFO')
+    fill = book.sell('ABC', 15, 4.0)
+    assert [(lot_id, take) for lot_id, take, *_ in fill['fills']] == [(3, 10), (2, 5)]
+    assert fill['realized_pnl'] == pytest.approx(15 * 4.0 - (10 * 3.0 + 5 * 2.0))
+
+def test_specific_sells_the_listed_lots_in_order():
+    book = make_book()
+    fill = book.sell('ABC', 12, 4.0, 'SPECIFIC', [3, 1])
+    assert [(lot_id, take) for lot_id, take, *_ in fill['fills']] == [(3, 10), (1, 2)]
+    assert [lot[:2] for lot in book.queues['ABC'].open_lots()] == [(1, 8), (2, 10)]
+
+@pytest.mark.parametrize('method, shares, lot_ids', [
+    ('FIFO', 31, None),
+    ('LIFO', 31, None),
+    ('SPECIFIC', 15, [2]),
+    ('SPECIFIC', 15, [2, 2]),
+    ('SPECIFIC', 5, [9]),
+    ('SPECIFIC', 5, None),
+])
+def test_rejected_sell_leaves_lots_untouched(method, shares, lot_ids):
+    book = make_book()
+    before = book.to_dict()
+
+    with pytest.raises(ValueError):
+        book.sell('ABC', shares, 4.0, method, lot_ids)
+    assert book.to_dict() == before
+    assert book.realized_pnl() == 0
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from data_cache import DataCache
+from market_open_brief import MarketOpenBrief
+from news_index import NewsIndex
+from stub_server import StubProviderServer
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StubProviderServer(latency=0).start()
+    for name, value in server.environment().items():
+        monkeypatch.setenv(name, value)
+    yield server
+    server.stop()
+
+def make_brief(tmp_path, send_results):
+    brief = MarketOpenBrief(cache_dir=os.path.join(tmp_path, 'cache'), output_dir=os.path.join(tmp_path, 'output'))
+    brief.current_portfolio = {'RGTI': {'shares': 1, 'entry_price': 19.0}}
+    brief.watchlist = []
+    brief.load_api_keys = lambda: {'FMP': 'stub', 'NewsAPI': 'stub'}
+    brief.sent = []
+
+    def send(message):
+        ok = send_results.pop(0)
+        if ok:
+            brief.sent.append(message)
+        return ok
+
+    brief.send_telegram_message = send
+    return brief
+
+def index_rows(index):
+    seen = index.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+    marks = index.conn.execute("SELECT COUNT(*) FROM watermarks").fetchone()[0]
+    return seen, marks
+
+def test_ingest_does_not_record_until_commit():
+    index = NewsIndex(':memory:')
+    articles = StubProviderServer.make_articles('RGTI')
+
+    fresh, pending = index.ingest({'RGTI': articles})
+    assert fresh['RGTI'] == articles
+    assert index_rows(index) == (0, 0)
+
+    # Not committed, so a second ingest still sees every article as new
+    assert index.ingest({'RGTI': articles})[0]['RGTI'] == articles
+
+    index.commit(pending)
+    assert index_rows(index)[1] == 1
+    assert index.ingest({'RGTI': articles})[0]['RGTI'] == []
+
+@pytest.mark.parametrize('shared_cache', [True, False], ids=['shared-cache', 'cold-cache'])
+def test_failed_send_keeps_articles_for_the_next_run(server, tmp_path, shared_cache):
+    brief = make_brief(tmp_path, [False, True, True])
+    cache = DataCache(':memory:')
+
+    def run():
+        # Either every run inside the news TTL, or each with a cold quote/news cache
+        brief.cache = cache if shared_cache else DataCache(':memory:')
+        return brief.generate_market_open_brief()
+
+    assert run() is False
+    assert index_rows(brief.news_index) == (0, 0)
+
+    # The retried run still gets the undelivered stories
+    assert run() is True
+    assert 'RGTI stub headline 1' in brief.sent[0]
+    seen, marks = index_rows(brief.news_index)
+    assert seen > 0 and marks == 1
+
+    # Once delivered they are not repeated, cached or not
+    assert run() is True
+    assert 'OVERNIGHT NEWS' not in brief.sent[1]
@@ -0,0 +1,16 @@
+from news_scanner import get_rate_limiter
+
+def test_get_rate_limiter_applies_changed_limits(monkeypatch):
+    monkeypatch.setattr('news_scanner._rate_limiters', {})
+
+    bucket = get_rate_limiter('TestProvider', rate=5, capacity=5)
+    assert (bucket.rate, bucket.capacity) == (5.0, 5.0)
+
+    # Same shared bucket, new limits
+    assert get_rate_limiter('TestProvider', rate=2, capacity=3) is bucket
+    assert (bucket.rate, bucket.capacity) == (2.0, 3.0)
+    assert bucket.tokens <= 3.0
+
+    # Omitted values keep the current setting
+    assert get_rate_limiter('TestProvider') is bucket
+    assert (bucket.rate, bucket.capacity) == (2.0, 3.0)
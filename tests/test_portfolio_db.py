@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from portfolio_db import PortfolioDB
+from simple_portfolio import SimplePortfolio, load_saved_portfolio
+
+def test_file_to_sqlite_import_keeps_lots_and_realized_pnl(tmp_path, capsys):
+    data_dir = str(tmp_path)
+    manager = SimplePortfolio(data_dir, backend='file', cost_method='FIFO')
+    manager.buy_stock('ABC', 100, 10, is_dollar_amount=True)
+    manager.buy_stock('ABC', 100, 20, is_dollar_amount=True)
+    manager.sell_stock('ABC', 12, 25)
+    manager.sell_stock('IONQ', 100, 9, is_percentage=True)
+    capsys.readouterr()
+
+    db = PortfolioDB(os.path.join(data_dir, 'portfolio.db'))
+    imported = db.import_files(manager.portfolio_file, manager.transactions_file, manager.lots_file)
+    db.close()
+    assert imported == 4
+
+    migrated = SimplePortfolio(data_dir, backend='sqlite')
+    assert "Lots out of sync" not in capsys.readouterr().out
+    assert migrated.portfolio == manager.portfolio
+    assert migrated.lots.to_dict() == manager.lots.to_dict()
+    assert migrated.lots.realized_pnl('ABC') == pytest.approx(12 * 25 - 10 * 10 - 2 * 20)
+    assert migrated.lots.realized_pnl('IONQ') == pytest.approx(manager.lots.realized_pnl('IONQ'))
+    assert [lot[1:3] for lot in migrated.lots.queues['ABC'].open_lots()] == [(3.0, 20.0)]
+
+    # Reports read whichever backend is configured
+    assert load_saved_portfolio(data_dir, backend='sqlite') == manager.portfolio
+    assert load_saved_portfolio(data_dir, backend='file') == manager.portfolio
+
+def test_load_saved_portfolio_creates_nothing(tmp_path):
+    assert load_saved_portfolio(str(tmp_path), backend='sqlite') is None
+    assert load_saved_portfolio(str(tmp_path), backend='file') is None
+    assert os.listdir(tmp_path) == []
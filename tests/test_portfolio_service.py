@@ -0,0 +1,90 @@
+import os
+import time
+import socket
+import asyncio
+import threading
+
+import pytest
+
+from portfolio_service import PortfolioClient, PortfolioService
+from simple_portfolio import SimplePortfolio, open_portfolio
+
+@pytest.fixture(autouse=True)
+def no_socket_override(monkeypatch):
+    monkeypatch.delenv('PORTFOLIO_SOCKET', raising=False)
+
+def buy(symbol, amount):
+    return {'method': 'buy_stock', 'args': [symbol, amount, 10.0], 'kwargs': {'is_dollar_amount': True}}
+
+def commit(service, requests):
+    """Apply `requests` as one group commit; returns the replies"""
+    async def run():
+        loop = asyncio.get_running_loop()
+        group = [(request, loop.create_future()) for request in requests]
+        await service.commit_group(group)
+        return [future.result() for _, future in group]
+    return asyncio.run(run())
+
+def test_rejected_trade_does_not_affect_the_rest_of_its_group(tmp_path):
+    service = PortfolioService(str(tmp_path))
+    replies = commit(service, [buy('AAA', 100), buy('BBB', 1e6), buy('CCC', 100), {'method': 'nope'}])
+
+    assert [r['ok'] for r in replies] == [True, True, True, False]
+    assert [r['result'] for r in replies[:3]] == [True, False, True]
+    assert "Not enough cash" in replies[1]['output']
+    assert service.stats['trades'] == 2 and service.stats['groups'] == 1
+
+    saved = SimplePortfolio(str(tmp_path))
+    assert 'AAA' in saved.portfolio and 'CCC' in saved.portfolio and 'BBB' not in saved.portfolio
+    assert saved.portfolio['CASH']['balance'] == pytest.approx(650.0 - 200)
+    assert len(saved.transaction_log.tail(10)) == 2
+
+def test_failed_flush_fails_the_whole_group_and_reloads(tmp_path, monkeypatch, capsys):
+    service = PortfolioService(str(tmp_path))
+    commit(service, [buy('AAA', 100)])
+
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(service.manager, 'flush_trades', fail)
+    replies = commit(service, [buy('BBB', 100), buy('CCC', 100), {'method': 'show_portfolio'}])
+
+    assert [r['ok'] for r in replies] == [False, False, True]
+    assert replies[0]['error'] == "not saved: disk full"
+    assert service.stats['flush_errors'] == 1
+    assert "Group commit failed" in capsys.readouterr().out
+
+    # In-memory state was reloaded from disk, so the unsaved buys are gone there too
+    assert 'AAA' in service.manager.portfolio and 'BBB' not in service.manager.portfolio
+    assert service.manager.portfolio['CASH']['balance'] == pytest.approx(550.0)
+
+def test_open_portfolio_falls_back_to_a_local_portfolio(tmp_path):
+    manager = open_portfolio(str(tmp_path))
+    assert isinstance(manager, SimplePortfolio)
+
+    # A stale socket file with nothing listening is treated the same
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(os.path.join(tmp_path, 'portfolio.sock'))
+    stale.close()
+    assert isinstance(open_portfolio(str(tmp_path)), SimplePortfolio)
+
+def test_open_portfolio_uses_the_running_service(tmp_path):
+    service = PortfolioService(str(tmp_path))
+    thread = threading.Thread(target=asyncio.run, args=(service.run(),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(service.socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    client = open_portfolio(str(tmp_path))
+    try:
+        assert isinstance(client, PortfolioClient)
+        assert client.buy_stock('AAA', 100, 10.0, is_dollar_amount=True) is True
+        assert client.buy_stock('BBB', 1e6, 10.0, is_dollar_amount=True) is False
+        client.call('shutdown')
+    finally:
+        client.close()
+    thread.join(5)
+
+    saved = SimplePortfolio(str(tmp_path))
+    assert 'AAA' in saved.portfolio and 'BBB' not in saved.portfolio
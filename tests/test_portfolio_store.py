@@ -0,0 +1,90 @@
+import os
+import json
+
+import pytest
+
+from portfolio_store import PortfolioStore
+
+def state(cash):
+    return {'RGTI': {'shares': 10.0, 'avg_cost': 19.5, 'total_invested': 195.0}, 'CASH': {'balance': cash}}
+
+def line(data):
+    return json.dumps(data, separators=(',', ':')) + '\n'
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, 'current_portfolio.json')
+
+def test_save_checkpoints_the_journal(path):
+    store = PortfolioStore(path)
+    store.save(state(100.0))
+    assert PortfolioStore(path).load() == state(100.0)
+    assert os.path.getsize(store.journal_path) == 0
+
+def test_torn_journal_tail_is_ignored(path, capsys):
+    PortfolioStore(path).save(state(100.0))
+
+    # Crash halfway through appending the next save
+    with open(path + '.journal', 'a') as f:
+        f.write(line(state(200.0))[:25])
+
+    store = PortfolioStore(path)
+    assert store.load() == state(100.0)
+    assert store.stats['recoveries'] == 0
+    assert "Recovered" not in capsys.readouterr().out
+
+def test_newest_complete_entry_wins_over_a_torn_one(path):
+    PortfolioStore(path).save(state(100.0))
+    with open(path + '.journal', 'a') as f:
+        f.write(line(state(200.0)) + line(state(300.0))[:25])
+
+    store = PortfolioStore(path)
+    assert store.load() == state(200.0)
+    assert store.stats['recoveries'] == 1
+
+def test_crash_between_journal_append_and_snapshot_rename_is_replayed(path, monkeypatch, capsys):
+    store = PortfolioStore(path)
+    store.save(state(100.0))
+
+    def crash(src, dst):
+        raise OSError("simulated crash before rename")
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        store.save(state(200.0))
+    monkeypatch.undo()
+
+    with open(path) as f:
+        assert json.load(f) == state(100.0)
+
+    recovered = PortfolioStore(path)
+    assert recovered.load() == state(200.0)
+    assert "Recovered portfolio from journal" in capsys.readouterr().out
+
+    # Recovery rewrites the snapshot and checkpoints the journal
+    with open(path) as f:
+        assert json.load(f) == state(200.0)
+    assert os.path.getsize(path + '.journal') == 0
+    assert PortfolioStore(path).load() == state(200.0)
+
+def test_leftover_temp_snapshot_is_ignored(path):
+    store = PortfolioStore(path)
+    store.save(state(100.0))
+
+    # A process killed mid-write leaves its half-written temp file behind
+    with open(f"{path}.99999.tmp", 'w') as f:
+        f.write(json.dumps(state(999.0))[:30])
+
+    assert PortfolioStore(path).load() == state(100.0)
+    store.save(state(150.0))
+    assert PortfolioStore(path).load() == state(150.0)
+    assert not os.path.exists(f"{path}.{os.getpid()}.tmp")
+
+def test_truncated_snapshot_is_recovered_from_the_journal(path, capsys):
+    with open(path, 'w') as f:
+        f.write(json.dumps(state(100.0))[:30])
+    with open(path + '.journal', 'w') as f:
+        f.write(line(state(100.0)))
+
+    assert PortfolioStore(path).load() == state(100.0)
+    assert "snapshot unreadable" in capsys.readouterr().out
@@ -0,0 +1,39 @@
+import copy
+
+import pytest
+
+from simple_portfolio import SimplePortfolio
+
+@pytest.mark.parametrize('order', [
+    {'action': 'BUY', 'symbol': 'ABC', 'price': '10', 'amount': 'abc'},
+    {'action': 'BUY', 'symbol': 'ABC', 'price': '10', 'shares': 'ten'},
+    {'action': 'SELL', 'symbol': 'RGTI', 'price': '10', 'percentage': 'half'},
+    {'action': 'SELL', 'symbol': 'RGTI', 'price': '10', 'shares': '1e'},
+])
+def test_bad_numeric_field_rejects_the_batch(tmp_path, capsys, order):
+    manager = SimplePortfolio(str(tmp_path))
+    before = manager.portfolio['CASH']['balance']
+
+    assert manager.execute_batch([order]) is False
+    assert "[ERROR] Order 1: invalid order" in capsys.readouterr().out
+    assert manager.portfolio['CASH']['balance'] == before
+
+def test_rejected_specific_sell_keeps_lots_and_cash(tmp_path, capsys):
+    manager = SimplePortfolio(str(tmp_path))
+    assert manager.buy_stock('RGTI', 100, 20, is_dollar_amount=True)
+    new_lot = manager.lots.queues['RGTI'].open_lots()[-1][0]
+    portfolio = copy.deepcopy(manager.portfolio)
+    lots = manager.lots.to_dict()
+
+    # The new lot holds 5 of the 51.15 shares, so selling all of them from it must fail
+    assert manager.sell_stock('RGTI', 100, 25, is_percentage=True, method='SPECIFIC', lot_ids=[new_lot]) is False
+    assert "hold fewer shares than the sell" in capsys.readouterr().out
+    assert manager.portfolio == portfolio
+    assert manager.lots.to_dict() == lots
+    assert manager.lots.realized_pnl('RGTI') == 0
+
+    # The rejected sell must not leak into the next save either
+    assert manager.buy_stock('RGTI', 20, 20, is_dollar_amount=True)
+    reloaded = SimplePortfolio(str(tmp_path))
+    assert reloaded.portfolio['RGTI']['shares'] == pytest.approx(portfolio['RGTI']['shares'] + 1)
+    assert reloaded.lots.realized_pnl('RGTI') == 0
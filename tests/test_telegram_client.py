@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from stub_server import StubProviderServer
+from telegram_client import TelegramClient, split_message
+
+def make_server(**options):
+    return StubProviderServer(**dict({'latency': 0}, **options)).start()
+
+def make_client(api_url, **options):
+    return TelegramClient('token', 'chat', api_url=api_url, **dict({'backoff': 0, 'max_retries': 2}, **options))
+
+def long_message(chunks=3):
+    line = 'x' * 1000
+    return '\n'.join([line] * (4 * chunks))
+
+@pytest.fixture
+def server(request):
+    server = make_server(**getattr(request, 'param', {}))
+    yield server
+    server.stop()
+
+def start_of_window():
+    """Wait for the stub's next one-second rate-limit window so a test's requests share it"""
+    time.sleep(1 - time.monotonic() % 1)
+
+def telegram_requests(server):
+    return server.snapshot()['Telegram']['requests']
+
+def test_message_is_split_and_delivered(server):
+    client = make_client(server.root_url)
+    text = long_message()
+    assert client.send_message(text)
+    assert server.messages == split_message(text) and len(server.messages) == 3
+
+@pytest.mark.parametrize('server', [{'error_rate': {'Telegram': 1.0}}], indirect=True)
+def test_server_errors_are_retried(server):
+    client = make_client(server.root_url)
+    assert not client.send_message("hello")
+    assert telegram_requests(server) == 3 and client.stats['retries'] == 2
+
+@pytest.mark.parametrize('server', [{'rate_limits': {'Telegram': 1}, 'retry_after': 0}], indirect=True)
+def test_rate_limited_chunks_are_retried(server):
+    client = make_client(server.root_url)
+    start_of_window()
+    assert client.send_message("first")
+    assert not client.send_message("second")
+    assert telegram_requests(server) == 1 + 3 and server.messages == ["first"]
+
+def test_connection_errors_are_retried():
+    server = make_server()
+    url = server.root_url
+    server.stop()
+
+    client = make_client(url, timeout=1)
+    assert not client.send_message("hello")
+    assert client.stats['retries'] == 2 and client.stats['failed'] == 1
+
+@pytest.mark.parametrize('server', [{'latency': {'Telegram': 0.5}}], indirect=True)
+def test_read_timeout_is_not_resent(server):
+    client = make_client(server.root_url, timeout=0.1)
+    assert not client.send_message("hello")
+    assert client.stats['retries'] == 0
+
+    # The stub still delivers the one request it got, so a resend would have doubled it
+    time.sleep(0.6)
+    assert telegram_requests(server) == 1 and server.messages == ["hello"]
+
+@pytest.mark.parametrize('server', [{'rate_limits': {'Telegram': 1}, 'retry_after': 0}], indirect=True)
+def test_flush_stops_at_the_first_failed_chunk(server):
+    client = make_client(server.root_url, max_retries=0)
+    chunks = split_message(long_message())
+
+    # Window allows one request: chunk 1 goes out, chunk 2 is refused, chunk 3 is never tried
+    client.enqueue(long_message())
+    start_of_window()
+    assert client.flush() == 1
+    assert telegram_requests(server) == 2 and server.messages == chunks[:1]
+    assert [chunk for chunk, _ in client.queue] == chunks[1:]
+
+    # The next flush resumes at the failed chunk
+    start_of_window()
+    assert client.flush() == 1
+    assert server.messages == chunks[:2]
+
+@pytest.mark.parametrize('server', [{'rate_limits': {'Telegram': 1}, 'retry_after': 0}], indirect=True)
+def test_send_message_drops_the_undelivered_rest(server, capsys):
+    client = make_client(server.root_url, max_retries=0)
+    start_of_window()
+    assert not client.send_message(long_message())
+    assert "delivered 1 of 3 chunks" in capsys.readouterr().out
+    assert not client.queue and len(server.messages) == 1
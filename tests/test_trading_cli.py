@@ -0,0 +1,49 @@
+import pytest
+
+import cloud_algorithm_runner
+import simple_portfolio
+import trading_cli
+from simple_portfolio import SimplePortfolio
+
+# Shared runners and busy laptops are slower than the machine the budgets were set on
+STARTUP_MARGIN = 1.5
+
+def test_startup_within_budget(capsys):
+    assert trading_cli.startup_check(runs=3, margin=STARTUP_MARGIN), capsys.readouterr().out
+
+@pytest.mark.parametrize('command', sorted(trading_cli.SUBSYSTEMS))
+def test_every_subcommand_parses_and_imports(command):
+    assert trading_cli.main(['--import-only', command] + trading_cli.PLACEHOLDER_ARGS.get(command, [])) == 0
+
+def test_startup_check_rejects_unknown_commands(capsys):
+    assert trading_cli.main(['startup-check', 'nope']) == 2
+    assert "[ERROR] Unknown command(s): nope" in capsys.readouterr().out
+
+@pytest.mark.parametrize('delivered, exit_code', [(True, 0), (False, 1)])
+def test_eod_exit_code_follows_the_run(monkeypatch, delivered, exit_code):
+    class Runner:
+        def run_algorithm_analysis(self):
+            return delivered
+
+    monkeypatch.setattr(cloud_algorithm_runner, 'CloudAlgorithmRunner', Runner)
+    assert trading_cli.main(['eod']) == exit_code
+
+def test_eod_exits_non_zero_on_a_crash(monkeypatch, capsys):
+    class Runner:
+        def run_algorithm_analysis(self):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(cloud_algorithm_runner, 'CloudAlgorithmRunner', Runner)
+    monkeypatch.delenv('TELEGRAM_BOT_TOKEN', raising=False)
+    assert trading_cli.main(['eod']) == 1
+    assert "Critical error in cloud algorithm runner: boom" in capsys.readouterr().out
+
+def test_trades_exit_non_zero_when_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(simple_portfolio, 'open_portfolio', lambda: SimplePortfolio(str(tmp_path)))
+
+    assert trading_cli.main(['buy', 'ABC', '100', '10']) == 0
+    assert trading_cli.main(['buy', 'ABC', '100000', '10']) == 1
+    assert trading_cli.main(['sell', 'ABC', '50', '12']) == 0
+    assert trading_cli.main(['sell', 'ABC', '50', '12', '--lots', '999']) == 1
+    assert trading_cli.main(['sell', 'ABC']) == 1
+    assert SimplePortfolio(str(tmp_path)).portfolio['ABC']['shares'] == pytest.approx(5)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+import market_open_brief
+from market_open_brief import MarketOpenBrief
+from provider_http import ProviderHTTP
+from stub_server import StubProviderServer
+from universe_scanner import UniverseScanner
+
+@pytest.fixture
+def server():
+    server = StubProviderServer(latency=0, universe_size=300).start()
+    yield server
+    server.stop()
+
+def make_scanner(base_url, tmp_path):
+    return UniverseScanner('stub', base_url=base_url, top_n=5, timeout=2,
+                           http=ProviderHTTP(os.path.join(tmp_path, 'http')))
+
+def test_scan_returns_candidates(server, tmp_path):
+    scanner = make_scanner(server.base_url, tmp_path)
+    candidates = scanner.scan()
+    assert candidates and len(candidates) <= 5
+    assert scanner.stats['failed'] == 0 and scanner.stats['quotes'] == 900
+
+def test_scan_returns_none_when_every_exchange_fails(server, tmp_path):
+    # The stub has no listings under this path, so every request gets a 404
+    scanner = make_scanner(server.root_url + '/missing', tmp_path)
+    assert scanner.scan() is None
+    assert scanner.stats['failed'] == 3
+
+def make_brief(base_url, tmp_path):
+    brief = MarketOpenBrief(cache_dir=os.path.join(tmp_path, 'cache'), output_dir=os.path.join(tmp_path, 'output'))
+    brief.load_api_keys = lambda: {'FMP': 'stub'}
+    brief.quote_config['base_url'] = base_url
+    return brief
+
+def test_scan_universe_reports_failure(server, tmp_path):
+    assert make_brief(server.root_url + '/missing', tmp_path).scan_universe(5) is None
+
+@pytest.mark.parametrize('path, failed', [('/api/v3', False), ('/missing', True)])
+def test_scan_command_exit_code(server, tmp_path, monkeypatch, path, failed):
+    monkeypatch.setattr(market_open_brief, 'MarketOpenBrief', lambda: make_brief(server.root_url + path, tmp_path))
+    monkeypatch.setattr(sys, 'argv', ['market_open_brief.py', '--scan', '5'])
+    if failed:
+        with pytest.raises(SystemExit) as exit_info:
+            market_open_brief.main()
+        assert exit_info.value.code == 1
+    else:
+        market_open_brief.main()
@@ -0,0 +1,269 @@
+"""
+Trading CLI
+Single entry point for portfolio, brief, EOD and status commands; each subsystem is imported only when used
+"""
+
+import time
+
+CLI_START = time.perf_counter()
+
+import os
+import sys
+import argparse
+
+# Module each subcommand imports; nothing else is loaded before dispatch
+SUBSYSTEMS = {
+    'portfolio': 'simple_portfolio',
+    'buy': 'simple_portfolio',
+    'sell': 'simple_portfolio',
+    'history': 'simple_portfolio',
+    'lots': 'simple_portfolio',
+    'brief': 'market_open_brief',
+    'scan': 'market_open_brief',
+    'eod': 'cloud_algorithm_runner',
+    'service': 'portfolio_service',
+    'backtest': 'backtest',
+    'status': 'send_status_update',
+    'health': 'send_status_update'
+}
+
+# Cold-start budget per subcommand in milliseconds: interpreter start, CLI and subsystem imports
+STARTUP_BUDGET_MS = {
+    'portfolio': 150,
+    'buy': 150,
+    'sell': 150,
+    'history': 150,
+    'lots': 150,
+    'brief': 400,
+    'scan': 400,
+    'eod': 400,
+    'service': 200,
+    'backtest': 400,
+    'status': 200,
+    'health': 200
+}
+
+# Required positionals supplied when timing a subcommand's import
+PLACEHOLDER_ARGS = {
+    'status': ['success'],
+    'lots': ['SYMBOL'],
+    'service': ['status']
+}
+
+# ---- subsystem import ----------------------------------------------------
+
+def import_subsystem(command, profile=False):
+    """Import the module behind `command`, optionally reporting what it cost"""
+    before = set(sys.modules)
+    start = time.perf_counter()
+    module = __import__(SUBSYSTEMS[command])
+    import_ms = (time.perf_counter() - start) * 1000
+
+    if profile:
+        loaded = set(sys.modules) - before
+        packages = sorted({name.split('.')[0] for name in loaded})
+        print(f"[INFO] Startup: CLI {(start - CLI_START) * 1000:.1f}ms, "
+              f"{SUBSYSTEMS[command]} import {import_ms:.1f}ms, {len(loaded)} modules "
+              f"({', '.join(packages[:12])}{', ...' if len(packages) > 12 else ''})", file=sys.stderr)
+    return module, import_ms
+
+# ---- command handlers ----------------------------------------------------
+
+def cmd_portfolio(module, args):
+    module.open_portfolio().show_portfolio()
+    return True
+
+def cmd_trade(module, args):
+    manager = module.open_portfolio()
+    if args.file:
+        orders = manager.load_order_file(args.file, args.command.upper())
+        return manager.execute_batch(orders)
+
+    if args.symbol is None or args.amount is None or args.price is None:
+        print(f"[ERROR] Usage: {args.command} SYMBOL {'DOLLARS' if args.command == 'buy' else 'PERCENTAGE'} PRICE"
+              f" | {args.command} --file ORDERS.csv")
+        return False
+
+    if args.command == 'buy':
+        return manager.buy_stock(args.symbol, args.amount, args.price, is_dollar_amount=True)
+
+    lot_ids = [int(i) for i in args.lots.split(',')] if args.lots else None
+    method = args.method or ('SPECIFIC' if lot_ids else None)
+    return manager.sell_stock(args.symbol, args.amount, args.price, is_percentage=True,
+                              method=method, lot_ids=lot_ids)
+
+def cmd_history(module, args):
+    manager = module.open_portfolio()
+    if args.symbol:
+        manager.show_symbol_transactions(args.symbol)
+    else:
+        manager.show_recent_transactions(args.count)
+    return True
+
+def cmd_lots(module, args):
+    module.open_portfolio().show_lots(args.symbol)
+    return True
+
+def cmd_brief(module, args):
+    return module.MarketOpenBrief().generate_market_open_brief()
+
+def cmd_scan(module, args):
+    return module.MarketOpenBrief().scan_universe(args.top) is not None
+
+def cmd_eod(module, args):
+    return module.main()
+
+def cmd_service(module, args):
+    return module.control(args.action, backend=args.backend)
+
+def cmd_backtest(module, args):
+    return module.main(args.options) == 0
+
+def cmd_status(module, args):
+    module.send_status_update(args.status)
+    return True
+
+def cmd_health(module, args):
+    module.send_system_health_check()
+    return True
+
+HANDLERS = {
+    'portfolio': cmd_portfolio,
+    'buy': cmd_trade,
+    'sell': cmd_trade,
+    'history': cmd_history,
+    'lots': cmd_lots,
+    'brief': cmd_brief,
+    'scan': cmd_scan,
+    'eod': cmd_eod,
+    'service': cmd_service,
+    'backtest': cmd_backtest,
+    'status': cmd_status,
+    'health': cmd_health
+}
+
+# ---- startup budget ------------------------------------------------------
+
+def measure_startup(command, runs=5):
+    """Median cold-start wall time (ms) of `command` in fresh interpreters, imports only"""
+    import subprocess
+
+    # Placeholder positionals so the subcommand parses; nothing is executed
+    argv = [command] + PLACEHOLDER_ARGS.get(command, [])
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--import-only'] + argv,
+                       check=True, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def startup_check(commands=None, runs=5, as_json=False, margin=1.0):
+    """Measure every subcommand against STARTUP_BUDGET_MS; returns True if all are within budget
+
+    `margin` scales every budget, for noisy machines such as shared CI runners.
+    """
+    results = {}
+    for command in commands or list(SUBSYSTEMS):
+        startup_ms = measure_startup(command, runs)
+        budget_ms = round(STARTUP_BUDGET_MS[command] * margin)
+        results[command] = {
+            'startup_ms': round(startup_ms, 1),
+            'budget_ms': budget_ms,
+            'ok': startup_ms <= budget_ms
+        }
+
+    if as_json:
+        import json
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'command':<12} {'startup ms':>11} {'budget ms':>10}")
+        for command, r in results.items():
+            status = "[OK]" if r['ok'] else "[ERROR] over budget"
+            print(f"{command:<12} {r['startup_ms']:11.1f} {r['budget_ms']:10d}  {status}")
+
+    return all(r['ok'] for r in results.values())
+
+# ---- argument parsing ----------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='trading_cli.py', description="MicroCap trading system")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="report CLI and subsystem import time before running")
+    parser.add_argument('--import-only', action='store_true', help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('portfolio', help="show current positions")
+
+    for action, unit in (('buy', 'DOLLARS'), ('sell', 'PERCENTAGE')):
+        trade = commands.add_parser(action, help=f"{action} a position, or a batch with --file")
+        trade.add_argument('symbol', nargs='?')
+        trade.add_argument('amount', nargs='?', type=float, metavar=unit)
+        trade.add_argument('price', nargs='?', type=float)
+        trade.add_argument('--file', help="CSV of orders executed as one batch")
+        if action == 'sell':
+            trade.add_argument('--method', type=str.upper, choices=['FIFO', 'LIFO', 'SPECIFIC'],
+                               help="lot matching method (default COST_BASIS_METHOD or FIFO)")
+            trade.add_argument('--lots', help="comma-separated lot ids for a specific-ID sell")
+
+    history = commands.add_parser('history', help="recent transactions, or one symbol's history")
+    history.add_argument('symbol', nargs='?')
+    history.add_argument('--count', type=int, default=10)
+
+    lots = commands.add_parser('lots', help="open tax lots and realized P&L for a symbol")
+    lots.add_argument('symbol')
+
+    commands.add_parser('brief', help="send the 9:30 AM market open brief")
+    scan = commands.add_parser('scan', help="top microcap movers across the whole exchange listings")
+    scan.add_argument('--top', type=int, help="candidates to keep (default 20)")
+    commands.add_parser('eod', help="run the end-of-day analysis")
+
+    service = commands.add_parser('service', help="run or query the single-writer portfolio service")
+    service.add_argument('action', choices=['serve', 'stop', 'status'])
+    service.add_argument('--backend', choices=['file', 'sqlite'], help="storage backend (default PORTFOLIO_BACKEND)")
+
+    # Options after 'backtest' go to backtest.py (see main)
+    commands.add_parser('backtest', help="replay price history through the alert rules", add_help=False)
+
+    status = commands.add_parser('status', help="send a workflow status update")
+    status.add_argument('status', help="success, failure or cancelled")
+
+    commands.add_parser('health', help="send a system health check")
+
+    check = commands.add_parser('startup-check', help="measure cold start against the budget")
+    check.add_argument('commands', nargs='*', metavar='COMMAND', help="subcommands to measure (default: all)")
+    check.add_argument('--runs', type=int, default=5)
+    check.add_argument('--json', action='store_true')
+    check.add_argument('--margin', type=float, default=1.0, help="multiply every budget by this factor")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Everything after 'backtest' is handed to backtest.py's own parser untouched
+    split = argv.index('backtest') if 'backtest' in argv else None
+    if split is not None and all(arg.startswith('-') for arg in argv[:split]):
+        args = build_parser().parse_args(argv[:split + 1])
+        args.options = argv[split + 1:]
+    else:
+        args = build_parser().parse_args(argv)
+
+    if args.command == 'startup-check':
+        unknown = [c for c in args.commands if c not in SUBSYSTEMS]
+        if unknown:
+            print(f"[ERROR] Unknown command(s): {', '.join(unknown)}")
+            return 2
+        return 0 if startup_check(args.commands, args.runs, args.json, args.margin) else 1
+
+    module, _ = import_subsystem(args.command, profile=args.startup_profile)
+    if args.import_only:
+        return 0
+
+    try:
+        return 0 if HANDLERS[args.command](module, args) else 1
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Transaction Log
+Append-only transactions CSV with reverse reads and a per-symbol offset index
+"""
+
+import os
+import io
+import csv
+import json
+from array import array
+
+FIELDNAMES = ['date', 'symbol', 'action', 'shares', 'price', 'amount', 'notes']
+
+class TransactionLog:
+    """Read the transactions CSV from its end and look rows up by symbol without full scans
+
+    Rows are appended in date order, so "last N" and "since date X" read
+    backwards from EOF and stop early. A sidecar directory keeps one packed
+    file of row byte offsets per symbol, so "all for symbol Y" seeks only to
+    that symbol's rows.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path, index_dir=None):
+        self.path = path
+        self.index_dir = index_dir or path + '.idx'
+        self.meta_file = os.path.join(self.index_dir, '_meta.json')
+        self.indexed_size = None
+
+    # ---- writing -------------------------------------------------------
+
+    def append(self, trans_data):
+        self.append_many([trans_data])
+
+    def append_many(self, rows):
+        """Append rows with a single open/write and record their offsets in the index"""
+        if not rows:
+            return
+
+        self.sync_index()
+
+        with open(self.path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+
+            parts = []
+            if offset == 0:
+                parts.append(self.format_row(dict(zip(FIELDNAMES, FIELDNAMES))))
+                offset = len(parts[0])
+
+            offsets = []
+            for row in rows:
+                data = self.format_row(row)
+                offsets.append((row['symbol'], offset))
+                offset += len(data)
+                parts.append(data)
+
+            f.write(b''.join(parts))
+            f.flush()
+            end = f.tell()
+
+        self.add_offsets(offsets, end)
+
+    @staticmethod
+    def format_row(row):
+        """Encode one row exactly as csv.DictWriter would write it"""
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=FIELDNAMES).writerow(row)
+        return buffer.getvalue().encode('utf-8')
+
+    # ---- reverse reading ----------------------------------------------
+
+    def iter_reverse_lines(self):
+        """Yield (offset, raw line bytes) from the last row back to the header"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b''
+
+            while position > 0:
+                read_size = min(self.BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                chunk = f.read(read_size) + remainder
+
+                lines = chunk.split(b'\n')
+                # The first piece may be a partial line; carry it into the next block
+                remainder = lines.pop(0)
+                line_end = position + len(chunk)
+                for line in reversed(lines):
+                    line_end -= len(line) + 1
+                    if line.strip():
+                        yield line_end + 1, line
+
+            if remainder.strip():
+                yield 0, remainder
+
+    def iter_reverse(self):
+        """Yield transaction dicts newest first"""
+        for offset, line in self.iter_reverse_lines():
+            if offset == 0:
+                return  # header row
+            yield self.parse_line(line)
+
+    @staticmethod
+    def parse_line(line):
+        values = next(csv.reader([line.decode('utf-8').rstrip('\r')]))
+        return dict(zip(FIELDNAMES, values))
+
+    def tail(self, n=10):
+        """Last n transactions, newest first"""
+        result = []
+        for trans in self.iter_reverse():
+            if len(result) >= n:
+                break
+            result.append(trans)
+        return result
+
+    def since(self, date_str):
+        """Transactions dated at or after date_str ('YYYY-MM-DD[ HH:MM]'), newest first"""
+        result = []
+        for trans in self.iter_reverse():
+            if trans['date'] < date_str:
+                break
+            result.append(trans)
+        return result
+
+    # ---- symbol index -------------------------------------------------
+
+    def symbol_index_file(self, symbol):
+        return os.path.join(self.index_dir, f"{symbol.upper()}.offsets")
+
+    def add_offsets(self, offsets, indexed_size):
+        """Append packed offsets per symbol and advance the indexed-size watermark"""
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        by_symbol = {}
+        for symbol, offset in offsets:
+            by_symbol.setdefault(symbol.upper(), array('q')).append(offset)
+
+        for symbol, packed in by_symbol.items():
+            with open(self.symbol_index_file(symbol), 'ab') as f:
+                packed.tofile(f)
+
+        with open(self.meta_file, 'w') as f:
+            json.dump({'indexed_size': indexed_size}, f)
+        self.indexed_size = indexed_size
+
+    def sync_index(self):
+        """Index rows appended outside this class; rebuild if the CSV shrank"""
+        if self.indexed_size is None:
+            try:
+                with open(self.meta_file, 'r') as f:
+                    self.indexed_size = json.load(f)['indexed_size']
+            except Exception:
+                self.indexed_size = 0
+
+        file_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if file_size == self.indexed_size:
+            return
+
+        if file_size < self.indexed_size:
+            self.reset_index()
+
+        offsets = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            for line in iter(f.readline, b''):
+                if offset > 0 and line.strip():
+                    offsets.append((self.parse_line(line.rstrip(b'\n'))['symbol'], offset))
+                offset += len(line)
+
+        self.add_offsets(offsets, offset)
+
+    def reset_index(self):
+        if os.path.isdir(self.index_dir):
+            for name in os.listdir(self.index_dir):
+                os.remove(os.path.join(self.index_dir, name))
+        self.indexed_size = 0
+
+    def for_symbol(self, symbol):
+        """All transactions for a symbol in chronological order"""
+        self.sync_index()
+
+        index_file = self.symbol_index_file(symbol)
+        if not os.path.exists(index_file):
+            return []
+
+        offsets = array('q')
+        with open(index_file, 'rb') as f:
+            offsets.frombytes(f.read())
+
+        result = []
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                result.append(self.parse_line(f.readline().rstrip(b'\n')))
+        return result
@@ -0,0 +1,297 @@
+"""
+Universe Scanner
+Streams FMP whole-exchange quote listings and keeps the top microcap movers by the brief's criteria
+"""
+
+import sys
+import json
+import time
+import heapq
+import codecs
+import ssl
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from quote_fetcher import QuoteFetcher, FMP_BASE_URL
+from brief_renderer import BIG_MOVE_PCT, HIGH_VOLUME_RATIO
+from provider_http import get_http_client
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+EXCHANGES = ('nasdaq', 'nyse', 'amex')
+MICROCAP_MAX = 300_000_000
+CHUNK_SIZE = 64 * 1024
+
+def iter_json_array(read, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a JSON array one at a time from a read(size) callable
+
+    Only the unparsed tail of the current chunk is held, so memory stays
+    flat however long the array is. A top-level object instead of an array
+    (FMP's {"Error Message": ...} shape) raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, eof, started = '', 0, False, False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+
+        if pos < len(buffer) and not started:
+            if buffer[pos] != '[':
+                rest = buffer[pos:] + utf8.decode(read(), final=True)
+                try:
+                    payload = json.loads(rest)
+                except ValueError:
+                    payload = rest[:200]
+                raise ValueError(f"expected a JSON array, got {payload!r}"[:300])
+            started, pos = True, pos + 1
+            continue
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        if pos < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A number cut at the chunk edge ("4." of "4.5e10") still decodes,
+                # so a value only counts once the ',' or ']' after it has arrived
+                after = end
+                while after < len(buffer) and buffer[after] in ' \t\r\n':
+                    after += 1
+                if after < len(buffer) and buffer[after] in ',]':
+                    yield value
+                    pos = end
+                    continue
+                if eof and after == len(buffer):
+                    raise ValueError("JSON array ended without ']'")
+                if eof:
+                    raise ValueError(f"unexpected {buffer[after:after + 20]!r} in JSON array")
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+        if eof:
+            if started:
+                raise ValueError("JSON array ended without ']'")
+            return
+
+        chunk = read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+class UniverseScanner:
+    """Top-N microcap candidates from FMP's whole-exchange quote listings
+
+    Each exchange listing (/quotes/{exchange}) is parsed as a stream of
+    quote records. A record counts as a candidate when the market cap is
+    under `max_market_cap`, the absolute move is at least `big_move_pct`
+    and volume is more than `high_volume_ratio` times its average. These
+    are the same tests the market open brief uses for "Biggest mover" and
+    "High volume". Candidates go into a bounded heap ranked by absolute
+    move, then by volume ratio, so nothing beyond the top N is kept.
+    """
+
+    def __init__(self, api_key, base_url=FMP_BASE_URL, exchanges=EXCHANGES, top_n=20,
+                 max_market_cap=MICROCAP_MAX, big_move_pct=BIG_MOVE_PCT,
+                 high_volume_ratio=HIGH_VOLUME_RATIO, timeout=30, ssl_context=None,
+                 chunk_size=CHUNK_SIZE, http=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.exchanges = list(exchanges)
+        self.top_n = max(1, top_n)
+        self.max_market_cap = max_market_cap
+        self.big_move_pct = big_move_pct
+        self.high_volume_ratio = high_volume_ratio
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.chunk_size = chunk_size
+        self.http = http or get_http_client()
+        self.stats = {}
+
+    def exchange_url(self, exchange):
+        return f"{self.base_url}/quotes/{exchange}?apikey={self.api_key}"
+
+    def candidate(self, quote):
+        """(rank key, market_data entry) if a raw quote passes the criteria, else None"""
+        market_cap = quote.get('marketCap') or 0
+        avg_volume = quote.get('avgVolume') or 0
+        change_pct = quote.get('changesPercentage') or 0
+        if not 0 < market_cap < self.max_market_cap or avg_volume <= 0:
+            return None
+        if abs(change_pct) < self.big_move_pct:
+            return None
+        volume_ratio = (quote.get('volume') or 0) / avg_volume
+        if volume_ratio <= self.high_volume_ratio:
+            return None
+
+        entry = QuoteFetcher.parse_quote(quote)
+        entry.update(symbol=str(quote.get('symbol', '')).upper(), market_cap=market_cap,
+                     volume_ratio=round(volume_ratio, 2))
+        return (abs(change_pct), volume_ratio), entry
+
+    def select(self, quotes, counts):
+        """Bounded top-N selection over an iterable of raw quotes"""
+        heap = []
+        for seq, quote in enumerate(quotes):
+            counts['quotes'] += 1
+            if 0 < (quote.get('marketCap') or 0) < self.max_market_cap:
+                counts['microcaps'] += 1
+            found = self.candidate(quote)
+            if found is None:
+                continue
+            counts['matched'] += 1
+            item = (found[0], -seq, found[1])
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+        return heap
+
+    def scan_exchange(self, exchange):
+        """(heap, counts) for one exchange listing, parsed as it downloads; heap is None on failure"""
+        counts = {'quotes': 0, 'microcaps': 0, 'matched': 0, 'bytes': 0}
+        try:
+            with self.http.stream('FMP', 'quotes', self.exchange_url(exchange), self.timeout,
+                                  self.ssl_context, exchange=exchange) as body:
+                heap = self.select(iter_json_array(body.read, self.chunk_size), counts)
+            counts['bytes'] = body.body_bytes
+            return heap, counts
+
+        except Exception as e:
+            print(f"[WARNING] Universe scan failed for {exchange}: {e}")
+            return None, counts
+
+    def scan(self):
+        """Top-N candidates across every exchange, best first; totals go to self.stats
+
+        Returns None when every exchange listing failed, so callers can tell
+        "nothing matched" apart from "nothing was scanned".
+        """
+        start = time.perf_counter()
+        totals = {'quotes': 0, 'microcaps': 0, 'matched': 0, 'bytes': 0}
+
+        heaps = []
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, len(self.exchanges))) as pool:
+            for heap, counts in pool.map(self.scan_exchange, self.exchanges):
+                if heap is None:
+                    failed += 1
+                    heap = []
+                heaps.append(heap)
+                for name in totals:
+                    totals[name] += counts[name]
+
+        totals['failed'] = failed
+        totals['seconds'] = time.perf_counter() - start
+        self.stats = totals
+        if failed == len(self.exchanges):
+            return None
+        return self.merge(heaps)
+
+    def merge(self, heaps):
+        """Best-first top N of per-exchange heaps; ties go to the earlier exchange, then listing order"""
+        ranked = sorted((key, -index, seq, entry) for index, heap in enumerate(heaps)
+                        for key, seq, entry in heap)
+        candidates, seen = [], set()
+        for *_, entry in reversed(ranked):
+            # Symbols listed on several exchanges are kept once
+            if entry['symbol'] not in seen:
+                seen.add(entry['symbol'])
+                candidates.append(entry)
+        return candidates[:self.top_n]
+
+    def summary(self):
+        s = self.stats
+        if not s:
+            return "Universe scan: not run"
+        return (f"Universe scan: {s['quotes']:,} quotes ({s['bytes'] / 1024 / 1024:.1f}MB) from "
+                f"{len(self.exchanges) - s['failed']}/{len(self.exchanges)} exchanges, {s['microcaps']:,} microcaps, {s['matched']} matched "
+                f"in {s['seconds']:.2f}s")
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def format_candidates(candidates):
+    lines = [f"{'symbol':<8} {'price':>9} {'change':>8} {'vol ratio':>10} {'mkt cap':>10}"]
+    for c in candidates:
+        price = f"${c['price']:.2f}"
+        market_cap = f"${c['market_cap'] / 1e6:.1f}M"
+        lines.append(f"{c['symbol']:<8} {price:>9} {c['change_pct']:>+7.1f}% "
+                     f"{c['volume_ratio']:>9.1f}x {market_cap:>10}")
+    return "\n".join(lines)
+
+def _serve_universe(per_exchange, latency, ports):
+    from stub_server import StubProviderServer
+    server = StubProviderServer(latency=latency, universe_size=per_exchange)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+def benchmark(universe_size=9000, top_n=20, latency=0.05):
+    """Stream-parse a stub universe, compare against loading each listing whole
+
+    The stub runs in its own process so tracemalloc only sees the client.
+    The timed streaming run downloads; the traced one replays it after a 304.
+    """
+    import tempfile
+    import tracemalloc
+    import multiprocessing
+    from provider_http import ProviderHTTP
+
+    per_exchange = -(-universe_size // len(EXCHANGES))
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_universe, args=(per_exchange, latency, ports), daemon=True)
+    server.start()
+    http_dir = tempfile.TemporaryDirectory()
+    scanner = UniverseScanner('stub', base_url=f"http://127.0.0.1:{ports.get(timeout=10)}/api/v3", top_n=top_n,
+                              http=ProviderHTTP(http_dir.name))
+
+    def load_whole():
+        heaps = []
+        counts = {'quotes': 0, 'microcaps': 0, 'matched': 0}
+        for exchange in EXCHANGES:
+            with urllib.request.urlopen(scanner.exchange_url(exchange), timeout=30) as response:
+                quotes = json.loads(response.read().decode())
+            heaps.append(scanner.select(quotes, counts))
+            del quotes
+        return scanner.merge(heaps)
+
+    try:
+        results = {}
+        for label, fn in (('streaming', scanner.scan), ('whole payload', load_whole)):
+            start = time.perf_counter()
+            candidates = fn()
+            seconds = time.perf_counter() - start
+
+            tracemalloc.start()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = (candidates, seconds, peak)
+    finally:
+        server.terminate()
+        scanner.http.close()
+        http_dir.cleanup()
+
+    stats = scanner.stats
+    print(f"UNIVERSE SCAN BENCHMARK ({stats['quotes']:,} tickers, {stats['bytes'] / 1024 / 1024:.1f}MB "
+          f"of quotes, {latency * 1000:.0f}ms latency)")
+    print("=" * 60)
+    for label, (_, seconds, peak) in results.items():
+        print(f"{label:<14} {seconds:7.3f}s end to end  {peak / 1024 / 1024:7.2f}MB peak Python memory")
+    if results['streaming'][0] != results['whole payload'][0]:
+        print("[ERROR] Streaming and whole-payload scans picked different candidates")
+        sys.exit(1)
+    print(f"[OK] Same {len(results['streaming'][0])} candidates either way "
+          f"({stats['microcaps']:,} microcaps, {stats['matched']} matched the brief criteria)")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 9000)